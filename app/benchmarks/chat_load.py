@@ -0,0 +1,275 @@
+"""
+Load generator for the chat endpoint.
+
+Drives N concurrent users against POST /api/chat/{bot_id} and reports
+throughput, p50/p95/p99 latency, error rate and the per-stage breakdown
+taken from the /metrics histograms, as JSON.
+
+By default everything runs in-process and offline: a temp database, a bot
+prebuilt from a synthetic fixture site (real embedding model and Chroma),
+the fake LLM provider (LLM_PROVIDER=fake) and a local uvicorn server.
+With --url it targets a running server and an existing --bot-id instead.
+
+Usage:
+    python -m app.benchmarks.chat_load --users 20 --requests 25 --llm-latency-ms 600
+    python -m app.benchmarks.chat_load --url http://localhost:8000 --bot-id <id>
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+import httpx
+
+from app.benchmarks.fixtures import SyntheticSite
+
+_STAGE_LINE_RE = re.compile(
+    r'^chatbot_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} ([0-9.eE+-]+)$'
+)
+
+
+# -----------------------------------------------------
+# /metrics SCRAPING
+# -----------------------------------------------------
+def parse_stage_metrics(text: str) -> dict:
+    """
+    {stage: {"sum_s": float, "count": float}} from Prometheus text.
+    """
+    stages: dict = {}
+    for line in text.splitlines():
+        match = _STAGE_LINE_RE.match(line)
+        if not match:
+            continue
+        kind, stage, value = match.groups()
+        stages.setdefault(stage, {"sum_s": 0.0, "count": 0.0})
+        stages[stage]["sum_s" if kind == "sum" else "count"] = float(value)
+    return stages
+
+
+def stage_breakdown(before: dict, after: dict) -> dict:
+    """
+    Calls and mean ms per stage between two scrapes.
+    """
+    breakdown = {}
+    for stage, end in sorted(after.items()):
+        start = before.get(stage, {"sum_s": 0.0, "count": 0.0})
+        calls = end["count"] - start["count"]
+        if calls <= 0:
+            continue
+        breakdown[stage] = {
+            "calls": int(calls),
+            "mean_ms": round((end["sum_s"] - start["sum_s"]) * 1000 / calls, 2),
+        }
+    return breakdown
+
+
+def _percentile(sorted_values: list, pct: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 1)
+
+
+# -----------------------------------------------------
+# IN-PROCESS TARGET
+# -----------------------------------------------------
+def _configure_env(tmp: str, args):
+    """
+    Must run before app modules are imported: config is read at import time.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_LATENCY_SIGMA"] = str(args.llm_latency_sigma)
+    os.environ["FAKE_LLM_TOKENS_PER_S"] = str(args.llm_tokens_per_s)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.llm_error_rate)
+    os.environ["FAKE_LLM_QUOTA_ERROR_RATE"] = str(args.llm_quota_error_rate)
+    # All load comes from one IP: disable rate limits unless asked otherwise
+    if not args.keep_rate_limits:
+        for name in ("RATE_LIMIT_PER_BOT_PER_MIN", "RATE_LIMIT_PER_IP_PER_MIN", "RATE_LIMIT_GLOBAL_PER_MIN"):
+            os.environ[name] = "0"
+
+
+def _build_bot(site: SyntheticSite, chroma_dir: str) -> str:
+    """
+    Index the synthetic site into a ready bot (no crawl): returns its bot_id.
+    """
+    from app import models
+    from app.db import SessionLocal
+    from app.services import vector_store
+    from app.services.embeddings import embed_text
+    from app.services.text_processing import process_text_to_chunks
+
+    vector_store.BASE_CHROMA_DIR = chroma_dir
+    bot_id = uuid.uuid4().hex
+
+    chunks, metadatas = [], []
+    for page_url, text in site.texts().items():
+        for chunk in process_text_to_chunks(text):
+            metadatas.append({"bot_id": bot_id, "page_url": page_url, "chunk_index": len(chunks)})
+            chunks.append(chunk)
+    vector_store.add_chunks_to_chroma(bot_id, chunks, embed_text(chunks), metadatas)
+
+    db = SessionLocal()
+    try:
+        user = models.User(email="load@example.com", name="load", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(models.Bot(bot_id=bot_id, website_url="http://fixture.local/",
+                          status="ready", user_id=user.id))
+        db.commit()
+    finally:
+        db.close()
+    return bot_id
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server():
+    import uvicorn
+    from app.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+# -----------------------------------------------------
+# LOAD
+# -----------------------------------------------------
+def _questions(site: SyntheticSite, count: int) -> list[str]:
+    """
+    Distinct questions (identical in-flight ones would be coalesced).
+    """
+    sentences = [
+        s.strip() + "?"
+        for i in range(site.pages)
+        for paragraph in site.body(i)
+        for s in paragraph.split(".") if s.strip()
+    ]
+    return [f"What about {sentences[i % len(sentences)].lower()}" for i in range(count)]
+
+
+def run_load(base_url: str, bot_id: str, questions: list[str], users: int,
+             requests_per_user: int, think_ms: int, timeout_s: float) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def user(index: int):
+        with httpx.Client(base_url=base_url, timeout=timeout_s) as client:
+            for i in range(requests_per_user):
+                question = questions[(index * requests_per_user + i) % len(questions)]
+                start = time.perf_counter()
+                try:
+                    status = str(client.post(f"/api/chat/{bot_id}", json={"message": question}).status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if status == "200":
+                        latencies.append(elapsed_ms)
+                if think_ms:
+                    time.sleep(think_ms / 1000)
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    latencies.sort()
+    return {
+        "users": users,
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "error_rate": round((total - len(latencies)) / total, 4) if total else None,
+        "status_counts": statuses,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": round(latencies[-1], 1) if latencies else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10, help="concurrent users")
+    parser.add_argument("--requests", type=int, default=20, help="requests per user")
+    parser.add_argument("--think-ms", type=int, default=0, help="pause between a user's requests")
+    parser.add_argument("--timeout-s", type=float, default=60.0)
+    parser.add_argument("--url", help="target a running server instead of an in-process one")
+    parser.add_argument("--bot-id", help="bot to chat with (required with --url)")
+    parser.add_argument("--pages", type=int, default=20, help="pages of the prebuilt fixture bot")
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="fake LLM median time to first token")
+    parser.add_argument("--llm-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--llm-tokens-per-s", type=float, default=50.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-quota-error-rate", type=float, default=0.0)
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="in-process: keep the RATE_LIMIT_* settings instead of disabling them")
+    args = parser.parse_args()
+
+    if args.url and not args.bot_id:
+        parser.error("--bot-id is required with --url")
+
+    site = SyntheticSite(args.pages, args.paragraphs)
+    questions = _questions(site, args.users * args.requests)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            base_url, bot_id = args.url.rstrip("/"), args.bot_id
+        else:
+            _configure_env(tmp, args)
+            logging.disable(logging.INFO)
+            import app.main  # noqa: F401  creates the schema in the temp database
+            bot_id = _build_bot(site, os.path.join(tmp, "chroma"))
+            server, thread, base_url = _start_server()
+
+        try:
+            before = parse_stage_metrics(httpx.get(f"{base_url}/metrics").text)
+            results = run_load(base_url, bot_id, questions, args.users,
+                               args.requests, args.think_ms, args.timeout_s)
+            after = parse_stage_metrics(httpx.get(f"{base_url}/metrics").text)
+        finally:
+            if server:
+                server.should_exit = True
+                thread.join()
+
+    results["stages"] = stage_breakdown(before, after)
+    if not args.url:
+        results["fake_llm"] = {
+            "latency_ms": args.llm_latency_ms,
+            "latency_sigma": args.llm_latency_sigma,
+            "tokens_per_s": args.llm_tokens_per_s,
+            "error_rate": args.llm_error_rate,
+            "quota_error_rate": args.llm_quota_error_rate,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Concurrent write benchmark for the database layer.
+
+Runs the chat-path write pattern (ChatLog insert + bot counter update + commit)
+from several threads while other threads keep reading, once with the original
+engine settings and once with build_engine() (WAL, synchronous=NORMAL,
+busy_timeout), and prints the results as JSON.
+
+Usage:
+    python -m app.benchmarks.db_concurrency --writers 8 --readers 4 --writes 200
+    python -m app.benchmarks.db_concurrency --url postgresql+psycopg2://...
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, build_engine
+from app import models
+
+
+def _seed(engine) -> int:
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    user = models.User(email="bench@example.com", name="bench", hashed_password="x")
+    db.add(user)
+    db.flush()
+    bot = models.Bot(bot_id="bench-bot", website_url="https://example.com",
+                     status="ready", user_id=user.id, message_count=0)
+    db.add(bot)
+    db.commit()
+    bot_pk = bot.id
+    db.close()
+    return bot_pk
+
+
+def _run(engine, writers: int, readers: int, writes_per_thread: int) -> dict:
+    bot_pk = _seed(engine)
+    Session = sessionmaker(bind=engine)
+
+    lock = threading.Lock()
+    stats = {"writes": 0, "write_errors": 0, "reads": 0}
+    stop_reading = threading.Event()
+
+    def writer():
+        done = errors = 0
+        for i in range(writes_per_thread):
+            db = Session()
+            try:
+                db.add(models.ChatLog(
+                    bot_id=bot_pk,
+                    user_message=f"question {i}",
+                    bot_response="answer " * 50,
+                    response_time_ms=100,
+                ))
+                db.execute(
+                    update(models.Bot)
+                    .where(models.Bot.id == bot_pk)
+                    .values(
+                        message_count=func.coalesce(models.Bot.message_count, 0) + 1,
+                        last_used_at=datetime.utcnow(),
+                    )
+                )
+                db.commit()
+                done += 1
+            except OperationalError:
+                # "database is locked"
+                db.rollback()
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            stats["writes"] += done
+            stats["write_errors"] += errors
+
+    def reader():
+        done = 0
+        while not stop_reading.is_set():
+            db = Session()
+            try:
+                db.query(models.ChatLog).filter(models.ChatLog.bot_id == bot_pk) \
+                    .order_by(models.ChatLog.created_at.desc()).limit(20).all()
+                done += 1
+            except OperationalError:
+                pass
+            finally:
+                db.close()
+        with lock:
+            stats["reads"] += done
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer) for _ in range(writers)]
+
+    for t in reader_threads:
+        t.start()
+    start = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop_reading.set()
+    for t in reader_threads:
+        t.join()
+
+    engine.dispose()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "writes": stats["writes"],
+        "write_errors": stats["write_errors"],
+        "writes_per_s": round(stats["writes"] / elapsed, 1),
+        "reads": stats["reads"],
+        "reads_per_s": round(stats["reads"] / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200, help="writes per writer thread")
+    parser.add_argument("--url", help="benchmark this database URL instead of temp SQLite files")
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        results["configured"] = _run(build_engine(args.url), args.writers, args.readers, args.writes)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            default_url = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+            tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+
+            # Original app/db.py settings
+            default_engine = create_engine(default_url, connect_args={"check_same_thread": False})
+            results["sqlite_default"] = _run(default_engine, args.writers, args.readers, args.writes)
+            results["sqlite_tuned"] = _run(build_engine(tuned_url), args.writers, args.readers, args.writes)
+
+        base = results["sqlite_default"]["writes_per_s"]
+        if base:
+            results["write_speedup"] = round(results["sqlite_tuned"]["writes_per_s"] / base, 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
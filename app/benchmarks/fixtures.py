@@ -0,0 +1,132 @@
+"""
+Synthetic websites for offline benchmarks.
+
+SyntheticSite generates a deterministic multi-page site (nav bar, footer,
+cookie banner, contact block, body paragraphs and internal links) and
+serve_site() serves it from a local HTTP server on 127.0.0.1, so the
+crawler can be exercised without touching the network.
+"""
+import contextlib
+import html
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "service product team customer pricing support delivery quality order "
+    "account project design build install repair plan feature guide update "
+    "booking location schedule payment refund warranty shipping return policy "
+    "contract partner training software hardware cloud data report analytics "
+    "security privacy consultant engineer manager office studio clinic course"
+).split()
+
+NAV = "Home About Services Pricing Blog Careers Contact"
+FOOTER = "© 2024 Example Company. All rights reserved. Privacy Policy. Terms and Conditions. Follow us"
+COOKIE_BANNER = "We use cookies to improve your experience. Cookie Policy. Accept all cookies"
+CONTACT = "Contact us at hello@example.com or call +1 555 123 4567 for support"
+
+
+class SyntheticSite:
+    """
+    pages:      number of pages (page 0 is the home page "/")
+    paragraphs: body paragraphs per page (page complexity)
+    links:      internal links per page
+    """
+
+    def __init__(self, pages: int = 50, paragraphs: int = 20, links: int = 8, seed: int = 42):
+        self.pages = pages
+        self.paragraphs = paragraphs
+        self.links = links
+        self.seed = seed
+
+    @staticmethod
+    def path(index: int) -> str:
+        return "/" if index == 0 else f"/page-{index}"
+
+    def _rng(self, index: int) -> random.Random:
+        return random.Random(f"{self.seed}:{index}")
+
+    def _sentence(self, rng: random.Random) -> str:
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 24))]
+        return " ".join(words).capitalize() + "."
+
+    def body(self, index: int) -> list[str]:
+        rng = self._rng(index)
+        return [
+            " ".join(self._sentence(rng) for _ in range(rng.randint(3, 7)))
+            for _ in range(self.paragraphs)
+        ]
+
+    def link_targets(self, index: int) -> list[int]:
+        rng = self._rng(index)
+        count = min(self.links, self.pages - 1)
+        targets = [i for i in range(self.pages) if i != index]
+        return rng.sample(targets, count) if count > 0 else []
+
+    def text(self, index: int) -> str:
+        """
+        Visible text of a page, whitespace-collapsed like the crawler's output.
+        """
+        parts = [NAV, f"Page {index}", *self.body(index), CONTACT, COOKIE_BANNER, FOOTER]
+        return " ".join(" ".join(parts).split())
+
+    def texts(self) -> dict[str, str]:
+        return {self.path(i): self.text(i) for i in range(self.pages)}
+
+    def html(self, index: int) -> str:
+        links = "".join(
+            f'<a href="{self.path(t)}">Page {t}</a> ' for t in self.link_targets(index)
+        )
+        body = "".join(f"<p>{html.escape(p)}</p>" for p in self.body(index))
+        return (
+            "<!doctype html><html><head><title>Page {i}</title></head><body>"
+            "<nav>{nav}</nav><h1>Page {i}</h1>{body}"
+            "<div class=\"links\">{links}</div>"
+            "<p>{contact}</p><div class=\"cookie\">{cookie}</div>"
+            "<footer>{footer}</footer></body></html>"
+        ).format(
+            i=index,
+            nav=html.escape(NAV),
+            body=body,
+            links=links,
+            contact=html.escape(CONTACT),
+            cookie=html.escape(COOKIE_BANNER),
+            footer=html.escape(FOOTER),
+        )
+
+
+def _handler_for(site: SyntheticSite):
+    by_path = {site.path(i): i for i in range(site.pages)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            index = by_path.get(self.path.split("#")[0].split("?")[0])
+            if index is None:
+                self.send_error(404)
+                return
+            payload = site.html(index).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # keep benchmark output clean
+
+    return Handler
+
+
+@contextlib.contextmanager
+def serve_site(site: SyntheticSite):
+    """
+    Serve `site` on an ephemeral localhost port; yields the base URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(site))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
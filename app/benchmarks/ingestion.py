@@ -0,0 +1,251 @@
+"""
+Offline benchmark for the ingestion pipeline.
+
+Serves a synthetic site from a local HTTP server and measures each stage
+on its own: crawl (pages/s), cleaner and clean+chunk (MB/s), clean+chunk
+across a process pool (speedup per worker count), embedding (chunks/s) and
+Chroma inserts (chunks/s), plus chunk text truncated by the model window in
+words vs tokens chunking mode. Prints JSON, tagged with the
+current git commit, so runs can be compared across commits.
+
+Usage:
+    python -m app.benchmarks.ingestion --pages 50 --paragraphs 20
+    python -m app.benchmarks.ingestion --skip-crawl --skip-embed --repeat 5
+    python -m app.benchmarks.ingestion --skip-crawl --workers 2,4,8
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+
+from app import config
+from app.benchmarks.fixtures import SyntheticSite, serve_site
+from app.services import vector_store
+from app.services.cleaner import clean_scraped_text
+from app.services.text_processing import (
+    create_process_pool,
+    process_page_batch,
+    process_text_to_chunks,
+)
+
+# all-MiniLM-L6-v2 output size, used for fake vectors with --skip-embed
+EMBEDDING_DIM = 384
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _median_s(fn, repeat: int) -> tuple[float, object]:
+    """
+    Run fn `repeat` times; returns (median seconds, last result).
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def _rate(amount: float, seconds: float) -> float | None:
+    return round(amount / seconds, 2) if seconds > 0 else None
+
+
+# -----------------------------------------------------
+# STAGES
+# -----------------------------------------------------
+def bench_crawl(site: SyntheticSite, max_pages: int) -> dict:
+    from app.services.crawler import crawl_website
+
+    with serve_site(site) as base_url:
+        start = time.perf_counter()
+        try:
+            pages = crawl_website(base_url, max_pages=max_pages)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {str(e).splitlines()[0]}"}
+        elapsed = time.perf_counter() - start
+
+    return {
+        "pages": len(pages),
+        "seconds": round(elapsed, 3),
+        "pages_per_s": _rate(len(pages), elapsed),
+    }
+
+
+def bench_text(texts: list[str], repeat: int, mode: str) -> tuple[dict, list[str]]:
+    total_mb = sum(len(t.encode("utf-8")) for t in texts) / 1_000_000
+
+    clean_s, _ = _median_s(lambda: [clean_scraped_text(t) for t in texts], repeat)
+    chunk_s, per_page = _median_s(lambda: [process_text_to_chunks(t, mode=mode) for t in texts], repeat)
+    chunks = [c for page_chunks in per_page for c in page_chunks]
+
+    return {
+        "input_mb": round(total_mb, 3),
+        "cleaner_mb_per_s": _rate(total_mb, clean_s),
+        "clean_chunk_mb_per_s": _rate(total_mb, chunk_s),
+        "chunking_mode": mode,
+        "chunks": len(chunks),
+    }, chunks
+
+
+def bench_text_parallel(texts: list[str], repeat: int, mode: str, workers: list[int], batch: int) -> dict:
+    """
+    Clean+chunk MB/s through process_page_batch: serially, then on warm
+    pools of each size. Output must match the serial run page for page.
+    """
+    total_mb = sum(len(t.encode("utf-8")) for t in texts) / 1_000_000
+    batches = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+
+    def chunks_of(results) -> list:
+        return [chunks for batch_results in results for chunks, _ in batch_results]
+
+    serial_s, serial = _median_s(lambda: [process_page_batch(b, mode) for b in batches], repeat)
+    expected = chunks_of(serial)
+    results = {
+        "cpu_count": os.cpu_count(),
+        "pages_per_task": batch,
+        "serial_mb_per_s": _rate(total_mb, serial_s),
+        "workers": {},
+    }
+    for count in workers:
+        pool = create_process_pool(count, mode)
+        try:
+            seconds, output = _median_s(
+                lambda: list(pool.map(process_page_batch, batches, [mode] * len(batches))),
+                repeat,
+            )
+        finally:
+            pool.shutdown()
+        results["workers"][str(count)] = {
+            "mb_per_s": _rate(total_mb, seconds),
+            "speedup": round(serial_s / seconds, 2) if seconds > 0 else None,
+            "output_matches": chunks_of(output) == expected,
+        }
+    return results
+
+
+def bench_chunking_modes(texts: list[str]) -> dict:
+    """
+    Chunks per mode and how much chunk text exceeds the embedding model's
+    window (and is silently cut off when embedded).
+    """
+    results = {}
+    for mode in ("words", "tokens"):
+        totals = {"chunks": 0, "tokens": 0, "truncated_chunks": 0, "truncated_tokens": 0}
+        for text in texts:
+            stats: dict = {}
+            totals["chunks"] += len(process_text_to_chunks(text, stats=stats, mode=mode))
+            for key in ("tokens", "truncated_chunks", "truncated_tokens"):
+                totals[key] += stats.get(key, 0)
+        totals["truncated_pct"] = (
+            round(100 * totals["truncated_tokens"] / totals["tokens"], 2) if totals["tokens"] else 0
+        )
+        results[mode] = totals
+    return results
+
+
+def bench_embed(chunks: list[str], repeat: int) -> tuple[dict, list]:
+    from app.services.embeddings import embed_text
+
+    embed_text(chunks[:8])  # warm-up
+    seconds, embeddings = _median_s(lambda: embed_text(chunks), repeat)
+    return {
+        "chunks": len(chunks),
+        "seconds": round(seconds, 3),
+        "chunks_per_s": _rate(len(chunks), seconds),
+    }, [list(map(float, e)) for e in embeddings]
+
+
+def bench_vector_write(chunks: list[str], embeddings: list, repeat: int) -> dict:
+    metadatas = [
+        {"bot_id": "bench", "page_url": f"/page-{i}", "chunk_index": i}
+        for i in range(len(chunks))
+    ]
+    original_dir = vector_store.BASE_CHROMA_DIR
+    times = []
+    try:
+        for run in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                vector_store.BASE_CHROMA_DIR = tmp
+                start = time.perf_counter()
+                vector_store.add_chunks_to_chroma(f"bench-{run}", chunks, embeddings, metadatas)
+                times.append(time.perf_counter() - start)
+    finally:
+        vector_store.BASE_CHROMA_DIR = original_dir
+
+    seconds = statistics.median(times)
+    return {
+        "chunks": len(chunks),
+        "seconds": round(seconds, 3),
+        "chunks_per_s": _rate(len(chunks), seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=50, help="pages in the synthetic site")
+    parser.add_argument("--paragraphs", type=int, default=20, help="body paragraphs per page")
+    parser.add_argument("--links", type=int, default=8, help="internal links per page")
+    parser.add_argument("--crawl-pages", type=int, default=10, help="crawler max_pages")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (median is reported)")
+    parser.add_argument("--workers", default="2,4",
+                        help="comma-separated process pool sizes for parallel clean+chunk (empty to skip)")
+    parser.add_argument("--pages-per-task", type=int, default=config.TEXT_PROCESS_BATCH,
+                        help="pages per pool task")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-crawl", action="store_true", help="skip the Playwright stage")
+    parser.add_argument("--skip-embed", action="store_true",
+                        help="skip the embedding model (words chunking, random vectors for the vector store)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    site = SyntheticSite(args.pages, args.paragraphs, args.links, args.seed)
+    results = {
+        "commit": _git_commit(),
+        "site": {"pages": args.pages, "paragraphs": args.paragraphs, "links": args.links},
+    }
+
+    if not args.skip_crawl:
+        results["crawl"] = bench_crawl(site, args.crawl_pages)
+
+    texts = list(site.texts().values())
+    # Token-aware chunking needs the model's tokenizer
+    mode = "words" if args.skip_embed else config.CHUNKING_MODE
+    results["text_processing"], chunks = bench_text(texts, args.repeat, mode)
+
+    workers = [int(w) for w in args.workers.split(",") if w.strip()]
+    if workers:
+        results["parallel_text_processing"] = bench_text_parallel(
+            texts, args.repeat, mode, workers, args.pages_per_task
+        )
+
+    if not args.skip_embed:
+        results["chunking"] = bench_chunking_modes(texts)
+
+    if args.skip_embed:
+        rng = random.Random(args.seed)
+        embeddings = [[rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)] for _ in chunks]
+    else:
+        results["embed"], embeddings = bench_embed(chunks, args.repeat)
+
+    results["vector_write"] = bench_vector_write(chunks, embeddings, args.repeat)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
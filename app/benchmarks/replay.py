@@ -0,0 +1,204 @@
+"""
+Replay recorded chat questions against the current retrieval pipeline.
+
+Streams user_message values from chat_logs (one bot, or a random sample
+across bots) through embed -> retrieve -> prompt at a controlled rate and
+compares with what was recorded: retrieval latency (from the stored
+stage_timings), overlap between retrieved sources and the stored
+retrieved_sources and, with --llm, the answers. Prints JSON.
+
+Uses the configured DATABASE_URL and Chroma directory. --llm calls the
+configured provider (set LLM_PROVIDER=fake to avoid spending quota).
+
+Usage:
+    python -m app.benchmarks.replay --bot-id <id> --limit 200 --rate 5
+    python -m app.benchmarks.replay --sample 500 --llm --details
+"""
+import argparse
+import difflib
+import json
+import logging
+import statistics
+import time
+
+from sqlalchemy import func
+
+from app import models
+from app.db import SessionLocal
+
+# Original stage names (see routers/chat.py) that make up retrieval
+_RETRIEVAL_STAGES = ("chat_embed_query", "chat_retrieve")
+
+
+def _jaccard(a: set, b: set) -> float | None:
+    if not a and not b:
+        return None
+    return len(a & b) / len(a | b)
+
+
+def _mean(values: list) -> float | None:
+    values = [v for v in values if v is not None]
+    return round(statistics.mean(values), 4) if values else None
+
+
+def _pct(values: list, pct: float) -> float | None:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))], 2)
+
+
+def _recorded(log: models.ChatLog) -> tuple[float | None, list]:
+    """
+    (recorded retrieval ms, recorded sources) of one ChatLog row.
+    Rows written before stage timings existed have no retrieval time.
+    """
+    retrieval_ms = None
+    if log.stage_timings:
+        try:
+            stages = json.loads(log.stage_timings)
+            if all(s in stages for s in _RETRIEVAL_STAGES):
+                retrieval_ms = sum(stages[s] for s in _RETRIEVAL_STAGES)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        sources = json.loads(log.retrieved_sources) if log.retrieved_sources else []
+    except (TypeError, ValueError):
+        sources = []
+    return retrieval_ms, sources
+
+
+def iter_logs(db, bot_id: str | None, sample: int | None, limit: int | None):
+    """
+    Stream (public bot_id, active index, ChatLog) rows without loading the table in memory.
+    """
+    query = db.query(models.Bot.bot_id, models.Bot.active_index, models.ChatLog).join(
+        models.Bot, models.ChatLog.bot_id == models.Bot.id
+    )
+    if bot_id:
+        query = query.filter(models.Bot.bot_id == bot_id).order_by(models.ChatLog.created_at.desc())
+        if limit:
+            query = query.limit(limit)
+    else:
+        query = query.order_by(func.random()).limit(sample or limit or 100)
+
+    yield from query.yield_per(100)
+
+
+def replay_one(
+    bot_id: str, log: models.ChatLog, use_llm: bool, top_k: int, index: str | None = None
+) -> dict:
+    from app.services.embeddings import embed_text
+    from app.services.rag import build_rag_prompt
+    from app.services.vector_store import retrieve_chunks
+
+    start = time.perf_counter()
+    query_vec = embed_text([log.user_message])[0]
+    chunks, metadatas = retrieve_chunks(bot_id, query_vec, top_k=top_k, index=index)
+    retrieval_ms = (time.perf_counter() - start) * 1000
+
+    prompt = build_rag_prompt(chunks, log.user_message)
+
+    recorded_ms, recorded_sources = _recorded(log)
+    result = {
+        "chat_log_id": log.id,
+        "bot_id": bot_id,
+        "recorded_retrieval_ms": recorded_ms,
+        "retrieval_ms": round(retrieval_ms, 2),
+        "retrieval_delta_ms": (
+            round(retrieval_ms - recorded_ms, 2) if recorded_ms is not None else None
+        ),
+        "chunk_overlap": _jaccard(
+            {s.get("text") for s in recorded_sources}, set(chunks)
+        ),
+        "page_overlap": _jaccard(
+            {s.get("page_url") for s in recorded_sources if s.get("page_url")},
+            {m.get("page_url") for m in metadatas if m and m.get("page_url")},
+        ),
+        "prompt_chars": len(prompt),
+    }
+
+    if use_llm and chunks:
+        from app.services.model_router import generate_routed_answer
+
+        start = time.perf_counter()
+        try:
+            answer = generate_routed_answer(prompt, log.user_message, chunks)
+            result["answer_similarity"] = round(
+                difflib.SequenceMatcher(None, log.bot_response, answer).ratio(), 4
+            )
+        except Exception as e:
+            result["llm_error"] = str(e)
+        result["llm_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return result
+
+
+def summarize(results: list[dict]) -> dict:
+    def column(name):
+        return [r.get(name) for r in results]
+
+    summary = {
+        "replayed": len(results),
+        "bots": len({r["bot_id"] for r in results}),
+        "retrieval_ms": {
+            "recorded_p50": _pct(column("recorded_retrieval_ms"), 50),
+            "recorded_p95": _pct(column("recorded_retrieval_ms"), 95),
+            "replay_p50": _pct(column("retrieval_ms"), 50),
+            "replay_p95": _pct(column("retrieval_ms"), 95),
+            "delta_p50": _pct(column("retrieval_delta_ms"), 50),
+            "delta_mean": _mean(column("retrieval_delta_ms")),
+        },
+        "mean_chunk_overlap": _mean(column("chunk_overlap")),
+        "mean_page_overlap": _mean(column("page_overlap")),
+        "identical_sources": sum(1 for r in results if r["chunk_overlap"] == 1.0),
+    }
+    if any("llm_ms" in r for r in results):
+        similarities = column("answer_similarity")
+        summary["llm"] = {
+            "p50_ms": _pct(column("llm_ms"), 50),
+            "p95_ms": _pct(column("llm_ms"), 95),
+            "errors": sum(1 for r in results if "llm_error" in r),
+            "mean_answer_similarity": _mean(similarities),
+            "changed_answers": sum(1 for s in similarities if s is not None and s < 1.0),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bot-id", help="replay this bot's most recent questions")
+    parser.add_argument("--sample", type=int, help="random sample of questions across all bots")
+    parser.add_argument("--limit", type=int, help="max questions for --bot-id")
+    parser.add_argument("--rate", type=float, default=0, help="questions per second (0 = as fast as possible)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--llm", action="store_true", help="also generate answers and compare them")
+    parser.add_argument("--details", action="store_true", help="include per-question results")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    interval = 1 / args.rate if args.rate > 0 else 0
+    results = []
+    db = SessionLocal()
+    try:
+        next_at = time.perf_counter()
+        for bot_id, index, log in iter_logs(db, args.bot_id, args.sample, args.limit):
+            if interval:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_at += interval
+            results.append(replay_one(bot_id, log, args.llm, args.top_k, index))
+    finally:
+        db.close()
+
+    output = {"summary": summarize(results)}
+    if args.details:
+        output["results"] = results
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
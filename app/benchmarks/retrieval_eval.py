@@ -0,0 +1,334 @@
+"""
+Retrieval quality / speed evaluation across chunking and index settings.
+
+For every combination of chunk size, overlap, index type (Chroma HNSW or
+exact brute force), HNSW space / M / ef and top_k, the labeled sites are
+chunked, embedded and indexed, then every question is run. The report has
+recall@k, MRR, query latency, index size and build time per combination,
+printed as a table (or JSON with --json).
+
+Dataset (--dataset file.json); without it a synthetic fixture site is used:
+    {"sites": [{
+        "name": "acme",
+        "pages": {"https://acme.com/pricing": "page text ...", ...},
+        "questions": [{
+            "question": "How much is the pro plan?",
+            "expected_pages": ["https://acme.com/pricing"],
+            "expected_text": ["pro plan costs"]      # optional, chunk-level labels
+        }]
+    }]}
+A site may give "url" instead of "pages" to crawl it once (needs Playwright).
+
+Usage:
+    python -m app.benchmarks.retrieval_eval --chunk-sizes 120,220,320 --overlaps 0,40 --top-k 3,5
+    python -m app.benchmarks.retrieval_eval --chunking tokens --chunk-sizes 128,254 --overlaps 48
+    python -m app.benchmarks.retrieval_eval --dataset labels.json --index hnsw,exact --hnsw-m 16,32 --ef 10,100
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from app.benchmarks.fixtures import SyntheticSite
+from app.services.text_processing import process_text_to_chunks
+from app.services.vector_store import get_or_create_collection
+
+
+# -----------------------------------------------------
+# DATASET
+# -----------------------------------------------------
+def synthetic_dataset(pages: int, paragraphs: int, per_page: int = 2) -> dict:
+    """
+    Questions are sentences taken from one page's body; that page is the expected hit.
+    """
+    site = SyntheticSite(pages=pages, paragraphs=paragraphs)
+    texts = site.texts()
+    questions = []
+    for i in range(pages):
+        body = site.body(i)
+        for n in range(per_page):
+            sentence = body[(n * 7) % len(body)].split(".")[0]
+            questions.append({
+                "question": sentence.lower() + "?",
+                "expected_pages": [site.path(i)],
+                "expected_text": [sentence],
+            })
+    return {"sites": [{"name": "synthetic", "pages": texts, "questions": questions}]}
+
+
+def load_dataset(path: str, max_pages: int) -> dict:
+    with open(path, encoding="utf-8") as f:
+        dataset = json.load(f)
+
+    for site in dataset["sites"]:
+        if "pages" not in site:
+            from app.services.crawler import crawl_website
+            site["pages"] = crawl_website(site["url"], max_pages=max_pages)
+    return dataset
+
+
+# -----------------------------------------------------
+# INDEXES
+# -----------------------------------------------------
+class ExactIndex:
+    """
+    Brute-force cosine search: the recall ceiling for the HNSW settings.
+    """
+
+    def __init__(self, embeddings: np.ndarray):
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self._matrix = embeddings / np.where(norms == 0, 1, norms)
+        self.size_bytes = self._matrix.nbytes
+
+    def query(self, vector: np.ndarray, k: int) -> list[int]:
+        scores = self._matrix @ (vector / (np.linalg.norm(vector) or 1))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+class ChromaIndex:
+    """
+    The production index (Chroma HNSW) built in a temp directory.
+    """
+
+    def __init__(self, embeddings: np.ndarray, path: str, hnsw: dict):
+        client = chromadb.PersistentClient(path=path)
+        self._collection = get_or_create_collection(client, hnsw=hnsw)
+        ids = [str(i) for i in range(len(embeddings))]
+        # Chroma limits the batch size of one add()
+        batch = client.get_max_batch_size()
+        for start in range(0, len(ids), batch):
+            self._collection.add(
+                ids=ids[start:start + batch],
+                embeddings=embeddings[start:start + batch].tolist(),
+            )
+        self._path = path
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(self._path)
+            for name in files
+        )
+
+    def query(self, vector: np.ndarray, k: int) -> list[int]:
+        result = self._collection.query(
+            query_embeddings=[vector.tolist()], n_results=k, include=[]
+        )
+        return [int(i) for i in result["ids"][0]]
+
+
+# -----------------------------------------------------
+# EVALUATION
+# -----------------------------------------------------
+def chunk_sites(sites: list, chunk_size: int, overlap: int, mode: str) -> tuple[list, list]:
+    """
+    All chunks of all sites: (texts, [(site index, page_url)]).
+    Sizes are words or model tokens depending on the chunking mode.
+    """
+    texts, owners = [], []
+    for site_index, site in enumerate(sites):
+        for page_url, text in site["pages"].items():
+            for chunk in process_text_to_chunks(
+                text, mode=mode,
+                max_words=chunk_size, overlap_words=overlap,
+                max_tokens=chunk_size, overlap_tokens=overlap,
+            ):
+                texts.append(chunk)
+                owners.append((site_index, page_url))
+    return texts, owners
+
+
+def _is_relevant(chunk: str, page_url: str, question: dict) -> bool:
+    if question.get("expected_text"):
+        lower = chunk.lower()
+        return any(t.lower() in lower for t in question["expected_text"])
+    return page_url in question.get("expected_pages", [])
+
+
+def score_question(hits: list[int], texts: list, owners: list, question: dict) -> dict:
+    retrieved_pages = [owners[i][1] for i in hits]
+    expected_pages = set(question.get("expected_pages", []))
+
+    reciprocal_rank = 0.0
+    for rank, i in enumerate(hits, start=1):
+        if _is_relevant(texts[i], owners[i][1], question):
+            reciprocal_rank = 1 / rank
+            break
+
+    scores = {
+        "recall": (
+            len(expected_pages & set(retrieved_pages)) / len(expected_pages)
+            if expected_pages else None
+        ),
+        "rr": reciprocal_rank,
+    }
+    if question.get("expected_text"):
+        joined = " ".join(texts[i] for i in hits).lower()
+        found = sum(1 for t in question["expected_text"] if t.lower() in joined)
+        scores["chunk_recall"] = found / len(question["expected_text"])
+    return scores
+
+
+def _site_hits(index, vector, k: int, site_index: int, owners: list) -> list[int]:
+    """
+    Every bot has its own index; with one shared index, over-fetch and keep
+    this site's chunks so other sites in the dataset don't interfere.
+    """
+    fetch = k
+    while True:
+        hits = index.query(vector, min(fetch, len(owners)))
+        own = [i for i in hits if owners[i][0] == site_index]
+        if len(own) >= k or fetch >= len(owners):
+            return own[:k]
+        fetch *= 4
+
+
+def evaluate(sites: list, question_vectors: list, texts: list, owners: list,
+             index, top_k: int) -> dict:
+    recalls, chunk_recalls, rrs, latencies = [], [], [], []
+    for site_index, site in enumerate(sites):
+        for question, vector in zip(site["questions"], question_vectors[site_index]):
+            start = time.perf_counter()
+            hits = _site_hits(index, vector, top_k, site_index, owners)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            scores = score_question(hits, texts, owners, question)
+            if scores["recall"] is not None:
+                recalls.append(scores["recall"])
+            if "chunk_recall" in scores:
+                chunk_recalls.append(scores["chunk_recall"])
+            rrs.append(scores["rr"])
+
+    latencies.sort()
+    return {
+        "recall_at_k": round(statistics.mean(recalls), 4) if recalls else None,
+        "chunk_recall_at_k": round(statistics.mean(chunk_recalls), 4) if chunk_recalls else None,
+        "mrr": round(statistics.mean(rrs), 4) if rrs else None,
+        "query_ms_p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+        "query_ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+    }
+
+
+def index_configs(args) -> list[dict]:
+    configs = []
+    for index_type in args.index:
+        if index_type == "exact":
+            configs.append({"index": "exact"})
+            continue
+        for space, m, ef in itertools.product(args.spaces, args.hnsw_m, args.ef):
+            configs.append({
+                "index": "hnsw",
+                "hnsw": {"space": space, "M": m, "search_ef": ef,
+                         "construction_ef": max(ef, args.ef_construction)},
+            })
+    return configs
+
+
+def run(dataset: dict, args) -> list[dict]:
+    from app.services.embeddings import embed_text
+
+    sites = dataset["sites"]
+    question_vectors = [
+        np.asarray(embed_text([q["question"] for q in site["questions"]]))
+        for site in sites
+    ]
+
+    rows = []
+    for chunk_size, overlap in itertools.product(args.chunk_sizes, args.overlaps):
+        if overlap >= chunk_size:
+            continue
+        texts, owners = chunk_sites(sites, chunk_size, overlap, args.chunking)
+        start = time.perf_counter()
+        embeddings = np.asarray(embed_text(texts))
+        embed_ms = (time.perf_counter() - start) * 1000
+
+        for config in index_configs(args):
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                if config["index"] == "exact":
+                    index = ExactIndex(embeddings)
+                else:
+                    index = ChromaIndex(embeddings, tmp, config["hnsw"])
+                build_ms = (time.perf_counter() - start) * 1000
+                size_bytes = index.size_bytes
+
+                for top_k in args.top_k:
+                    rows.append({
+                        "chunking": args.chunking,
+                        "chunk_size": chunk_size,
+                        "overlap": overlap,
+                        "chunks": len(texts),
+                        "index": config["index"],
+                        **config.get("hnsw", {}),
+                        "top_k": top_k,
+                        **evaluate(sites, question_vectors, texts, owners, index, top_k),
+                        "index_kb": round(size_bytes / 1024, 1),
+                        "embed_ms": round(embed_ms, 1),
+                        "index_build_ms": round(build_ms, 1),
+                    })
+    return rows
+
+
+def print_table(rows: list[dict]):
+    columns = list(dict.fromkeys(k for row in rows for k in row))
+    cells = [[("" if row.get(c) is None else str(row.get(c))) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def _strs(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dataset", help="labeled questions JSON (default: synthetic site)")
+    parser.add_argument("--pages", type=int, default=30, help="synthetic site pages")
+    parser.add_argument("--paragraphs", type=int, default=20, help="synthetic paragraphs per page")
+    parser.add_argument("--max-pages", type=int, default=10, help="crawl budget for sites given by url")
+    parser.add_argument("--chunking", choices=["words", "tokens"], default="words",
+                        help="unit of --chunk-sizes / --overlaps")
+    parser.add_argument("--chunk-sizes", type=_ints, default=[220], help="chunk sizes (words or tokens)")
+    parser.add_argument("--overlaps", type=_ints, default=[40], help="overlaps (words or tokens)")
+    parser.add_argument("--top-k", type=_ints, default=[3])
+    parser.add_argument("--index", type=_strs, default=["hnsw"], help="hnsw and/or exact")
+    parser.add_argument("--spaces", type=_strs, default=["cosine"], help="HNSW distance: cosine, l2, ip")
+    parser.add_argument("--hnsw-m", type=_ints, default=[16], help="HNSW M (max neighbours)")
+    parser.add_argument("--ef", type=_ints, default=[10], help="HNSW search ef")
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    dataset = (
+        load_dataset(args.dataset, args.max_pages) if args.dataset
+        else synthetic_dataset(args.pages, args.paragraphs)
+    )
+    rows = run(dataset, args)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,54 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app import config
+
 # -----------------------------------------
-# DATABASE URL (SQLite)
+# DATABASE URL (SQLite by default, see DATABASE_URL)
 # -----------------------------------------
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.db"
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """
+    Create the SQLAlchemy engine with settings suited to the backend:
+
+    - SQLite: WAL journal (readers never block the writer), synchronous=NORMAL
+      and a busy_timeout so concurrent writers wait instead of failing with
+      "database is locked".
+    - Server databases (Postgres): sized connection pool with pre-ping
+      and periodic recycling of idle connections.
+    """
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+        )
+
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.close()
+
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+        pool_recycle=config.DB_POOL_RECYCLE_S,
+        pool_pre_ping=True,
+    )
+
 
-# For SQLite, we need connect_args
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 
 # Create a Session class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -25,3 +64,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# -----------------------------------------
+# SCHEMA SYNC
+# -----------------------------------------
+def sync_schema(bind=engine):
+    """
+    create_all() only creates missing tables, it never alters existing ones.
+    Add columns and indexes introduced after a table was first created so older
+    database files keep working (new columns are nullable, existing rows get NULL).
+    """
+    inspector = inspect(bind)
+
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            col_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}")
+                )
+
+        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=bind)
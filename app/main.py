@@ -1,15 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 app = FastAPI()
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 import logging
 
-from .db import Base, engine
+from .db import Base, engine, sync_schema
 from app import models
 from .routers import bots, chat
 from .routers import bots, chat, auth 
 from app.routers import bots, chat, auth, admin 
+from app.routers import metrics
+from app.services.build_jobs import build_watchdog
+from app.services.chat_log_writer import chat_log_writer
+from app.services.pagination import InvalidCursor, NEXT_CURSOR_HEADER
+from app.services.text_processing import get_process_pool, shutdown_process_pool
 
 
 # -----------------------------
@@ -35,17 +41,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # includes OPTIONS
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # keyset pagination cursor
 )
 
 
+# -----------------------------
+# ERROR HANDLERS
+# -----------------------------
+@app.exception_handler(InvalidCursor)
+def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
 # -----------------------------
 # DATABASE TABLE CREATION
 # -----------------------------
 logger.info("Creating database tables if not exist...")
 Base.metadata.create_all(bind=engine)
+sync_schema(engine)
 logger.info("Database setup complete.")
 
 
+# -----------------------------
+# BACKGROUND WORKERS
+# -----------------------------
+@app.on_event("startup")
+def start_background_workers():
+    # Warm text-processing pool (no-op when TEXT_PROCESS_WORKERS=0); started
+    # before other threads so the workers fork from a quiet process
+    get_process_pool()
+    chat_log_writer.start()
+    # Resume builds a previous run of the server left in "processing"
+    build_watchdog.start()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    build_watchdog.stop()
+    # Drain queued ChatLog rows / counters before the process exits
+    chat_log_writer.stop()
+    shutdown_process_pool()
+
+
 # -----------------------------
 # STATIC FILES & TEMPLATES
 # -----------------------------
@@ -60,4 +97,5 @@ app.include_router(bots.router, prefix="/bots", tags=["Bots"])
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(admin.router, tags=["admin"])
+app.include_router(metrics.router, tags=["Metrics"])
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .db import Base
@@ -19,6 +19,9 @@ class User(Base):
     # Role: superadmin / client
     role = Column(String, default="client")
 
+    # Bumped on role changes: tokens carrying an older version are rejected
+    token_version = Column(Integer, default=0)
+
     # One user -> Many bots
     bots = relationship("Bot", back_populates="owner", cascade="all, delete")
 
@@ -28,7 +31,14 @@ class User(Base):
 # -----------------------------
 class Bot(Base):
     __tablename__ = "bots"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # create_bot looks up (user, url) before creating a new bot
+        Index("ix_bots_user_id_website_url", "user_id", "website_url"),
+        # /bots/my and admin listings page by (created_at, id)
+        Index("ix_bots_user_id_created_at", "user_id", "created_at"),
+        Index("ix_bots_created_at_id", "created_at", "id"),
+        {"extend_existing": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -38,10 +48,30 @@ class Bot(Base):
 
     status = Column(String, default="processing")
     vector_index_path = Column(String, nullable=True)
+
+    # Chroma collection chat reads from (NULL = "docs", bots built before
+    # blue/green builds); switched when a new build is complete
+    active_index = Column(String, nullable=True)
+    # Previous collection, dropped once chats can no longer be reading it
+    retired_index = Column(String, nullable=True)
+    retired_at = Column(DateTime, nullable=True)
+
+    # Running build, if processing_started_at is set (see services/build_jobs.py):
+    # kind (create / refresh / reindex), the collection it writes, when it was
+    # started or last resumed, and how many times it was resumed after stopping
+    build_kind = Column(String, nullable=True)
+    building_index = Column(String, nullable=True)
+    processing_started_at = Column(DateTime, nullable=True)
+    build_attempts = Column(Integer, default=0)
+    # Set by POST /admin/reindex; the build watchdog runs queued re-indexes
+    reindex_requested_at = Column(DateTime, nullable=True)
     
     message_count = Column(Integer, default=0)
     last_used_at = Column(DateTime, nullable=True)
 
+    # LLM tier: auto / fast / strong (NULL behaves like auto)
+    model_tier = Column(String, default="auto", nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
 
     owner = relationship("User", back_populates="bots")
@@ -68,6 +98,9 @@ class ChatSession(Base):
 
 class ChatLog(Base):
     __tablename__ = "chat_logs"
+    __table_args__ = (
+        Index("ix_chat_logs_bot_id_created_at", "bot_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -81,6 +114,67 @@ class ChatLog(Base):
 
     response_time_ms = Column(Integer, nullable=True)  # how long LLM took
 
+    stage_timings = Column(String, nullable=True)  # JSON {stage: ms}
+
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    bot = relationship("Bot")
\ No newline at end of file
+    bot = relationship("Bot")
+
+
+# -----------------------------
+# BOT USAGE ROLLUP MODEL
+# -----------------------------
+class BotUsageRollup(Base):
+    """
+    Pre-aggregated per-bot usage for one hour or one day,
+    maintained incrementally by the ChatLog write-behind buffer.
+    """
+    __tablename__ = "bot_usage_rollups"
+    __table_args__ = (
+        UniqueConstraint("bot_id", "granularity", "bucket_start", name="uq_bot_usage_bucket"),
+        Index("ix_bot_usage_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bot_id = Column(Integer, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+
+    granularity = Column(String, nullable=False)  # "hour" / "day"
+    bucket_start = Column(DateTime, nullable=False)
+
+    request_count = Column(Integer, default=0)
+    cache_hit_count = Column(Integer, default=0)  # answers shared from an in-flight call
+    error_count = Column(Integer, default=0)
+    total_response_ms = Column(Integer, default=0)
+
+    # JSON list of counts per latency_histogram.BUCKET_BOUNDS_MS bucket
+    latency_histogram = Column(String, nullable=False)
+
+
+# -----------------------------
+# BOT BUILD REPORT MODEL
+# -----------------------------
+class BotBuildReport(Base):
+    """
+    Profile of one create / refresh run (see services/build_report.py).
+    Summary columns are queryable; the full per-page report is JSON.
+    """
+    __tablename__ = "bot_build_reports"
+    __table_args__ = (
+        Index("ix_bot_build_reports_bot_id_started_at", "bot_id", "started_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bot_id = Column(Integer, ForeignKey("bots.id", ondelete="CASCADE"), nullable=False)
+
+    kind = Column(String, nullable=False)  # "create" / "refresh"
+    status = Column(String, nullable=False)  # "ready" / "failed"
+    pipeline_version = Column(String, nullable=False, index=True)
+
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+
+    pages_fetched = Column(Integer, default=0)
+    chunk_count = Column(Integer, default=0)
+
+    report = Column(String, nullable=False)  # JSON BuildReport.to_dict()
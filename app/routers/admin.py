@@ -1,14 +1,31 @@
 import logging
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, or_
 
 from app.db import get_db
 from app import models, schemas
-from app.routers.auth import get_current_user
+from app.routers.auth import get_current_user, get_token_principal
+from app.services.user_cache import UserPrincipal, user_cache
 from app.services.vector_store import reset_chroma_for_bot
+from app.services.build_jobs import build_watchdog, queue_reindex
+from app.services.build_report import PIPELINE_VERSION
+from app.services.snapshots import delete_bot_snapshots, list_snapshots
+from app.services.model_router import model_stats
+from app.services.singleflight import answer_flight
+from app.services.admission import llm_slots, rate_limiter
+from app.services.usage_rollups import get_platform_usage
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    after_id,
+    before_created,
+    encode_cursor,
+    split_page,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -18,86 +35,120 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 # ---------------------------------------------------
 # Helper: ensure caller is SUPER ADMIN
 # ---------------------------------------------------
-def ensure_super_admin(current_user: models.User):
+def ensure_super_admin(current_user: UserPrincipal):
     if current_user.role != "super_admin":
         raise HTTPException(status_code=403, detail="Admin access only")
 
 
 # ---------------------------------------------------
 # 1) LIST ALL USERS  (ADMIN ONLY)
+#    Keyset pagination by id: ?limit=50&cursor=<X-Next-Cursor>
+#    Optional filters: ?role=client&email=acme
 # ---------------------------------------------------
 @router.get("/users", response_model=List[schemas.AdminUserSummary])
 def list_users(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    role: str | None = None,
+    email: str | None = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_token_principal),
 ):
     """
-    Admin: see all users + how many bots each has.
+    Admin: see users + how many bots each has, one page at a time.
+    Bot counts come from a single GROUP BY over the page's users.
     """
     ensure_super_admin(current_user)
 
-    users = db.query(models.User).all()
-    out: list[schemas.AdminUserSummary] = []
+    query = db.query(models.User)
+    if role is not None:
+        query = query.filter(models.User.role == role)
+    if email:
+        query = query.filter(models.User.email.ilike(f"%{email}%"))
 
-    for u in users:
-        bot_count = (
-            db.query(models.Bot)
-            .filter(models.Bot.user_id == u.id)
-            .count()
-        )
+    query = after_id(query, models.User.id, cursor)
+    users, has_more = split_page(
+        query.order_by(models.User.id.asc()).limit(limit + 1).all(), limit
+    )
 
-        out.append(
-            schemas.AdminUserSummary(
-                id=u.id,
-                email=u.email,
-                name=u.name,
-                role=u.role,
-                bot_count=bot_count,
-            )
+    bot_counts = dict(
+        db.query(models.Bot.user_id, func.count(models.Bot.id))
+        .filter(models.Bot.user_id.in_([u.id for u in users]))
+        .group_by(models.Bot.user_id)
+        .all()
+    ) if users else {}
+
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(users[-1].id)
+
+    return [
+        schemas.AdminUserSummary(
+            id=u.id,
+            email=u.email,
+            name=u.name,
+            role=u.role,
+            bot_count=bot_counts.get(u.id, 0),
         )
-
-    return out
+        for u in users
+    ]
 
 
 # ---------------------------------------------------
 # 2) LIST ALL BOTS (ADMIN ONLY)
-#    Optional filter: ?owner_id=123
+#    Keyset pagination, newest first: ?limit=50&cursor=<X-Next-Cursor>
+#    Optional filters: ?owner_id=123&status=ready&website=example.com
 # ---------------------------------------------------
 @router.get("/bots", response_model=List[schemas.AdminBotSummary])
 def list_bots(
+    response: Response,
     owner_id: int | None = None,
+    status: str | None = None,
+    website: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_token_principal),
 ):
     """
-    Admin: see all bots in the system.
-    Optional: filter by owner_id.
+    Admin: see bots in the system, one page at a time.
+    Owners are loaded in the same query (no per-bot lookups).
     """
     ensure_super_admin(current_user)
 
-    query = db.query(models.Bot)
+    query = db.query(models.Bot).options(joinedload(models.Bot.owner))
 
     if owner_id is not None:
         query = query.filter(models.Bot.user_id == owner_id)
+    if status is not None:
+        query = query.filter(models.Bot.status == status)
+    if website:
+        query = query.filter(models.Bot.website_url.ilike(f"%{website}%"))
+
+    query = before_created(query, models.Bot.created_at, models.Bot.id, cursor)
+    bots, has_more = split_page(
+        query.order_by(models.Bot.created_at.desc(), models.Bot.id.desc())
+        .limit(limit + 1)
+        .all(),
+        limit,
+    )
 
-    bots = query.all()
-    out: list[schemas.AdminBotSummary] = []
-
-    for b in bots:
-        out.append(
-            schemas.AdminBotSummary(
-                bot_id=b.bot_id,
-                owner_id=b.user_id,
-                owner_email=b.owner.email if b.owner else None,
-                website_url=b.website_url,
-                status=b.status,
-                message_count=b.message_count or 0,
-                created_at=b.created_at,
-                last_used_at=b.last_used_at,
-            )
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(bots[-1].created_at, bots[-1].id)
+
+    return [
+        schemas.AdminBotSummary(
+            bot_id=b.bot_id,
+            owner_id=b.user_id,
+            owner_email=b.owner.email if b.owner else None,
+            website_url=b.website_url,
+            status=b.status,
+            message_count=b.message_count or 0,
+            created_at=b.created_at,
+            last_used_at=b.last_used_at,
         )
-
-    return out
+        for b in bots
+    ]
 
 
 # ---------------------------------------------------
@@ -106,7 +157,7 @@ def list_bots(
 @router.get("/stats", response_model=schemas.SaaSStats)
 def get_saas_stats(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_token_principal),
 ):
     """
     Admin: high-level stats for the whole platform.
@@ -129,6 +180,180 @@ def get_saas_stats(
     )
 
 
+# ---------------------------------------------------
+# 3a) PLATFORM USAGE ROLLUPS (ADMIN ONLY)
+# ---------------------------------------------------
+@router.get("/usage", response_model=List[schemas.UsageBucket])
+def get_platform_usage_rollups(
+    granularity: Literal["hour", "day"] = "day",
+    limit: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Admin: hourly or daily usage summed over all bots,
+    read from the pre-aggregated rollups.
+    """
+    ensure_super_admin(current_user)
+
+    return get_platform_usage(db, granularity, limit)
+
+
+# ---------------------------------------------------
+# 3b) LLM MODEL ROUTING STATS (ADMIN ONLY)
+# ---------------------------------------------------
+@router.get("/llm/models", response_model=List[schemas.ModelRouteStats])
+def get_model_stats(
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Admin: per-model call counts, errors and average latency
+    as seen by the model router.
+    """
+    ensure_super_admin(current_user)
+
+    return [
+        schemas.ModelRouteStats(model=model, **stats)
+        for model, stats in model_stats.snapshot().items()
+    ]
+
+
+@router.get("/llm/coalescing", response_model=schemas.CoalescingStats)
+def get_coalescing_stats(
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Admin: how many chat answers reused an identical in-flight LLM call.
+    """
+    ensure_super_admin(current_user)
+
+    return schemas.CoalescingStats(**answer_flight.stats())
+
+
+@router.get("/admission", response_model=schemas.AdmissionStats)
+def get_admission_stats(
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Admin: rate-limit rejections per scope and LLM concurrency / queue-time stats.
+    """
+    ensure_super_admin(current_user)
+
+    return schemas.AdmissionStats(
+        rate_limited=rate_limiter.stats(),
+        llm_slots=llm_slots.stats(),
+    )
+
+
+# ---------------------------------------------------
+# 3c) BUILD REPORTS ACROSS BOTS (ADMIN ONLY)
+#    ?order=slowest to find slow sites,
+#    ?pipeline_version=2 to compare pipeline versions
+# ---------------------------------------------------
+@router.get("/build-reports", response_model=List[schemas.BuildReportOut])
+def list_all_build_reports(
+    order: Literal["recent", "slowest"] = "recent",
+    pipeline_version: str | None = None,
+    status: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Admin: build profiles across all bots.
+    """
+    ensure_super_admin(current_user)
+
+    query = (
+        db.query(models.BotBuildReport, models.Bot.bot_id)
+        .join(models.Bot, models.Bot.id == models.BotBuildReport.bot_id)
+    )
+    if pipeline_version is not None:
+        query = query.filter(models.BotBuildReport.pipeline_version == pipeline_version)
+    if status is not None:
+        query = query.filter(models.BotBuildReport.status == status)
+
+    if order == "slowest":
+        query = query.order_by(models.BotBuildReport.duration_ms.desc())
+    else:
+        query = query.order_by(models.BotBuildReport.started_at.desc())
+
+    return [
+        schemas.BuildReportOut.from_row(public_bot_id, row)
+        for row, public_bot_id in query.limit(limit).all()
+    ]
+
+
+# ---------------------------------------------------
+# 3d) RE-INDEX FROM CRAWL SNAPSHOTS (ADMIN ONLY)
+#    After a cleaning / chunking / embedding change: rebuild bots
+#    whose last build ran an older pipeline, without crawling again
+# ---------------------------------------------------
+@router.post("/reindex", response_model=List[schemas.ReindexResult])
+def reindex_bots(
+    stale_only: bool = True,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    """
+    Admin: queue up to `limit` bots for a re-index from their latest
+    snapshot; the build watchdog runs them one at a time in the background
+    (follow progress in /admin/build-reports). With stale_only, only bots
+    whose latest build report has another pipeline_version than the
+    current one. Bots without a snapshot are skipped.
+    """
+    ensure_super_admin(current_user)
+
+    latest = (
+        db.query(
+            models.BotBuildReport.bot_id,
+            func.max(models.BotBuildReport.started_at).label("started_at"),
+        )
+        .group_by(models.BotBuildReport.bot_id)
+        .subquery()
+    )
+    query = (
+        db.query(models.Bot)
+        .outerjoin(latest, latest.c.bot_id == models.Bot.id)
+        .outerjoin(
+            models.BotBuildReport,
+            (models.BotBuildReport.bot_id == latest.c.bot_id)
+            & (models.BotBuildReport.started_at == latest.c.started_at),
+        )
+        .filter(
+            models.Bot.processing_started_at.is_(None),
+            models.Bot.status != "processing",
+            models.Bot.reindex_requested_at.is_(None),
+        )
+    )
+    if stale_only:
+        query = query.filter(or_(
+            models.BotBuildReport.pipeline_version.is_(None),
+            models.BotBuildReport.pipeline_version != PIPELINE_VERSION,
+        ))
+
+    results: List[schemas.ReindexResult] = []
+    scheduled: List[models.Bot] = []
+    for bot in query.order_by(models.Bot.id).limit(limit).all():
+        if not list_snapshots(bot.bot_id):
+            results.append(schemas.ReindexResult(
+                bot_id=bot.bot_id, status="skipped", detail="no snapshot"
+            ))
+            continue
+        scheduled.append(bot)
+        results.append(schemas.ReindexResult(bot_id=bot.bot_id, status="scheduled"))
+
+    queue_reindex(db, scheduled)
+    build_watchdog.wake()
+
+    logger.info(
+        f"[Admin] Queued {len(scheduled)} bots for re-index "
+        f"({len(results) - len(scheduled)} skipped without snapshot)"
+    )
+    return results
+
+
 # ---------------------------------------------------
 # 4) DELETE BOT (ADMIN ONLY)
 # ---------------------------------------------------
@@ -136,7 +361,7 @@ def get_saas_stats(
 def admin_delete_bot(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
 ):
     """
     Admin: delete any bot + its Chroma index.
@@ -147,8 +372,9 @@ def admin_delete_bot(
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
 
-    # delete vector store folder
+    # delete vector store folder + crawl snapshots
     reset_chroma_for_bot(bot_id)
+    delete_bot_snapshots(bot_id)
 
     db.delete(bot)
     db.commit()
@@ -163,7 +389,7 @@ def admin_delete_bot(
 def admin_delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_user),
 ):
     """
     Admin: delete a user (and their bots via cascade).
@@ -174,11 +400,15 @@ def admin_delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Optionally: delete each bot's Chroma
+    # Optionally: delete each bot's Chroma + crawl snapshots
     for bot in user.bots:
         reset_chroma_for_bot(bot.bot_id)
+        delete_bot_snapshots(bot.bot_id)
 
     db.delete(user)
     db.commit()
 
+    # Cached principals / tokens of the deleted user must stop working
+    user_cache.invalidate(user_id)
+
     return {"detail": f"User {user_id} deleted (and their bots)"}
@@ -9,7 +9,8 @@ from sqlalchemy.orm import Session
 from fastapi.security import APIKeyHeader
 
 from app.db import get_db
-from app import models, schemas
+from app import config, models, schemas
+from app.services.user_cache import UserPrincipal, user_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 # ====================================
 SECRET_KEY = "super-secret-dev-key-change-me"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
+ACCESS_TOKEN_EXPIRE_MINUTES = config.ACCESS_TOKEN_EXPIRE_MINUTES
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -44,8 +45,11 @@ def get_password_hash(password):
 # ====================================
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # iat lets a deleted user's tokens be told apart from those of a new
+    # user that reuses the id
+    to_encode.update({"exp": expire, "iat": now})
 
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -53,10 +57,7 @@ def create_access_token(data: dict):
 # ====================================
 # READ TOKEN FROM Authorization HEADER
 # ====================================
-def get_current_user(
-    token: str = Depends(auth_header),
-    db: Session = Depends(get_db)
-):
+def _decode_token(token: str | None) -> dict:
     if not token:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
@@ -64,17 +65,86 @@ def get_current_user(
         token = token.split(" ")[1]
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+
+def _token_claims(user: models.User) -> dict:
+    return {
+        "user_id": user.id,
+        "role": user.role,
+        "email": user.email,
+        "name": user.name,
+        "ver": user.token_version or 0,
+    }
+
+
+def get_current_user(
+    token: str = Depends(auth_header),
+    db: Session = Depends(get_db)
+) -> UserPrincipal:
+    """
+    Verify the JWT and return the caller.
+    Verified users are cached for AUTH_USER_CACHE_TTL_S per (user_id, token version),
+    so most requests skip the users query.
+    """
+    payload = _decode_token(token)
+    user_id = payload.get("user_id")
+    token_version = payload.get("ver", 0)
+
+    principal = user_cache.get(user_id, token_version)
+    if principal:
+        return principal
+
     user = db.query(models.User).filter(models.User.id == user_id).first()
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    if (user.token_version or 0) != token_version:
+        raise HTTPException(status_code=401, detail="Token revoked, please log in again")
+
+    principal = UserPrincipal(
+        id=user.id,
+        email=user.email,
+        name=user.name,
+        role=user.role,
+        token_version=token_version,
+    )
+    user_cache.put(principal)
+    return principal
+
+
+def get_token_principal(
+    token: str = Depends(auth_header),
+    db: Session = Depends(get_db)
+) -> UserPrincipal:
+    """
+    For read-only endpoints.
+    With AUTH_CACHE_ONLY enabled the caller is built from the signed token
+    claims alone (no users query); revocations seen by this process still apply,
+    those made by other workers do not (single-worker deployments only).
+    Otherwise (or for older tokens without full claims) same as get_current_user.
+    """
+    if not config.AUTH_CACHE_ONLY:
+        return get_current_user(token, db)
+
+    payload = _decode_token(token)
+    if not all(k in payload for k in ("user_id", "role", "email", "name")):
+        return get_current_user(token, db)
+
+    token_version = payload.get("ver", 0)
+    if user_cache.is_revoked(payload["user_id"], token_version, payload.get("iat")):
+        raise HTTPException(status_code=401, detail="Token revoked, please log in again")
+
+    return UserPrincipal(
+        id=payload["user_id"],
+        email=payload["email"],
+        name=payload["name"],
+        role=payload["role"],
+        token_version=token_version,
+    )
 
 
 # ====================================
@@ -110,10 +180,7 @@ def login(payload: schemas.UserLogin, db: Session = Depends(get_db)):
     if not user or not verify_password(payload.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
-    token = create_access_token({
-        "user_id": user.id,
-        "role": user.role
-    })
+    token = create_access_token(_token_claims(user))
 
     return {"access_token": token, "token_type": "bearer"}
 
@@ -125,7 +192,7 @@ def set_user_role(
     user_id: int,
     new_role: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     # Ensure only the SUPER ADMIN can do this
     if current_user.role != "super_admin":
@@ -136,10 +203,12 @@ def set_user_role(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Update the role
+    # Update the role; older tokens (carrying the old role) stop working
     user.role = new_role
+    user.token_version = (user.token_version or 0) + 1
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user.id, min_version=user.token_version)
 
     return {
         "message": "Role updated successfully",
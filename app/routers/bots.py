@@ -1,27 +1,59 @@
 import logging
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app import models, schemas
 
-from app.services.crawler import crawl_website
-from app.services.text_processing import process_text_to_chunks
-from app.services.embeddings import embed_text
-from app.services.vector_store import add_chunks_to_chroma, reset_chroma_for_bot
-from app.routers.auth import get_current_user  # 👈 use this for auth
+from app.services.build_jobs import build_running, run_build, start_build
+from app.services.build_report import BuildReport
+from app.services.ingestion import build_bot_index, reindex_from_snapshot
+from app.services.snapshots import list_snapshots
+from app.services.user_cache import UserPrincipal
+from app.services.vector_store import new_index_name
+from app.services.usage_rollups import get_bot_usage
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    before_created,
+    encode_cursor,
+    split_page,
+)
+from app.routers.auth import get_current_user, get_token_principal  # 👈 use this for auth
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def rebuild_bot(db: Session, bot: models.Bot, report: BuildReport, build) -> int:
+    """
+    Run `build(index)` (returns the chunk count) into a new collection for
+    refresh / reindex. The bot keeps answering from its current index until
+    the new one is complete and validated, then switches over; a failed
+    build leaves the current index live.
+    Raises HTTPException(409) while another build runs, 500 when it fails.
+    """
+    if build_running(bot) or not start_build(db, bot, report.kind):
+        raise HTTPException(status_code=409, detail="A build is already running for this bot")
+
+    try:
+        return run_build(db, bot, report, build)
+    except Exception as e:
+        logger.exception(f"{report.kind.capitalize()} pipeline failed; bot stays {bot.status}.")
+        raise HTTPException(status_code=500, detail=f"Bot {report.kind} failed: {str(e)}")
+
+
 @router.post("/create", response_model=schemas.BotCreateResponse)
 def create_bot(
     payload: schemas.BotCreateRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),  # 👈 must be logged in
+    current_user: UserPrincipal = Depends(get_current_user),  # 👈 must be logged in
 ):
     """
     Complete multi-page pipeline:
@@ -31,6 +63,7 @@ def create_bot(
     4. Embed chunks
     5. Store into Chroma with page_url metadata
     6. Mark bot as READY
+    7. Save the build report (see GET /bots/{bot_id}/build-reports)
     """
 
     website_url = str(payload.website_url)
@@ -67,7 +100,11 @@ def create_bot(
         bot_id=bot_id,
         website_url=website_url,
         status="processing",
+        build_kind="create",
+        building_index=new_index_name(),
+        processing_started_at=datetime.utcnow(),
         vector_index_path=f"app/data/chroma/bots/{bot_id}",
+        model_tier=payload.model_tier,
         user_id=current_user.id,  # 👈 link to owner
     )
 
@@ -85,58 +122,17 @@ def create_bot(
     # -------------------------------------------------------------
     logger.info("Starting multi-page bot processing pipeline...")
 
+    report = BuildReport("create", website_url)
     try:
-        # 1️⃣ CRAWL WEBSITE
-        page_texts = crawl_website(website_url, max_pages=10)
-
-        if not page_texts:
-            raise Exception("No pages found or all pages were empty.")
-
-        logger.info(f"Crawled {len(page_texts)} pages.")
-
-        all_chunks = []
-        all_embeddings = []
-        all_metadatas = []
-
-        # 2️⃣ FOR EACH PAGE → CHUNK + EMBED + METADATA
-        for page_url, text in page_texts.items():
-            logger.info(f"Processing page: {page_url}")
-
-            chunks = process_text_to_chunks(text)
-            if not chunks:
-                logger.warning(f"No chunks created for page: {page_url}")
-                continue
-
-            embeddings = embed_text(chunks)
-
-            for c, e in zip(chunks, embeddings):
-                chunk_index = len(all_chunks)
-                all_chunks.append(c)
-                all_embeddings.append(e)
-                all_metadatas.append(
-                    {
-                        "bot_id": bot_id,
-                        "page_url": page_url,
-                        "chunk_index": chunk_index,
-                    }
-                )
-
-        if not all_chunks:
-            raise Exception("No chunks generated from the entire website.")
-
-        # 3️⃣ STORE IN CHROMA
-        logger.info(f"Saving {len(all_chunks)} chunks into Chroma for bot {bot_id}")
-        add_chunks_to_chroma(bot_id, all_chunks, all_embeddings, all_metadatas)
-
-        # 4️⃣ MARK BOT READY
-        new_bot.status = "ready"
-        db.commit()
-        logger.info(f"Bot {bot_id} fully generated and READY!")
+        # Marks the bot READY (or FAILED) and saves the report
+        chunk_count = run_build(
+            db, new_bot, report,
+            lambda index: build_bot_index(bot_id, website_url, report, index=index),
+        )
+        logger.info(f"Bot {bot_id} fully generated and READY with {chunk_count} chunks!")
 
     except Exception as e:
         logger.exception("Pipeline failed. Marking bot as FAILED.")
-        new_bot.status = "failed"
-        db.commit()
         raise HTTPException(status_code=500, detail=f"Bot processing failed: {str(e)}")
 
     chat_url = f"/chat/{new_bot.bot_id}"
@@ -151,10 +147,11 @@ def create_bot(
 def refresh_bot(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),  # 👈 must be logged in
+    current_user: UserPrincipal = Depends(get_current_user),  # 👈 must be logged in
 ):
     """
-    Rebuild an existing bot.
+    Rebuild an existing bot into a new index; chat keeps answering from
+    the current one until the new index is complete and validated.
     Only:
       - the bot owner, or
       - a super_admin
@@ -183,79 +180,106 @@ def refresh_bot(
     website_url = bot.website_url
     logger.info(f"Rebuilding bot for website: {website_url}")
 
-    # Set status to processing
-    bot.status = "processing"
-    db.commit()
-    db.refresh(bot)
+    report = BuildReport("refresh", website_url)
+    # 3️⃣ Crawl + chunk + embed + store into a new index, then switch to it
+    chunk_count = rebuild_bot(
+        db, bot, report, lambda index: build_bot_index(bot_id, website_url, report, index=index)
+    )
+    logger.info(f"Bot {bot_id} successfully refreshed and READY with {chunk_count} chunks.")
 
-    try:
-        # 3️⃣ Clear existing Chroma index
-        reset_chroma_for_bot(bot_id)
+    chat_url = f"/chat/{bot.bot_id}"
+    return schemas.BotCreateResponse(
+        bot_id=bot.bot_id,
+        chat_url=chat_url,
+        status=bot.status,
+    )
 
-        # 4️⃣ Crawl website again
-        page_texts = crawl_website(website_url, max_pages=10)
-        if not page_texts:
-            raise Exception("No pages found or all pages were empty during refresh.")
 
-        logger.info(f"Re-crawled {len(page_texts)} pages for bot {bot_id}")
+@router.post("/{bot_id}/reindex", response_model=schemas.BotCreateResponse)
+def reindex_bot(
+    bot_id: str,
+    snapshot_id: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    """
+    Rebuild a bot's chunks and vectors from a stored crawl snapshot
+    (the latest unless snapshot_id is given) without crawling the site:
+    use after changing cleaning, chunking or embedding settings.
+    Only the bot owner or a super_admin can reindex it.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
 
-        all_chunks = []
-        all_embeddings = []
-        all_metadatas = []
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to reindex this bot")
 
-        for page_url, text in page_texts.items():
-            logger.info(f"[REFRESH] Processing page: {page_url}")
+    snapshots = list_snapshots(bot_id)
+    if not snapshots or (snapshot_id and snapshot_id not in {s["id"] for s in snapshots}):
+        raise HTTPException(status_code=409, detail="No crawl snapshot stored for this bot; refresh it instead")
 
-            chunks = process_text_to_chunks(text)
-            if not chunks:
-                logger.warning(f"[REFRESH] No chunks created for page: {page_url}")
-                continue
+    report = BuildReport("reindex", bot.website_url)
+    chunk_count = rebuild_bot(
+        db, bot, report, lambda index: reindex_from_snapshot(bot_id, report, snapshot_id, index=index)
+    )
+    logger.info(f"Bot {bot_id} re-indexed from snapshot with {chunk_count} chunks.")
 
-            embeddings = embed_text(chunks)
+    return schemas.BotCreateResponse(
+        bot_id=bot.bot_id,
+        chat_url=f"/chat/{bot.bot_id}",
+        status=bot.status,
+    )
 
-            for c, e in zip(chunks, embeddings):
-                chunk_index = len(all_chunks)
-                all_chunks.append(c)
-                all_embeddings.append(e)
-                all_metadatas.append(
-                    {
-                        "bot_id": bot_id,
-                        "page_url": page_url,
-                        "chunk_index": chunk_index,
-                    }
-                )
 
-        if not all_chunks:
-            raise Exception("No chunks created during refresh for this website.")
+@router.get("/{bot_id}/snapshots", response_model=list[schemas.SnapshotOut])
+def list_bot_snapshots(
+    bot_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Stored crawl snapshots of a bot, newest first.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
 
-        add_chunks_to_chroma(bot_id, all_chunks, all_embeddings, all_metadatas)
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to view this bot")
 
-        bot.status = "ready"
-        db.commit()
-        db.refresh(bot)
+    return list_snapshots(bot_id)
 
-        logger.info(f"Bot {bot_id} successfully refreshed and READY.")
 
-    except Exception as e:
-        logger.exception("Refresh pipeline failed. Marking bot as FAILED.")
-        bot.status = "failed"
-        db.commit()
-        db.refresh(bot)
-        raise HTTPException(status_code=500, detail=f"Bot refresh failed: {str(e)}")
+@router.patch("/{bot_id}/settings")
+def update_bot_settings(
+    bot_id: str,
+    payload: schemas.BotSettingsUpdate,
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    """
+    Update per-bot settings (currently the LLM model tier).
+    Only the bot owner or a super_admin can change them.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
 
-    chat_url = f"/chat/{bot.bot_id}"
-    return schemas.BotCreateResponse(
-        bot_id=bot.bot_id,
-        chat_url=chat_url,
-        status=bot.status,
-    )
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to update this bot")
+
+    bot.model_tier = payload.model_tier
+    db.commit()
+
+    return {"bot_id": bot.bot_id, "model_tier": bot.model_tier}
 
 
 @router.get("/{bot_id}/metrics", response_model=schemas.BotMetrics)
 def get_bot_metrics(
     bot_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_token_principal),
 ):
     """
     Return basic metrics for a single bot:
@@ -288,22 +312,92 @@ def get_bot_metrics(
         last_used_at=bot.last_used_at,
     )
 
+@router.get("/{bot_id}/usage", response_model=list[schemas.UsageBucket])
+def get_bot_usage_rollups(
+    bot_id: str,
+    granularity: Literal["hour", "day"] = "hour",
+    limit: int = Query(24, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Hourly or daily usage for a single bot (newest bucket first):
+    requests, cache hits, errors and p50/p95/p99 response times.
+
+    Served from pre-aggregated rollups, so the cost does not grow
+    with the number of chat logs.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to view this bot")
+
+    return get_bot_usage(db, bot.id, granularity, limit)
+
+
+@router.get("/{bot_id}/build-reports", response_model=list[schemas.BuildReportOut])
+def list_build_reports(
+    bot_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_token_principal),
+):
+    """
+    Build profiles for a bot's create / refresh runs, newest first:
+    pages discovered / fetched / skipped / failed, per-page fetch time,
+    text bytes before and after cleaning, chunk counts and stage timings.
+    """
+    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot not found")
+
+    if current_user.role != "super_admin" and bot.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to view this bot")
+
+    reports = (
+        db.query(models.BotBuildReport)
+        .filter(models.BotBuildReport.bot_id == bot.id)
+        .order_by(models.BotBuildReport.started_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+    return [schemas.BuildReportOut.from_row(bot.bot_id, r) for r in reports]
+
+
 @router.get("/my", response_model=list[schemas.BotSummary])
 def list_my_bots(
+    response: Response,
+    status: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_token_principal),
 ):
     """
-    Return all bots created by the logged-in user.
+    Return the logged-in user's bots, newest first.
     Useful for client dashboard.
+
+    Keyset pagination: pass the X-Next-Cursor response header
+    back as ?cursor= to get the next page.
     """
-    bots = (
-        db.query(models.Bot)
-        .filter(models.Bot.user_id == current_user.id)
-        .order_by(models.Bot.created_at.desc())
-        .all()
+    query = db.query(models.Bot).filter(models.Bot.user_id == current_user.id)
+    if status is not None:
+        query = query.filter(models.Bot.status == status)
+
+    query = before_created(query, models.Bot.created_at, models.Bot.id, cursor)
+    bots, has_more = split_page(
+        query.order_by(models.Bot.created_at.desc(), models.Bot.id.desc())
+        .limit(limit + 1)
+        .all(),
+        limit,
     )
 
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(bots[-1].created_at, bots[-1].id)
+
     return [
         schemas.BotSummary(
             bot_id=b.bot_id,
@@ -315,4 +409,4 @@ def list_my_bots(
             chat_url=f"/chat/{b.bot_id}",
         )
         for b in bots
-    ]
\ No newline at end of file
+    ]
@@ -1,9 +1,10 @@
+import ipaddress
 import logging
 import time
 import json
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app.db import get_db
@@ -11,49 +12,125 @@ from app import models, schemas
 
 from app.services.embeddings import embed_text
 from app.services.rag import build_rag_prompt
-from app.services.ai_client import generate_answer
+from app.services.model_router import generate_routed_answer
 from app.services.vector_store import retrieve_chunks
 from app.services.ai_client import GeminiQuotaError
+from app.services.singleflight import answer_flight, answer_key
+from app.services.chat_log_writer import chat_log_writer
+from app.services.metrics import collect_stages, timed
+from app.services.admission import (
+    AdmissionRejected,
+    llm_slots,
+    rate_limiter,
+    retry_after_header,
+)
+from app import config
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+_TRUSTED_PROXIES = [
+    ipaddress.ip_network(net.strip(), strict=False)
+    for net in config.TRUSTED_PROXY_IPS.split(",")
+    if net.strip()
+]
+
+
+def _is_trusted_proxy(host: str | None) -> bool:
+    try:
+        ip = ipaddress.ip_address(host or "")
+    except ValueError:
+        return False
+    return any(ip in net for net in _TRUSTED_PROXIES)
+
+
+def _client_ip(request: Request) -> str | None:
+    """
+    Address the per-IP rate limit is keyed on. Entries left of the last
+    untrusted one are whatever the client sent, so they are never used.
+    """
+    peer = request.client.host if request.client else None
+    if not config.TRUST_FORWARDED_FOR or not _is_trusted_proxy(peer):
+        return peer
+
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded:
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    # Every hop is one of our proxies
+    return hops[0] if hops else peer
+
+
 @router.post("/{bot_id}", response_model=schemas.ChatResponse)
 def chat_with_bot(
     bot_id: str,
     payload: schemas.ChatRequest,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """
     Full RAG flow:
+    0. Admission control (per-IP / per-bot / global rate limits)
     1. Validate bot
     2. Embed query
     3. Fetch relevant chunks from Chroma
     4. Build RAG prompt
-    5. Send prompt to Gemini
+    5. Send prompt to Gemini (model picked by the router,
+       identical concurrent questions share one call)
     6. Return answer + retrieved chunks + page URLs
-    7. 🔹 Update metrics & store ChatLog
+    7. 🔹 Queue metrics update & ChatLog (write-behind)
+
+    Per-stage timings are recorded in the /metrics histograms
+    and stored on the ChatLog row.
     """
+    with collect_stages() as stages, timed("chat_total"):
+        return _run_chat(bot_id, payload, request, db, stages)
+
 
+def _run_chat(
+    bot_id: str,
+    payload: schemas.ChatRequest,
+    request: Request,
+    db: Session,
+    stages: dict,
+) -> schemas.ChatResponse:
     start_time = time.time()
     logger.info(f"Chat request received for bot {bot_id}: {payload.message}")
 
+    # 0️⃣ Reject early (no DB / embedding / LLM work) when over the limits
+    try:
+        rate_limiter.check(bot_id, _client_ip(request))
+    except AdmissionRejected as e:
+        logger.warning(f"Chat request for bot {bot_id} rejected: {e.reason}")
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers=retry_after_header(e.retry_after),
+        )
+
     # 1️⃣ Load bot
-    bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
+    with timed("chat_load_bot"):
+        bot = db.query(models.Bot).filter(models.Bot.bot_id == bot_id).first()
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     if bot.status != "ready":
         raise HTTPException(status_code=400, detail=f"Bot status is {bot.status}")
 
     # 2️⃣ Embed user question
-    query_vec = embed_text([payload.message])[0]
+    with timed("chat_embed_query"):
+        query_vec = embed_text([payload.message])[0]
 
     # 3️⃣ Retrieve top chunks + metadata from Chroma
-    chunks, metadatas = retrieve_chunks(bot_id, query_vec, top_k=3)
+    with timed("chat_retrieve"):
+        chunks, metadatas = retrieve_chunks(bot_id, query_vec, top_k=3, index=bot.active_index)
 
     if not chunks:
         logger.warning(f"No chunks retrieved from Chroma for bot {bot_id}")
+        chat_log_writer.record_error(bot.id, int((time.time() - start_time) * 1000))
         raise HTTPException(
             status_code=500, detail="No chunks retrieved from vector database"
         )
@@ -63,14 +140,36 @@ def chat_with_bot(
     # 4️⃣ Build RAG prompt
     prompt = build_rag_prompt(chunks, payload.message)
 
-    # 5️⃣ Generate final answer
+    # 5️⃣ Generate final answer (fast or strong tier, with fallback)
+    #     Identical in-flight questions for this bot share one LLM call,
+    #     and the number of concurrent LLM calls is capped
     try:
-        answer = generate_answer(prompt)
+        with timed("chat_generate"):
+            answer, shared = answer_flight.do(
+                answer_key(bot_id, payload.message, chunks),
+                llm_slots.run,
+                generate_routed_answer,
+                prompt,
+                query=payload.message,
+                context_chunks=chunks,
+                bot_tier=bot.model_tier,
+            )
+    except AdmissionRejected as e:
+        chat_log_writer.record_error(bot.id, int((time.time() - start_time) * 1000))
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers=retry_after_header(e.retry_after),
+        )
     except GeminiQuotaError:
+        chat_log_writer.record_error(bot.id, int((time.time() - start_time) * 1000))
         raise HTTPException(
             status_code=429,
             detail="AI service is temporarily unavailable. Please try again later.",
     )
+    except Exception:
+        chat_log_writer.record_error(bot.id, int((time.time() - start_time) * 1000))
+        raise
 
     # 6️⃣ Shape source_chunks for response
     source_chunks: list[schemas.SourceChunk] = []
@@ -82,34 +181,30 @@ def chat_with_bot(
             )
         )
 
-    # 7️⃣ 🔹 METRICS + LOGGING BLOCK (this is the new part)
+    # 7️⃣ 🔹 METRICS + LOGGING BLOCK
+    #     Queued for the write-behind buffer: the ChatLog insert and the
+    #     bot counter increment happen in a batched transaction off the response path
     try:
         now = datetime.utcnow()
         duration_ms = int((time.time() - start_time) * 1000)
 
-        # Update bot-level metrics
-        bot.message_count = (bot.message_count or 0) + 1
-        bot.last_used_at = now
-
-        # Store message log (per Q/A)
-        log_entry = models.ChatLog(
+        chat_log_writer.enqueue(
+            bot_pk=bot.id,
             session_id=None,  # we will add real sessions later
-            bot_id=bot.id,
             user_message=payload.message,
             bot_response=answer,
             retrieved_sources=json.dumps(
                 [sc.model_dump() for sc in source_chunks]
             ),
             response_time_ms=duration_ms,
+            created_at=now,
+            cache_hit=shared,
+            stage_timings=json.dumps(stages),
         )
 
-        db.add(log_entry)
-        db.commit()
-        db.refresh(bot)
-
         logger.info(
-            f"[METRICS] bot_id={bot.id} messages={bot.message_count}, "
-            f"response_time_ms={duration_ms}"
+            f"[METRICS] bot_id={bot.id} response_time_ms={duration_ms}, "
+            f"coalesced={shared}"
         )
 
     except Exception:
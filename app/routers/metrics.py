@@ -0,0 +1,79 @@
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import registry, format_labels
+from app.services.model_router import model_stats
+from app.services.singleflight import answer_flight
+from app.services.admission import llm_slots, rate_limiter
+from app.services.chat_log_writer import chat_log_writer
+from app.services.user_cache import user_cache
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _metric(lines: list, name: str, kind: str, help: str, samples: list):
+    """
+    Append one metric family: samples = [(labels dict, value)].
+    """
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {value:g}")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Prometheus text exposition: per-stage latency histograms
+    plus counters / gauges from the chat path subsystems.
+    """
+    lines = registry.render()
+
+    models = model_stats.snapshot()
+    _metric(lines, "chatbot_llm_model_calls_total", "counter",
+            "LLM calls per model (router)",
+            [({"model": m}, s["calls"]) for m, s in models.items()])
+    _metric(lines, "chatbot_llm_model_errors_total", "counter",
+            "Failed LLM calls per model",
+            [({"model": m}, s["errors"]) for m, s in models.items()])
+    _metric(lines, "chatbot_llm_model_rate_limited_total", "counter",
+            "Rate-limited LLM calls per model",
+            [({"model": m}, s["rate_limited"]) for m, s in models.items()])
+    _metric(lines, "chatbot_llm_model_avg_latency_ms", "gauge",
+            "Moving average LLM latency per model",
+            [({"model": m}, s["avg_latency_ms"]) for m, s in models.items()
+             if s["avg_latency_ms"] is not None])
+
+    flight = answer_flight.stats()
+    _metric(lines, "chatbot_llm_coalesced_total", "counter",
+            "Chat answers that reused an identical in-flight LLM call",
+            [({}, flight["coalesced_calls"])])
+
+    _metric(lines, "chatbot_rate_limited_total", "counter",
+            "Chat requests rejected by rate limits",
+            [({"scope": scope}, count) for scope, count in rate_limiter.stats().items()])
+
+    slots = llm_slots.stats()
+    _metric(lines, "chatbot_llm_in_flight", "gauge",
+            "LLM calls currently holding a concurrency slot", [({}, slots["in_flight"])])
+    _metric(lines, "chatbot_llm_waiting", "gauge",
+            "Requests waiting for an LLM slot", [({}, slots["waiting"])])
+    _metric(lines, "chatbot_llm_slot_rejected_total", "counter",
+            "Requests rejected after waiting for an LLM slot", [({}, slots["rejected"])])
+
+    _metric(lines, "chatbot_chat_log_pending", "gauge",
+            "ChatLog records waiting in the write-behind queue",
+            [({}, chat_log_writer.pending())])
+
+    cache = user_cache.stats()
+    _metric(lines, "chatbot_auth_cache_hits_total", "counter",
+            "Authenticated requests served from the user cache", [({}, cache["hits"])])
+    _metric(lines, "chatbot_auth_cache_misses_total", "counter",
+            "Authenticated requests that queried the users table", [({}, cache["misses"])])
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
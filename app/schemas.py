@@ -1,5 +1,7 @@
+import json
+
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+from typing import Optional, List, Literal
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
@@ -9,6 +11,14 @@ from datetime import datetime
 # -----------------------------
 class BotCreateRequest(BaseModel):
     website_url: HttpUrl
+    model_tier: Literal["auto", "fast", "strong"] = "auto"
+
+
+# -----------------------------
+# BOT SETTINGS UPDATE
+# -----------------------------
+class BotSettingsUpdate(BaseModel):
+    model_tier: Literal["auto", "fast", "strong"]
 
 
 # -----------------------------
@@ -84,6 +94,61 @@ class BotMetrics(BaseModel):
     status: str
     last_used_at: datetime | None = None
 
+# ---------- USAGE ROLLUP BUCKET ----------
+class UsageBucket(BaseModel):
+    bucket_start: datetime
+    request_count: int
+    cache_hit_count: int
+    error_count: int
+    avg_response_ms: float | None = None
+    p50_ms: float | None = None
+    p95_ms: float | None = None
+    p99_ms: float | None = None
+
+
+# ---------- BOT BUILD REPORT ----------
+class BuildReportOut(BaseModel):
+    bot_id: str
+    kind: str
+    status: str
+    pipeline_version: str
+    started_at: datetime
+    finished_at: datetime | None = None
+    duration_ms: int | None = None
+    pages_fetched: int
+    chunk_count: int
+    report: dict
+
+    @classmethod
+    def from_row(cls, bot_id: str, row) -> "BuildReportOut":
+        return cls(
+            bot_id=bot_id,
+            kind=row.kind,
+            status=row.status,
+            pipeline_version=row.pipeline_version,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+            duration_ms=row.duration_ms,
+            pages_fetched=row.pages_fetched or 0,
+            chunk_count=row.chunk_count or 0,
+            report=json.loads(row.report),
+        )
+
+
+# ---------- CRAWL SNAPSHOTS ----------
+class SnapshotOut(BaseModel):
+    id: str
+    website_url: str
+    created_at: datetime
+    pages: int
+
+
+class ReindexResult(BaseModel):
+    bot_id: str
+    status: str  # "scheduled" | "skipped"
+    detail: str | None = None
+
+
 # ---------- ADMIN: USER SUMMARY ----------
 class AdminUserSummary(BaseModel):
     id: int
@@ -114,6 +179,39 @@ class SaaSStats(BaseModel):
     total_bots: int
     total_messages: int
 
+
+# ---------- ADMIN: LLM MODEL STATS ----------
+class ModelRouteStats(BaseModel):
+    model: str
+    calls: int
+    errors: int
+    rate_limited: int
+    avg_latency_ms: float | None = None
+    cooling_down: bool
+
+
+# ---------- ADMIN: ADMISSION CONTROL ----------
+class LLMSlotStats(BaseModel):
+    max_concurrency: int
+    in_flight: int
+    waiting: int
+    admitted: int
+    rejected: int
+    avg_queue_ms: float | None = None
+    p95_queue_ms: float | None = None
+
+
+class AdmissionStats(BaseModel):
+    rate_limited: dict[str, int]
+    llm_slots: LLMSlotStats
+
+
+# ---------- ADMIN: LLM REQUEST COALESCING ----------
+class CoalescingStats(BaseModel):
+    total_calls: int
+    coalesced_calls: int
+    in_flight: int
+
 class BotSummary(BaseModel):
     bot_id: str
     website_url: str
@@ -0,0 +1,251 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from app import config
+from app.services import latency_histogram
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """
+    Request refused before doing any work; retry_after is in seconds.
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# -----------------------------------------------------
+# TOKEN BUCKETS
+# -----------------------------------------------------
+def _refill(tokens: float, updated_at: float, now: float, rate: float, capacity: float) -> float:
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+class MemoryBuckets:
+    """
+    Per-process token buckets: {key: (tokens, updated_at)}.
+    """
+
+    # Drop buckets idle for this long (they would be full again anyway)
+    _IDLE_S = 600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
+
+    def take(self, key: str, rate: float, capacity: float) -> float:
+        """
+        Take one token. Returns 0 when allowed,
+        otherwise the seconds until a token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, rate, capacity)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+
+            if now - self._last_prune > self._IDLE_S:
+                self._buckets = {
+                    k: v for k, v in self._buckets.items() if now - v[1] < self._IDLE_S
+                }
+                self._last_prune = now
+
+        return wait
+
+
+class SQLiteBuckets:
+    """
+    Token buckets kept in a local SQLite file so every worker process
+    on the host shares the same limits.
+    """
+
+    # Delete buckets idle for this long (full again, same as a missing row)
+    _IDLE_S = MemoryBuckets._IDLE_S
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        self._last_prune = time.time()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, capacity: float) -> float:
+        # Wall clock: shared between processes
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens = _refill(tokens, updated_at, now, rate, capacity)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, "
+                "updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+            if now - self._last_prune > self._IDLE_S:
+                self._last_prune = now
+                conn.execute("DELETE FROM buckets WHERE updated_at < ?", (now - self._IDLE_S,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def _make_buckets():
+    if config.RATE_LIMIT_BACKEND == "sqlite":
+        logger.info(f"[ADMISSION] Shared rate limits in {config.RATE_LIMIT_SQLITE_PATH}")
+        return SQLiteBuckets(config.RATE_LIMIT_SQLITE_PATH)
+    return MemoryBuckets()
+
+
+# -----------------------------------------------------
+# RATE LIMITS: per client IP, per bot, global
+# -----------------------------------------------------
+class RateLimiter:
+    def __init__(self, buckets=None):
+        self._buckets = buckets or _make_buckets()
+        self._lock = threading.Lock()
+        self.rejected: dict[str, int] = {"ip": 0, "bot": 0, "global": 0}
+
+    def check(self, bot_id: str, client_ip: str | None):
+        """
+        Raise AdmissionRejected as soon as one limit is exhausted.
+        The most specific limit is checked first so an abusive client
+        does not spend the bot's or the global budget.
+        """
+        limits = [
+            ("ip", f"ip:{client_ip or 'unknown'}", config.RATE_LIMIT_PER_IP_PER_MIN),
+            ("bot", f"bot:{bot_id}", config.RATE_LIMIT_PER_BOT_PER_MIN),
+            ("global", "global", config.RATE_LIMIT_GLOBAL_PER_MIN),
+        ]
+
+        for scope, key, per_min in limits:
+            if per_min <= 0:
+                continue  # limit disabled
+            wait = self._buckets.take(key, rate=per_min / 60, capacity=per_min)
+            if wait > 0:
+                with self._lock:
+                    self.rejected[scope] += 1
+                raise AdmissionRejected(f"Rate limit exceeded ({scope})", wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.rejected)
+
+
+# -----------------------------------------------------
+# CONCURRENCY CAP FOR LLM CALLS
+# -----------------------------------------------------
+class ConcurrencyLimiter:
+    """
+    Bounded number of in-flight LLM calls. Callers wait at most
+    LLM_QUEUE_TIMEOUT_MS for a slot, then are rejected.
+    Queue time is recorded in a latency histogram.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+        queue_timeout_ms: int = config.LLM_QUEUE_TIMEOUT_MS,
+    ):
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._max = max_concurrency
+        self._timeout = queue_timeout_ms / 1000
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._queue_ms_total = 0.0
+        self._queue_histogram = latency_histogram.empty_histogram()
+
+    def run(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+
+        acquired = self._slots.acquire(timeout=self._timeout)
+        queued_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._rejected += 1
+            else:
+                self._admitted += 1
+                self._in_flight += 1
+                self._queue_ms_total += queued_ms
+                latency_histogram.observe(self._queue_histogram, queued_ms)
+
+        if not acquired:
+            raise AdmissionRejected("Too many AI requests in flight", max(1.0, self._timeout))
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            p95 = latency_histogram.percentile(self._queue_histogram, 95)
+            return {
+                "max_concurrency": self._max,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "avg_queue_ms": (
+                    round(self._queue_ms_total / self._admitted, 1) if self._admitted else None
+                ),
+                "p95_queue_ms": round(p95, 1) if p95 is not None else None,
+            }
+
+
+def retry_after_header(retry_after: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+rate_limiter = RateLimiter()
+llm_slots = ConcurrencyLimiter()
@@ -1,7 +1,10 @@
 import os
 import logging
 from google import genai
+from google.genai import types
 from google.genai.errors import ClientError
+from app import config
+from app.services.metrics import instrument
 
 logger = logging.getLogger(__name__)
 
@@ -18,22 +21,40 @@ except Exception as e:
     logger.warning(f"Could not initialize Gemini client: {e}")
     client = None
 
-def generate_answer(prompt: str) -> str:
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+@instrument("llm_call")
+def generate_answer(prompt: str, model: str = DEFAULT_MODEL) -> str:
     """
-    Sends prompt to Gemini 2.0 Flash using new google-genai SDK.
+    Sends prompt to a Gemini model (2.0 Flash by default) using new google-genai SDK.
+    With LLM_PROVIDER=fake the local stand-in in fake_llm.py answers instead.
     """
+    if config.LLM_PROVIDER == "fake":
+        from app.services import fake_llm  # imports GeminiQuotaError from here
+        return fake_llm.generate_answer(prompt, model)
+
     if not client or GEMINI_API_KEY == "dummy-key":
         raise Exception("GEMINI_API_KEY not configured properly")
     
     try:
         response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
+            model=model,
+            contents=prompt,
+            # Fail slow calls so the router can fall back to the next model
+            config=types.GenerateContentConfig(
+                http_options=types.HttpOptions(timeout=config.LLM_CALL_TIMEOUT_MS)
+            ),
         )
         return response.text
     except ClientError as e:
-        logger.error(f"Gemini quota error: {e}")
-        raise GeminiQuotaError("AI service quota exceeded")
+        # Only 429 is a quota problem; other 4xx (bad model name, invalid
+        # argument, auth) are configuration errors and must surface as such
+        if e.code == 429 or e.status == "RESOURCE_EXHAUSTED":
+            logger.error(f"Gemini quota error ({model}): {e}")
+            raise GeminiQuotaError("AI service quota exceeded")
+        logger.error(f"Gemini client error ({model}): {e}")
+        raise
     except Exception as e:
-        logger.error(f"Gemini error: {e}")
+        logger.error(f"Gemini error ({model}): {e}")
         raise
\ No newline at end of file
@@ -0,0 +1,200 @@
+import logging
+import re
+from typing import Dict
+
+from app import config
+from app.services.cleaner import has_contact_details
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends (not the dots inside emails / URLs)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Lossy-counting error once pages stream past the warm-up: counts of shingles
+# on fewer than this fraction of pages are pruned, which keeps memory flat
+# with site size. Must stay well below BOILERPLATE_PAGE_FRACTION.
+_COUNT_ERROR = 0.1
+
+
+def _shingles(words: list[str], size: int) -> list[int]:
+    """
+    Hash of every run of `size` consecutive words (case-insensitive).
+    Pages shorter than `size` words give one shingle of the whole page.
+    """
+    lowered = [w.lower() for w in words]
+    if len(lowered) <= size:
+        return [hash(" ".join(lowered))] if lowered else []
+    return [hash(" ".join(lowered[i:i + size])) for i in range(len(lowered) - size + 1)]
+
+
+class SiteBoilerplateFilter:
+    """
+    Cross-page boilerplate removal for one crawled site, fed page by page.
+
+    The crawler collapses each page to one line of words, so repeated blocks
+    (nav bar, footer, cookie banner) are found with word shingles: a shingle
+    seen on more than `page_fraction` of the pages so far is boilerplate, and
+    every word it covers is dropped. Sentences with contact details (email,
+    phone) inside dropped blocks are kept once, on the first page in crawl order.
+
+    The first `warmup_pages` pages are held back until there is enough
+    repetition to judge; later pages are filtered as they arrive, and rare
+    shingles are pruned from the counts every few pages (lossy counting).
+    """
+
+    def __init__(
+        self,
+        warmup_pages: int = config.BOILERPLATE_MIN_PAGES,
+        page_fraction: float = config.BOILERPLATE_PAGE_FRACTION,
+        min_pages: int = config.BOILERPLATE_MIN_PAGES,
+        shingle_words: int = config.BOILERPLATE_SHINGLE_WORDS,
+    ):
+        self._warmup_pages = max(warmup_pages, 1)
+        self._page_fraction = page_fraction
+        self._min_pages = max(min_pages, 2)
+        self._shingle_words = shingle_words
+
+        self._pages_seen = 0
+        # Document frequency: on how many pages each shingle appears
+        self._page_counts: dict[int, int] = {}
+        # Lossy counting: pages a shingle may have been on before it was counted
+        self._missed: dict[int, int] = {}
+        self._prune_every = max(round(1 / _COUNT_ERROR), 1)
+        self._boilerplate: set[int] = set()
+        self._kept_contact: set[str] = set()
+        # Pages held back during warm-up; None once released
+        self._buffer: list | None = []
+
+        self.stats = {
+            "pages": 0,
+            "boilerplate_shingles": 0,
+            "words_removed": 0,
+            "bytes_removed": 0,
+            "contact_lines_kept": 0,
+            "pages_changed": 0,
+        }
+
+    def add(self, url: str, text: str) -> list[tuple[str, str]]:
+        """
+        Feed one page; returns the (url, text) pages that are now ready.
+        """
+        words = text.split()
+        shingles = _shingles(words, self._shingle_words)
+        bucket = self._pages_seen // self._prune_every
+        for h in set(shingles):
+            if h not in self._page_counts and self._buffer is None:
+                self._missed[h] = bucket
+            self._page_counts[h] = self._page_counts.get(h, 0) + 1
+        self._pages_seen += 1
+        self.stats["pages"] = self._pages_seen
+
+        if self._buffer is None:
+            page = (url, self._filter_page(text, words, shingles))
+            if self._pages_seen % self._prune_every == 0:
+                self._prune(self._pages_seen // self._prune_every)
+            return [page]
+
+        self._buffer.append((url, text, words, shingles))
+        if self._pages_seen < self._warmup_pages:
+            return []
+        return self.flush()
+
+    def flush(self) -> list[tuple[str, str]]:
+        """
+        Release the held-back pages (warm-up done, or the crawl ended first).
+        """
+        buffered, self._buffer = self._buffer or [], None
+        return [
+            (url, self._filter_page(text, words, shingles))
+            for url, text, words, shingles in buffered
+        ]
+
+    def _prune(self, bucket: int):
+        rare = [
+            h for h, count in self._page_counts.items()
+            if count + self._missed.get(h, 0) <= bucket
+        ]
+        for h in rare:
+            del self._page_counts[h]
+            self._missed.pop(h, None)
+
+    def _filter_page(self, text: str, words: list[str], shingles: list[int]) -> str:
+        if self._pages_seen < self._min_pages:
+            return text
+
+        limit = self._page_fraction * self._pages_seen
+        masked = [False] * len(words)
+        for i, h in enumerate(shingles):
+            if self._page_counts[h] > limit:
+                self._boilerplate.add(h)
+                for j in range(i, min(i + self._shingle_words, len(words))):
+                    masked[j] = True
+        self.stats["boilerplate_shingles"] = len(self._boilerplate)
+
+        if not any(masked):
+            return text
+
+        # Rebuild the page; removed runs become sentence breaks so the
+        # text around them is not glued into one sentence
+        pieces: list[str] = []
+        run: list[str] = []
+        kept: list[str] = []
+
+        def flush_removed():
+            if not run:
+                return
+            for sentence in _SENTENCE_END_RE.split(" ".join(run)):
+                sentence = sentence.strip().rstrip(".")
+                key = sentence.lower()
+                if key and key not in self._kept_contact and has_contact_details(sentence):
+                    self._kept_contact.add(key)
+                    pieces.append(sentence)
+                    self.stats["contact_lines_kept"] += 1
+            self.stats["words_removed"] += len(run)
+            self.stats["bytes_removed"] += len(" ".join(run).encode("utf-8"))
+            run.clear()
+
+        for word, is_boilerplate in zip(words, masked):
+            if is_boilerplate:
+                if kept:
+                    pieces.append(" ".join(kept))
+                    kept.clear()
+                run.append(word)
+            else:
+                flush_removed()
+                kept.append(word)
+        flush_removed()
+        if kept:
+            pieces.append(" ".join(kept))
+
+        self.stats["pages_changed"] += 1
+        return ". ".join(pieces)
+
+
+def remove_site_boilerplate(
+    pages: Dict[str, str],
+    page_fraction: float = config.BOILERPLATE_PAGE_FRACTION,
+    min_pages: int = config.BOILERPLATE_MIN_PAGES,
+    shingle_words: int = config.BOILERPLATE_SHINGLE_WORDS,
+) -> tuple[Dict[str, str], dict]:
+    """
+    Whole-site boilerplate removal: every page is judged against the
+    shingle counts of all pages. Returns ({page_url: text}, stats).
+    """
+    site_filter = SiteBoilerplateFilter(
+        warmup_pages=len(pages),
+        page_fraction=page_fraction,
+        min_pages=min_pages,
+        shingle_words=shingle_words,
+    )
+    result: Dict[str, str] = {}
+    for url, text in pages.items():
+        result.update(site_filter.add(url, text))
+    result.update(site_filter.flush())
+
+    stats = site_filter.stats
+    logger.info(
+        f"[BOILERPLATE] {stats['boilerplate_shingles']} repeated shingles, "
+        f"removed {stats['words_removed']} words from {stats['pages_changed']} pages"
+    )
+    return result, stats
@@ -0,0 +1,416 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import case, func, or_, update
+from sqlalchemy.orm import Session
+
+from app import config, models
+from app.db import SessionLocal
+from app.services.build_report import BuildReport
+from app.services.ingestion import build_bot_index, reindex_from_snapshot
+from app.services.snapshots import CrawlCheckpoint, build_heartbeat
+from app.services.vector_store import (
+    DEFAULT_INDEX,
+    drop_index,
+    index_count,
+    new_index_name,
+    validate_index,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------
+# BUILD BOOKKEEPING (shared by the routers and the watchdog)
+# -------------------------------------------------
+def save_build_report(db: Session, bot_pk: int, report: BuildReport):
+    """
+    Persist the build profile; committed together with the bot status.
+    """
+    db.add(
+        models.BotBuildReport(
+            bot_id=bot_pk,
+            kind=report.kind,
+            status=report.status,
+            pipeline_version=report.pipeline_version,
+            started_at=report.started_at,
+            finished_at=report.finished_at,
+            duration_ms=report.duration_ms,
+            pages_fetched=report.pages_fetched,
+            chunk_count=report.chunk_count,
+            report=json.dumps(report.to_dict()),
+        )
+    )
+
+
+def start_build(db: Session, bot: models.Bot, kind: str, index: str | None = None) -> bool:
+    """
+    Record a `kind` build (create / refresh / reindex) writing the new
+    collection `index`. A ready bot stays ready and keeps answering from
+    its active index meanwhile; any other bot shows "processing".
+
+    Conditional update, like _claim: only starts when no build holds the
+    bot (or takes over the stale one the caller saw). Returns False when
+    another request or worker started a build first.
+    """
+    started = db.execute(
+        update(models.Bot)
+        .where(
+            models.Bot.id == bot.id,
+            models.Bot.processing_started_at.is_(None)
+            if bot.processing_started_at is None
+            else models.Bot.processing_started_at == bot.processing_started_at,
+        )
+        .values(
+            status=case((models.Bot.status == "ready", "ready"), else_="processing"),
+            build_kind=kind,
+            building_index=index or new_index_name(),
+            processing_started_at=datetime.utcnow(),
+            build_attempts=0,
+        )
+    ).rowcount
+    db.commit()
+    db.refresh(bot)
+    return started == 1
+
+
+def finish_build(db: Session, bot: models.Bot, report: BuildReport, error: str | None = None):
+    """
+    Successful build: switch the bot to its new index (one committed row
+    update, so chat moves over atomically) and retire the old one.
+    Failed build: drop the new index; a bot that was ready stays ready on
+    its old index, any other is marked failed. Saves the report either way.
+    """
+    new_index = bot.building_index
+    previous = bot.active_index or (DEFAULT_INDEX if bot.build_kind != "create" else None)
+    report.index = {"name": new_index, "previous": previous, "swapped": error is None}
+
+    if error is None:
+        if previous and previous != new_index:
+            if bot.retired_index:
+                # Superseded before its grace period ended: out of use since the last swap
+                drop_index(bot.bot_id, bot.retired_index)
+            bot.retired_index = previous
+            bot.retired_at = datetime.utcnow()
+        bot.active_index = new_index
+        bot.status = "ready"
+    else:
+        if new_index and new_index != bot.active_index:
+            drop_index(bot.bot_id, new_index)
+        if bot.status != "ready":
+            bot.status = "failed"
+
+    bot.building_index = None
+    bot.processing_started_at = None
+    report.finish("ready" if error is None else "failed", error)
+    save_build_report(db, bot.id, report)
+    db.commit()
+    db.refresh(bot)
+
+
+def run_build(db: Session, bot: models.Bot, report: BuildReport, build: Callable[[str], int]) -> int:
+    """
+    Run `build(index)` (returns the chunk count) into the collection
+    start_build() chose, validate it, then swap it in with finish_build().
+    Failures are recorded, then re-raised.
+    """
+    index = bot.building_index
+    try:
+        chunk_count = build(index)
+        serving = index_count(bot.bot_id, bot.active_index) if bot.status == "ready" else 0
+        validate_index(bot.bot_id, index, chunk_count, serving)
+    except Exception as e:
+        finish_build(db, bot, report, str(e))
+        raise
+    finish_build(db, bot, report)
+    return chunk_count
+
+
+def collect_retired_indexes(db: Session) -> int:
+    """
+    Drop retired collections older than INDEX_RETIRE_GRACE_S.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=config.INDEX_RETIRE_GRACE_S)
+    bots = (
+        db.query(models.Bot)
+        .filter(models.Bot.retired_index.isnot(None), models.Bot.retired_at < cutoff)
+        .all()
+    )
+    for bot in bots:
+        drop_index(bot.bot_id, bot.retired_index)
+        bot.retired_index = None
+        bot.retired_at = None
+    db.commit()
+    return len(bots)
+
+
+# -------------------------------------------------
+# STALE BUILDS
+# -------------------------------------------------
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_stale(bot: models.Bot, now: float | None = None) -> bool:
+    """
+    True if a bot's current build is no longer running: the process
+    that ran it on this host is gone, or it has not sent a heartbeat for
+    BUILD_STALE_AFTER_S.
+    """
+    now = now if now is not None else time.time()
+    beat = build_heartbeat(bot.bot_id)
+    if (
+        beat
+        and beat["host"] == socket.gethostname()
+        and beat["pid"] != os.getpid()
+        and not _process_alive(beat["pid"])
+    ):
+        return True
+
+    started = bot.processing_started_at or bot.created_at
+    last_seen = started.replace(tzinfo=timezone.utc).timestamp() if started else 0
+    if beat:
+        last_seen = max(last_seen, beat["at"])
+    return now - last_seen > config.BUILD_STALE_AFTER_S
+
+
+def build_running(bot: models.Bot) -> bool:
+    """
+    True while a build of the bot is in progress (and not stale).
+    """
+    building = bot.processing_started_at is not None or bot.status == "processing"
+    return building and not is_stale(bot)
+
+
+def _claim(db: Session, bot: models.Bot) -> bool:
+    """
+    Take over a stale build; only one worker process wins the update.
+    """
+    claimed = db.execute(
+        update(models.Bot)
+        .where(
+            models.Bot.id == bot.id,
+            models.Bot.processing_started_at == bot.processing_started_at,
+        )
+        .values(
+            processing_started_at=datetime.utcnow(),
+            build_attempts=func.coalesce(models.Bot.build_attempts, 0) + 1,
+        )
+    ).rowcount
+    db.commit()
+    db.refresh(bot)
+    return claimed == 1
+
+
+def resume_build(db: Session, bot: models.Bot) -> str:
+    """
+    Continue a claimed stale build into a clean copy of its collection:
+    "ready" / "failed" (the bot's status afterwards). Create and refresh
+    continue the crawl from its checkpoint, if any; reindex starts over
+    from the snapshot.
+    """
+    kind = bot.build_kind or "create"
+    report = BuildReport(kind, bot.website_url)
+    report.checkpoint = {"resumed": True, "attempt": bot.build_attempts}
+
+    if bot.build_attempts > config.BUILD_MAX_RESUMES:
+        CrawlCheckpoint(bot.bot_id).discard()
+        error = f"Build stopped responding {bot.build_attempts} times, giving up"
+        logger.warning(f"[BUILD] Bot {bot.bot_id}: {error}")
+        finish_build(db, bot, report, error)
+        return bot.status
+
+    logger.info(f"[BUILD] Resuming {kind} of bot {bot.bot_id} (attempt {bot.build_attempts})")
+    if bot.building_index:
+        # The partial index is rebuilt from the checkpointed pages
+        drop_index(bot.bot_id, bot.building_index)
+    else:
+        # Left "processing" before blue/green builds
+        bot.building_index = new_index_name()
+        db.commit()
+
+    def build(index: str) -> int:
+        if kind == "reindex":
+            return reindex_from_snapshot(bot.bot_id, report, index=index)
+        return build_bot_index(bot.bot_id, bot.website_url, report, resume=True, index=index)
+
+    try:
+        chunk_count = run_build(db, bot, report, build)
+        logger.info(f"[BUILD] Bot {bot.bot_id} resumed and READY with {chunk_count} chunks.")
+    except Exception:
+        logger.exception(f"[BUILD] Resumed {kind} of bot {bot.bot_id} failed.")
+    return bot.status
+
+
+# -------------------------------------------------
+# QUEUED RE-INDEXES
+# -------------------------------------------------
+def queue_reindex(db: Session, bots: list[models.Bot]):
+    """
+    Mark bots for a re-index from their latest snapshot (run by the watchdog).
+    """
+    now = datetime.utcnow()
+    for bot in bots:
+        bot.reindex_requested_at = now
+    db.commit()
+
+
+def _start_queued(db: Session, bot: models.Bot) -> bool:
+    """
+    Start a queued re-index unless another build (or worker) got there first.
+    """
+    started = db.execute(
+        update(models.Bot)
+        .where(
+            models.Bot.id == bot.id,
+            models.Bot.reindex_requested_at.isnot(None),
+            models.Bot.processing_started_at.is_(None),
+        )
+        .values(
+            reindex_requested_at=None,
+            build_kind="reindex",
+            building_index=new_index_name(),
+            processing_started_at=datetime.utcnow(),
+            build_attempts=0,
+        )
+    ).rowcount
+    db.commit()
+    db.refresh(bot)
+    if started and bot.status != "ready":
+        bot.status = "processing"
+        db.commit()
+    return started == 1
+
+
+def run_queued_reindexes(db: Session, stopping: threading.Event | None = None) -> dict[str, str]:
+    """
+    Run queued re-indexes one at a time, oldest request first:
+    {bot_id: "ready" | "failed"} (the build's outcome).
+    """
+    outcomes: dict[str, str] = {}
+    while stopping is None or not stopping.is_set():
+        bot = (
+            db.query(models.Bot)
+            .filter(
+                models.Bot.reindex_requested_at.isnot(None),
+                models.Bot.processing_started_at.is_(None),
+            )
+            .order_by(models.Bot.reindex_requested_at, models.Bot.id)
+            .first()
+        )
+        if bot is None:
+            break
+        if not _start_queued(db, bot):
+            continue
+
+        report = BuildReport("reindex", bot.website_url)
+        try:
+            run_build(db, bot, report, lambda index: reindex_from_snapshot(bot.bot_id, report, index=index))
+        except Exception:
+            logger.exception(f"[BUILD] Queued re-index of bot {bot.bot_id} failed.")
+        outcomes[bot.bot_id] = report.status
+    return outcomes
+
+
+# -------------------------------------------------
+# WATCHDOG
+# -------------------------------------------------
+class BuildWatchdog:
+    """
+    Finds bots whose build is no longer running (worker restarted or hung)
+    and resumes them, one at a time, runs queued re-indexes, then drops
+    retired indexes past their grace period; in a background thread, at
+    startup, every BUILD_WATCHDOG_INTERVAL_S and when woken.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval_s: float = config.BUILD_WATCHDOG_INTERVAL_S):
+        self._session_factory = session_factory
+        self._interval = interval_s
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="build-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("[BUILD] Watchdog started")
+
+    def stop(self):
+        """
+        Stop looking for stale builds. A resume still running is abandoned;
+        its checkpoint lets the next start continue it.
+        """
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def wake(self):
+        """
+        Look for work now (e.g. re-indexes just queued) instead of at the next interval.
+        """
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.check()
+                db = self._session_factory()
+                try:
+                    run_queued_reindexes(db, self._stopping)
+                    collect_retired_indexes(db)
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("[BUILD] Watchdog check failed")
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+
+    def check(self) -> dict[str, str]:
+        """
+        Resume (or fail) every stale build: {bot_id: "ready" | "failed"}.
+        """
+        outcomes: dict[str, str] = {}
+        db = self._session_factory()
+        try:
+            stuck = (
+                db.query(models.Bot)
+                .filter(or_(
+                    models.Bot.processing_started_at.isnot(None),
+                    models.Bot.status == "processing",
+                ))
+                .all()
+            )
+            for bot in stuck:
+                if self._stopping.is_set():
+                    break
+                if not is_stale(bot) or not _claim(db, bot):
+                    continue
+                outcomes[bot.bot_id] = resume_build(db, bot)
+        finally:
+            db.close()
+        return outcomes
+
+
+# Started / stopped with the FastAPI app (see app/main.py)
+build_watchdog = BuildWatchdog()
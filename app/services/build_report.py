@@ -0,0 +1,160 @@
+import time
+from datetime import datetime
+
+from app import config
+
+# Bump when crawl / clean / chunk / embed behaviour changes,
+# so reports from different pipeline versions can be compared.
+PIPELINE_VERSION = "7"
+
+
+class BuildReport:
+    """
+    Structured profile of one bot build (create or refresh):
+    crawl outcome per page, text volume before/after cleaning,
+    chunk counts and time spent per pipeline stage.
+    """
+
+    def __init__(self, kind: str, website_url: str):
+        self.kind = kind
+        self.website_url = website_url
+        self.pipeline_version = PIPELINE_VERSION
+        self.started_at = datetime.utcnow()
+        self.finished_at: datetime | None = None
+        self.status = "running"
+        self.error: str | None = None
+
+        self.pages_discovered = 0
+        # robots.txt / sitemap discovery before the crawl
+        self.discovery: dict = {}
+        # Crawl snapshot written (or, for a reindex, read)
+        self.snapshot: dict = {}
+        # Set when the build resumed an interrupted crawl from its checkpoint
+        self.checkpoint: dict = {}
+        # Collection built, the one it replaced and whether it went live
+        self.index: dict = {}
+        # URL frontier stats (duplicate URLs collapsed, non-HTML links skipped, ...)
+        self.frontier: dict = {}
+        self.pages: list[dict] = []
+
+        self.raw_text_bytes = 0
+        self.cleaned_text_bytes = 0
+        self.chunk_count = 0
+        self.chunking_mode = config.CHUNKING_MODE
+        # Chunk text beyond the embedding model's input window (silently dropped)
+        self.truncated_chunks = 0
+        self.truncated_tokens = 0
+        # Cross-page boilerplate removal stats (words removed, chunks avoided, ...)
+        self.boilerplate: dict = {}
+        # Near-duplicate chunks merged before embedding
+        self.near_duplicates: dict = {}
+
+        # stage -> ms
+        self.timings: dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    # -------------------------------------------------
+    # RECORDING
+    # -------------------------------------------------
+    def page_fetched(self, url: str, fetch_ms: float, text_bytes: int, lastmod: str | None = None):
+        page = {
+            "url": url,
+            "status": "fetched",
+            "fetch_ms": round(fetch_ms, 1),
+            "text_bytes": text_bytes,
+        }
+        if lastmod:
+            # Sitemap lastmod, for incremental refresh to compare against
+            page["lastmod"] = lastmod
+        self.pages.append(page)
+
+    def page_skipped(self, url: str, reason: str, fetch_ms: float | None = None):
+        self.pages.append({
+            "url": url,
+            "status": "skipped",
+            "reason": reason,
+            "fetch_ms": round(fetch_ms, 1) if fetch_ms is not None else None,
+        })
+
+    def page_failed(self, url: str, error: str, fetch_ms: float | None = None):
+        self.pages.append({
+            "url": url,
+            "status": "failed",
+            "error": error,
+            "fetch_ms": round(fetch_ms, 1) if fetch_ms is not None else None,
+        })
+
+    def page_processed(
+        self,
+        url: str,
+        raw_bytes: int,
+        cleaned_bytes: int,
+        chunks: int,
+        truncated_tokens: int = 0,
+        truncated_chunks: int = 0,
+    ):
+        self.raw_text_bytes += raw_bytes
+        self.cleaned_text_bytes += cleaned_bytes
+        self.chunk_count += chunks
+        self.truncated_tokens += truncated_tokens
+        self.truncated_chunks += truncated_chunks
+        for page in self.pages:
+            if page["url"] == url and page["status"] == "fetched":
+                page["cleaned_bytes"] = cleaned_bytes
+                page["chunks"] = chunks
+                page["truncated_tokens"] = truncated_tokens
+                break
+
+    def add_time(self, stage: str, ms: float):
+        self.timings[stage] = round(self.timings.get(stage, 0) + ms, 1)
+
+    def finish(self, status: str, error: str | None = None):
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self.timings["total"] = round((time.perf_counter() - self._start) * 1000, 1)
+
+    # -------------------------------------------------
+    # SUMMARY
+    # -------------------------------------------------
+    def _count(self, status: str) -> int:
+        return sum(1 for p in self.pages if p["status"] == status)
+
+    @property
+    def pages_fetched(self) -> int:
+        return self._count("fetched")
+
+    @property
+    def duration_ms(self) -> int | None:
+        total = self.timings.get("total")
+        return int(total) if total is not None else None
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "website_url": self.website_url,
+            "pipeline_version": self.pipeline_version,
+            "status": self.status,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "pages_discovered": self.pages_discovered,
+            "discovery": self.discovery,
+            "frontier": self.frontier,
+            "snapshot": self.snapshot,
+            "checkpoint": self.checkpoint,
+            "index": self.index,
+            "pages_fetched": self.pages_fetched,
+            "pages_skipped": self._count("skipped"),
+            "pages_failed": self._count("failed"),
+            "raw_text_bytes": self.raw_text_bytes,
+            "cleaned_text_bytes": self.cleaned_text_bytes,
+            "chunk_count": self.chunk_count,
+            "chunking_mode": self.chunking_mode,
+            "truncated_chunks": self.truncated_chunks,
+            "truncated_tokens": self.truncated_tokens,
+            "boilerplate": self.boilerplate,
+            "near_duplicates": self.near_duplicates,
+            "timings_ms": self.timings,
+            "pages": self.pages,
+        }
@@ -0,0 +1,211 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, update
+
+from app import config, models
+from app.db import SessionLocal
+from app.services.usage_rollups import apply_usage_events
+
+logger = logging.getLogger(__name__)
+
+
+class ChatLogWriter:
+    """
+    Write-behind buffer for chat metrics.
+
+    The chat endpoint enqueues one record per answered message; a background
+    thread writes queued records in a single transaction every
+    CHAT_LOG_FLUSH_INTERVAL_MS or as soon as CHAT_LOG_BATCH_SIZE records are
+    waiting:
+    - one bulk INSERT into chat_logs
+    - one atomic `message_count = message_count + n` UPDATE per bot
+    - hourly / daily usage rollups (see usage_rollups.py)
+
+    When the thread is not running (scripts, tests) records are written inline.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        flush_interval_ms: int = config.CHAT_LOG_FLUSH_INTERVAL_MS,
+        batch_size: int = config.CHAT_LOG_BATCH_SIZE,
+        max_pending: int = config.CHAT_LOG_MAX_PENDING,
+    ):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval_ms / 1000
+        self._batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._flush_lock = threading.Lock()
+
+    # -------------------------------------------------
+    # LIFECYCLE
+    # -------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="chat-log-writer", daemon=True
+        )
+        self._thread.start()
+        logger.info("[WRITE-BEHIND] ChatLog writer started")
+
+    def stop(self):
+        """
+        Stop the background thread and drain everything still queued.
+        """
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        logger.info("[WRITE-BEHIND] ChatLog writer stopped, queue drained")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    # -------------------------------------------------
+    # PRODUCER SIDE
+    # -------------------------------------------------
+    def enqueue(
+        self,
+        bot_pk: int,
+        user_message: str,
+        bot_response: str,
+        retrieved_sources: str | None,
+        response_time_ms: int | None,
+        session_id: str | None = None,
+        created_at: datetime | None = None,
+        cache_hit: bool = False,
+        stage_timings: str | None = None,
+    ):
+        """
+        Queue one answered message (ChatLog row + counters + rollups).
+        """
+        created_at = created_at or datetime.utcnow()
+        self._put({
+            "log": {
+                "session_id": session_id,
+                "bot_id": bot_pk,
+                "user_message": user_message,
+                "bot_response": bot_response,
+                "retrieved_sources": retrieved_sources,
+                "response_time_ms": response_time_ms,
+                "stage_timings": stage_timings,
+                "created_at": created_at,
+            },
+            "usage": {
+                "bot_id": bot_pk,
+                "created_at": created_at,
+                "response_time_ms": response_time_ms,
+                "cache_hit": cache_hit,
+                "error": False,
+            },
+        })
+
+    def record_error(self, bot_pk: int, response_time_ms: int | None = None):
+        """
+        Queue a failed chat request: counted in the rollups only.
+        """
+        self._put({
+            "log": None,
+            "usage": {
+                "bot_id": bot_pk,
+                "created_at": datetime.utcnow(),
+                "response_time_ms": response_time_ms,
+                "cache_hit": False,
+                "error": True,
+            },
+        })
+
+    def _put(self, item: dict):
+        if not self.running:
+            self._write_batch([item])
+            return
+
+        # Blocks when max_pending is reached (backpressure instead of unbounded memory)
+        self._queue.put(item)
+        if self._queue.qsize() >= self._batch_size:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # -------------------------------------------------
+    # CONSUMER SIDE
+    # -------------------------------------------------
+    def flush(self):
+        """
+        Write everything currently queued, in batches of batch_size.
+        """
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self._batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._write_batch(batch)
+
+    def _write_batch(self, items: list[dict]):
+        records = [item["log"] for item in items if item["log"] is not None]
+
+        # Per-bot counter deltas + latest usage timestamp
+        deltas: dict[int, list] = {}
+        for rec in records:
+            delta = deltas.setdefault(rec["bot_id"], [0, rec["created_at"]])
+            delta[0] += 1
+            delta[1] = max(delta[1], rec["created_at"])
+
+        start = time.perf_counter()
+        db = self._session_factory()
+        try:
+            if records:
+                db.execute(insert(models.ChatLog), records)
+
+            for bot_pk, (count, last_used_at) in deltas.items():
+                db.execute(
+                    update(models.Bot)
+                    .where(models.Bot.id == bot_pk)
+                    .values(
+                        message_count=func.coalesce(models.Bot.message_count, 0) + count,
+                        last_used_at=last_used_at,
+                    )
+                )
+
+            apply_usage_events(db, [item["usage"] for item in items])
+
+            db.commit()
+            logger.info(
+                f"[WRITE-BEHIND] Flushed {len(records)} chat logs "
+                f"({len(items) - len(records)} errors) for {len(deltas)} bot(s) "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+        except Exception:
+            # Metrics must never break chat; the batch is dropped
+            db.rollback()
+            logger.exception(f"[WRITE-BEHIND] Failed to flush {len(items)} chat records")
+        finally:
+            db.close()
+
+
+# Started / stopped with the FastAPI app (see app/main.py)
+chat_log_writer = ChatLogWriter()
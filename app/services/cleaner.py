@@ -1,5 +1,126 @@
 import re
 
+# Obvious boilerplate junk, removed case-insensitively
+BLACKLIST_PATTERNS = [
+    r"© \d{4}",
+    r"all rights reserved",
+    r"terms and conditions",
+    r"privacy policy",
+    r"follow us",
+    r"newsletter subscribe",
+    r"cookie policy",
+]
+
+# Short lines containing one of these are kept (contact info)
+IMPORTANT_KEYWORDS = [
+    "contact", "email", "phone", "support", "call",
+    "help", "address", "reach us", "get in touch", "chat",
+    "whatsapp", "message us"
+]
+
+# Lines shorter than this are dropped unless they look important
+MIN_LINE_LENGTH = 25
+
+
+# -----------------------------------------------------
+# COMPILED ENGINE
+# -----------------------------------------------------
+def _trie_regex(words: list[str]) -> str:
+    """
+    Regex alternation factored by common prefixes ("ca(?:ll|...)"), so all
+    keywords are matched in one scan without retrying every word per position.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end of word
+
+    def build(node: dict) -> str:
+        if "" in node:
+            # A shorter keyword ends here: a match is already found
+            return ""
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+_BLACKLIST_RE = re.compile(
+    # Cheap first-character check before trying the alternation
+    "(?=[" + "".join(sorted({ch for p in BLACKLIST_PATTERNS for ch in (p[0].lower(), p[0].upper())})) + "])"
+    "(?:" + "|".join(BLACKLIST_PATTERNS) + ")",
+    re.IGNORECASE,
+)
+# Matched case-sensitively against text.lower(), much faster than IGNORECASE
+_BLACKLIST_LOWER_RE = re.compile("|".join(BLACKLIST_PATTERNS))
+_SEQUENTIAL_BLACKLIST = [re.compile(p, re.IGNORECASE) for p in BLACKLIST_PATTERNS]
+# The only characters where IGNORECASE and lower() disagree for the blacklist's letters
+_CASE_SPECIAL_CHARS = ("İ", "ı", "ſ")
+
+# Email / phone. Existence-equivalent to the original patterns:
+# \S+@\S+ -> \S@\S and \+?\d[\d\s\-]{7,} -> \d[\d\s\-]{7}
+_CONTACT_PATTERN = r"\S@\S|\d[\d\s\-]{7}"
+_CONTACT_RE = re.compile(_CONTACT_PATTERN)
+
+# One search per line replaces the email / phone / keyword checks.
+# Run on the lower-cased line.
+_IMPORTANT_RE = re.compile(_CONTACT_PATTERN + "|" + _trie_regex(IMPORTANT_KEYWORDS))
+
+# Lines are the non-empty runs between "." / newline, yielded lazily
+_LINE_RE = re.compile(r"[^.\n]+")
+
+
+def _remove_boilerplate_lowered(text: str, lowered: str) -> tuple[str, bool]:
+    """
+    Single-pass removal using match positions found in the lower-cased text
+    (same length as `text`): (result, whether a joined match is left).
+    """
+    pieces, lowered_pieces = [], []
+    last = 0
+    for match in _BLACKLIST_LOWER_RE.finditer(lowered):
+        start, end = match.span()
+        pieces.append(text[last:start])
+        lowered_pieces.append(lowered[last:start])
+        last = end
+
+    if not pieces:
+        return text, False
+
+    pieces.append(text[last:])
+    lowered_pieces.append(lowered[last:])
+    result = " ".join(pieces)
+    return result, _BLACKLIST_LOWER_RE.search(" ".join(lowered_pieces)) is not None
+
+
+def _remove_boilerplate(text: str) -> str:
+    """
+    All blacklist patterns in one pass. The original removed them one pattern
+    at a time, so a removal could join text into a new match for a later
+    pattern ("followprivacy policyus" -> "follow us"). If anything matches
+    after the single pass, redo it sequentially to stay output-identical.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text) and not any(ch in text for ch in _CASE_SPECIAL_CHARS):
+        result, rematch = _remove_boilerplate_lowered(text, lowered)
+    else:
+        result, removed = _BLACKLIST_RE.subn(" ", text)
+        rematch = bool(removed) and _BLACKLIST_RE.search(result) is not None
+
+    if rematch:
+        result = text
+        for pattern in _SEQUENTIAL_BLACKLIST:
+            result = pattern.sub(" ", result)
+    return result
+
+
+def has_contact_details(text: str) -> bool:
+    """
+    Whether text contains an email address or a phone number.
+    """
+    return _CONTACT_RE.search(text) is not None
+
 
 def clean_scraped_text(text: str) -> str:
     """
@@ -8,6 +129,51 @@ def clean_scraped_text(text: str) -> str:
     - Keeps email, phone, addresses, contact info
     - Keeps short lines if they look important
     - Removes duplicates
+
+    Single pass per step with precompiled patterns; output is identical to
+    reference_clean_scraped_text (see app/test_cleaner.py).
+    """
+
+    if not text:
+        return ""
+
+    # Normalize whitespace (str.split() uses the same whitespace set as \s)
+    text = _remove_boilerplate(" ".join(text.split()))
+
+    cleaned = []
+    seen = set()
+
+    for match in _LINE_RE.finditer(text):
+        line = match.group().strip()
+
+        if not line:
+            continue
+
+        lower_line = line.lower()
+
+        # Keep short lines ONLY if they are important
+        # (the importance check only matters for short lines)
+        if len(line) < MIN_LINE_LENGTH and not _IMPORTANT_RE.search(lower_line):
+            continue
+
+        # Remove duplicate lines
+        if lower_line in seen:
+            continue
+
+        seen.add(lower_line)
+        cleaned.append(line)
+
+    # Join everything back
+    return ". ".join(cleaned).strip()
+
+
+# -----------------------------------------------------
+# REFERENCE IMPLEMENTATION
+# -----------------------------------------------------
+def reference_clean_scraped_text(text: str) -> str:
+    """
+    The original multi-pass cleaner, kept as the behavioural reference
+    for the differential test and the cleaner benchmark.
     """
 
     if not text:
@@ -17,17 +183,7 @@ def clean_scraped_text(text: str) -> str:
     text = re.sub(r"\s+", " ", text).strip()
 
     # Remove obvious boilerplate junk (case-insensitive)
-    blacklist_patterns = [
-        r"© \d{4}",
-        r"all rights reserved",
-        r"terms and conditions",
-        r"privacy policy",
-        r"follow us",
-        r"newsletter subscribe",
-        r"cookie policy",
-    ]
-
-    for pattern in blacklist_patterns:
+    for pattern in BLACKLIST_PATTERNS:
         text = re.sub(pattern, " ", text, flags=re.IGNORECASE)
 
     # Split text into manageable lines
@@ -38,13 +194,6 @@ def clean_scraped_text(text: str) -> str:
     # Patterns to detect contact info
     email_pattern = re.compile(r"\S+@\S+")
     phone_pattern = re.compile(r"\+?\d[\d\s\-]{7,}")
-    url_pattern = re.compile(r"(http|www)\S+")
-
-    important_keywords = [
-        "contact", "email", "phone", "support", "call",
-        "help", "address", "reach us", "get in touch", "chat",
-        "whatsapp", "message us"
-    ]
 
     for line in raw_lines:
         line = line.strip()
@@ -58,11 +207,11 @@ def clean_scraped_text(text: str) -> str:
         is_important = (
             email_pattern.search(line) or
             phone_pattern.search(line) or
-            any(keyword in lower_line for keyword in important_keywords)
+            any(keyword in lower_line for keyword in IMPORTANT_KEYWORDS)
         )
 
         # Keep short lines ONLY if they are important
-        if len(line) < 25 and not is_important:
+        if len(line) < MIN_LINE_LENGTH and not is_important:
             continue
 
         # Remove duplicate lines
@@ -1,51 +1,105 @@
 import asyncio
 import logging
-from typing import Dict, Set
-from urllib.parse import urljoin, urlparse
+import time
+from typing import AsyncIterator, Dict, Tuple
 
 from playwright.async_api import async_playwright
+from app import config
+from app.services.discovery import USER_AGENT, SiteDiscovery, discover_site
+from app.services.frontier import UrlFrontier
+from app.services.metrics import instrument
+from app.services.snapshots import get_blob
 
 logger = logging.getLogger(__name__)
 
 
-def _is_same_domain(base_url: str, target_url: str) -> bool:
-    base_domain = urlparse(base_url).netloc
-    target_domain = urlparse(target_url).netloc
-    return target_domain == "" or target_domain == base_domain
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
 
 
-async def _crawl_website_async(start_url: str, max_pages: int = 10) -> Dict[str, str]:
+async def iter_site_pages(
+    start_url: str, max_pages: int = 10, report=None, snapshot=None, checkpoint=None
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Crawl up to max_pages same-site pages, yielding (page_url, visible text)
+    as each page is fetched, so ingestion can start before the crawl ends.
+    Pages are taken from a UrlFrontier: canonical URLs, breadth-first with
+    high-value paths first, pages with already-seen text skipped.
+
+    The frontier is seeded from robots.txt / sitemaps first; links found in
+    rendered pages are only followed when the sitemaps list fewer pages
+    than the budget. Pass a SnapshotWriter to keep every page's text
+    (and HTML, if the writer stores it).
+
+    Pass a CrawlCheckpoint to save the crawl every CRAWL_CHECKPOINT_EVERY
+    pages; if it was loaded from an interrupted run, the pages collected
+    then are yielded again first and the crawl continues from its frontier.
+    """
     logger.info(f"[Playwright] Starting crawl at {start_url} (max_pages={max_pages})")
 
-    to_visit: Set[str] = {start_url}
-    visited: Set[str] = set()
-    results: Dict[str, str] = {}
+    discovery_start = time.perf_counter()
+    try:
+        discovery = await discover_site(start_url)
+    except Exception as e:
+        logger.warning(f"[Discovery] Failed for {start_url}, following links only: {e}")
+        discovery = SiteDiscovery()
+    if report:
+        report.discovery = dict(discovery.stats(), ms=round(_elapsed_ms(discovery_start), 1))
+
+    frontier = UrlFrontier(start_url, allowed=discovery.can_fetch)
+    resumed = checkpoint.crawl if checkpoint else None
+    if resumed:
+        frontier.restore(resumed["frontier"])
+        follow_links = resumed["follow_links"]
+        attempted = resumed["attempted"]
+    else:
+        seeded = frontier.seed(discovery.urls)
+        follow_links = seeded + 1 < max_pages
+        attempted = 0
+    collected = 0
+
+    if resumed:
+        # Pages collected before the interruption are handed on again first
+        for saved in list(checkpoint.pages):
+            text = await asyncio.to_thread(get_blob, saved["text"])
+            collected += 1
+            if snapshot:
+                snapshot.add_page(saved["url"], text, lastmod=saved.get("lastmod"))
+            if report:
+                report.page_fetched(saved["url"], 0, len(text.encode("utf-8")), lastmod=saved.get("lastmod"))
+            yield saved["url"], text
+        logger.info(f"[Playwright] Resumed crawl of {start_url} after {collected} pages ({attempted} attempted)")
+        if report:
+            report.checkpoint = dict(
+                report.checkpoint, resumed=True, pages_replayed=collected, attempted=attempted
+            )
 
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         page = await browser.new_page()
 
         await page.set_extra_http_headers({
-            "User-Agent": "website-to-chatbot/1.0 (Playwright crawler)"
+            "User-Agent": USER_AGENT
         })
 
-        base_domain = urlparse(start_url).netloc
+        while attempted < max_pages and (next_url := frontier.pop()):
+            url, depth = next_url
+            attempted += 1
 
-        while to_visit and len(visited) < max_pages:
-            url = to_visit.pop()
-            if url in visited:
-                continue
-
-            logger.info(f"[Playwright] Crawling URL: {url}")
+            logger.info(f"[Playwright] Crawling URL: {url} (depth={depth})")
+            fetch_start = time.perf_counter()
 
             try:
                 # 👉 Correct way: response comes from goto()
                 response = await page.goto(url, wait_until="networkidle", timeout=30000)
                 status = response.status if response else None
+                # Links to the redirect target must not be queued again
+                frontier.mark_seen(page.url)
 
                 if not response or status >= 400:
                     logger.warning(f"[Playwright] Skipping {url}, bad status={status}")
-                    visited.add(url)
+                    if report:
+                        report.page_skipped(url, f"status={status}", _elapsed_ms(fetch_start))
                     continue
 
                 # Extract visible text (DOM-based)
@@ -54,34 +108,76 @@ async def _crawl_website_async(start_url: str, max_pages: int = 10) -> Dict[str,
 
                 if len(text) < 50:
                     logger.warning(f"[Playwright] Insufficient text at {url}")
-                    visited.add(url)
+                    if report:
+                        report.page_skipped(url, "insufficient text", _elapsed_ms(fetch_start))
                     continue
 
-                # Save
-                results[url] = text
-                visited.add(url)
-
-                # Extract all links from the DOM
-                hrefs = await page.eval_on_selector_all(
-                    "a[href]",
-                    "els => els.map(e => e.href)"   # absolute URLs via DOM
-                )
+                # Same page under another URL (e.g. /index.html and /)
+                if frontier.is_duplicate_content(text):
+                    logger.info(f"[Playwright] Duplicate content at {url}")
+                    if report:
+                        report.page_skipped(url, "duplicate content", _elapsed_ms(fetch_start))
+                    continue
 
-                for link in hrefs:
-                    if _is_same_domain(start_url, link):
-                        if link not in visited and link not in to_visit:
-                            to_visit.add(link)
+                collected += 1
+                if snapshot:
+                    html = await page.content() if snapshot.store_html else None
+                    snapshot.add_page(url, text, html=html, lastmod=frontier.lastmod.get(url))
+                if report:
+                    report.page_fetched(
+                        url, _elapsed_ms(fetch_start), len(text.encode("utf-8")),
+                        lastmod=frontier.lastmod.get(url),
+                    )
+
+                if follow_links:
+                    # Extract all links from the DOM
+                    hrefs = await page.eval_on_selector_all(
+                        "a[href]",
+                        "els => els.map(e => e.href)"   # absolute URLs via DOM
+                    )
+
+                    for link in hrefs:
+                        frontier.add(link, depth + 1, base=page.url)
+
+                if checkpoint:
+                    checkpoint.add_page(url, text, lastmod=frontier.lastmod.get(url))
+                    if collected % max(config.CRAWL_CHECKPOINT_EVERY, 1) == 0:
+                        crawl = {
+                            "frontier": frontier.state(),
+                            "attempted": attempted,
+                            "follow_links": follow_links,
+                        }
+                        await asyncio.to_thread(checkpoint.save, crawl)
+
+                # Hand the page on; links are queued first so the crawl
+                # continues from here when the consumer asks for more
+                yield url, text
 
             except Exception as e:
                 logger.exception(f"[Playwright] Error while crawling {url}: {e}")
-                visited.add(url)
+                if report:
+                    report.page_failed(url, str(e), _elapsed_ms(fetch_start))
                 continue
 
         await browser.close()
 
-    logger.info(f"[Playwright] Finished crawling. Total pages collected: {len(results)}")
-    return results
+    if report:
+        report.pages_discovered = frontier.stats["discovered"]
+        report.frontier = dict(frontier.stats)
+
+    logger.info(f"[Playwright] Finished crawling. Total pages collected: {collected}")
+
+
+async def _crawl_website_async(
+    start_url: str, max_pages: int = 10, report=None
+) -> Dict[str, str]:
+    return {url: text async for url, text in iter_site_pages(start_url, max_pages, report)}
 
 
-def crawl_website(start_url: str, max_pages: int = 10) -> Dict[str, str]:
-    return asyncio.run(_crawl_website_async(start_url, max_pages))
+@instrument("crawl")
+def crawl_website(start_url: str, max_pages: int = 10, report=None) -> Dict[str, str]:
+    """
+    Crawl up to max_pages same-domain pages: {page_url: visible text}.
+    Pass a BuildReport to record per-page fetch outcomes and timings.
+    """
+    return asyncio.run(_crawl_website_async(start_url, max_pages, report))
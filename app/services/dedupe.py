@@ -0,0 +1,117 @@
+import logging
+
+import numpy as np
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family; shingle hashes are reduced
+# below it so a * h + b fits in uint64
+_PRIME = (1 << 31) - 1
+
+
+def _shingle_hashes(text: str, size: int = 3) -> np.ndarray:
+    """
+    Hashes of the word `size`-grams of a chunk (case-insensitive).
+    """
+    words = text.lower().split()
+    if len(words) <= size:
+        grams = {" ".join(words)}
+    else:
+        grams = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((hash(g) & _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash + LSH near-duplicate detection for one bot build.
+
+    Chunks are added in order; the first chunk of a cluster becomes its
+    representative. A later chunk whose estimated Jaccard similarity with a
+    representative (found through shared LSH band buckets) reaches
+    `threshold` is a duplicate, and only its page_url is recorded.
+    """
+
+    def __init__(
+        self,
+        threshold: float = config.NEAR_DUP_THRESHOLD,
+        num_perm: int = config.NEAR_DUP_NUM_PERM,
+        bands: int = config.NEAR_DUP_BANDS,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._threshold = threshold
+        self._bands = bands
+        self._rows = num_perm // bands
+
+        # One bucket table per band: hash of the band signature -> representative
+        # id, or a list of ids once several share it (kept small: the index
+        # lives for the whole build)
+        self._buckets: list[dict[int, int | list[int]]] = [{} for _ in range(bands)]
+        self._signatures: list[np.ndarray] = []
+        self.page_urls: list[list[str]] = []
+        self.added = 0
+        self.duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = _shingle_hashes(text)
+        if not len(hashes):
+            return np.full(len(self._a), _PRIME, dtype=np.uint32)
+        # Values are below _PRIME, so they fit in half the width
+        minima = ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+        return minima.astype(np.uint32)
+
+    def add(self, text: str, page_url: str) -> int | None:
+        """
+        Returns None when `text` starts a new cluster (embed and store it),
+        otherwise the id of the representative it duplicates.
+        Representative ids count from 0 in the order they were added.
+        """
+        self.added += 1
+        signature = self.signature(text)
+        keys = [
+            hash(signature[band * self._rows:(band + 1) * self._rows].tobytes())
+            for band in range(self._bands)
+        ]
+
+        candidates = set()
+        for band, key in enumerate(keys):
+            found = self._buckets[band].get(key)
+            if isinstance(found, list):
+                candidates.update(found)
+            elif found is not None:
+                candidates.add(found)
+        for rep in sorted(candidates):
+            similarity = float(np.mean(self._signatures[rep] == signature))
+            if similarity >= self._threshold:
+                if page_url not in self.page_urls[rep]:
+                    self.page_urls[rep].append(page_url)
+                self.duplicates += 1
+                return rep
+
+        rep = len(self._signatures)
+        self._signatures.append(signature)
+        self.page_urls.append([page_url])
+        for band, key in enumerate(keys):
+            bucket = self._buckets[band]
+            found = bucket.get(key)
+            if found is None:
+                bucket[key] = rep
+            elif isinstance(found, list):
+                found.append(rep)
+            else:
+                bucket[key] = [found, rep]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "chunks_in": self.added,
+            "duplicates_removed": self.duplicates,
+            "representatives": len(self._signatures),
+            "multi_page_representatives": sum(1 for urls in self.page_urls if len(urls) > 1),
+        }
@@ -0,0 +1,169 @@
+import logging
+import zlib
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import httpx
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# Sent with every request; robots.txt rules are matched on the product token
+USER_AGENT = "website-to-chatbot/1.0 (Playwright crawler)"
+ROBOTS_AGENT = "website-to-chatbot"
+
+# sitemaps.org limit for one sitemap file (uncompressed)
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass
+class SiteDiscovery:
+    """
+    What a site says about itself before any page is rendered.
+    """
+    robots: Optional[RobotFileParser] = None
+    sitemaps: list[str] = field(default_factory=list)
+    # (page_url, lastmod or None), in sitemap order
+    urls: list[Tuple[str, Optional[str]]] = field(default_factory=list)
+
+    def can_fetch(self, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(ROBOTS_AGENT, url)
+
+    def stats(self) -> dict:
+        return {
+            "robots_txt": self.robots is not None,
+            "sitemaps_read": len(self.sitemaps),
+            "sitemap_urls": len(self.urls),
+            "with_lastmod": sum(1 for _, lastmod in self.urls if lastmod),
+        }
+
+
+def _local(tag: str) -> str:
+    # "{http://www.sitemaps.org/schemas/sitemap/0.9}loc" -> "loc"
+    return tag.rsplit("}", 1)[-1]
+
+
+async def fetch_robots(client: httpx.AsyncClient, site_root: str) -> Optional[RobotFileParser]:
+    """
+    Parsed robots.txt, or None when it is missing or unreachable (crawl all).
+    Like RobotFileParser.read(), 401 / 403 means the whole site is off limits.
+    """
+    robots_url = urljoin(site_root, "/robots.txt")
+    try:
+        response = await client.get(robots_url)
+    except httpx.HTTPError as e:
+        logger.info(f"[Discovery] robots.txt unreachable at {robots_url}: {e}")
+        return None
+
+    parser = RobotFileParser(robots_url)
+    if response.status_code in (401, 403):
+        parser.disallow_all = True
+    elif response.status_code >= 400:
+        return None
+    else:
+        parser.parse(response.text.splitlines())
+    return parser
+
+
+async def _iter_sitemap_entries(
+    client: httpx.AsyncClient, sitemap_url: str
+) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+    """
+    Stream one sitemap file: yields ("sitemap" | "url", loc, lastmod) as each
+    entry is parsed. Gzipped files (.xml.gz) are inflated on the fly; parsed
+    elements are dropped as they are read, so memory stays flat.
+    """
+    parser = XMLPullParser(events=("end",))
+    inflater = None
+    received = 0
+
+    async with client.stream("GET", sitemap_url) as response:
+        if response.status_code >= 400:
+            logger.info(f"[Discovery] Sitemap {sitemap_url}: status={response.status_code}")
+            return
+
+        async for data in response.aiter_bytes():
+            if received == 0 and data.startswith(_GZIP_MAGIC):
+                inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if inflater is not None:
+                data = inflater.decompress(data, MAX_SITEMAP_BYTES - received + 1)
+            received += len(data)
+            if received > MAX_SITEMAP_BYTES:
+                logger.warning(f"[Discovery] Sitemap {sitemap_url} exceeds {MAX_SITEMAP_BYTES} bytes, truncated")
+                break
+
+            parser.feed(data)
+            loc = lastmod = None
+            for _, element in parser.read_events():
+                tag = _local(element.tag)
+                if tag in ("url", "sitemap"):
+                    for child in element:
+                        child_tag = _local(child.tag)
+                        if child_tag == "loc" and child.text:
+                            loc = child.text.strip()
+                        elif child_tag == "lastmod" and child.text:
+                            lastmod = child.text.strip()
+                    if loc:
+                        yield tag, loc, lastmod
+                    loc = lastmod = None
+                    element.clear()
+
+
+async def discover_site(start_url: str) -> SiteDiscovery:
+    """
+    Read robots.txt (Sitemap lines, disallow rules) and the sitemaps it lists
+    (or /sitemap.xml), following sitemap indexes. Returns at most
+    SITEMAP_MAX_URLS page URLs from at most SITEMAP_MAX_FILES files.
+    Never raises: a site without robots.txt or sitemaps gives an empty result.
+    """
+    parts = urlsplit(start_url)
+    site_root = f"{parts.scheme}://{parts.netloc}/"
+    discovery = SiteDiscovery()
+
+    async with httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        timeout=config.DISCOVERY_TIMEOUT_S,
+        follow_redirects=True,
+    ) as client:
+        if config.CRAWL_RESPECT_ROBOTS:
+            discovery.robots = await fetch_robots(client, site_root)
+        if not config.CRAWL_USE_SITEMAPS:
+            return discovery
+
+        listed = discovery.robots.site_maps() if discovery.robots else None
+        pending = list(listed or [urljoin(site_root, "/sitemap.xml")])
+        queued = set(pending)
+
+        while pending and len(discovery.sitemaps) < config.SITEMAP_MAX_FILES:
+            sitemap_url = pending.pop(0)
+            discovery.sitemaps.append(sitemap_url)
+            try:
+                async with aclosing(_iter_sitemap_entries(client, sitemap_url)) as entries:
+                    async for kind, loc, lastmod in entries:
+                        if kind == "sitemap":
+                            # Sitemap index: nested sitemaps are read after this one
+                            if loc not in queued:
+                                queued.add(loc)
+                                pending.append(loc)
+                        elif len(discovery.urls) < config.SITEMAP_MAX_URLS:
+                            discovery.urls.append((loc, lastmod))
+                        else:
+                            break
+            except (httpx.HTTPError, ParseError, zlib.error) as e:
+                logger.info(f"[Discovery] Could not read sitemap {sitemap_url}: {e}")
+
+            if len(discovery.urls) >= config.SITEMAP_MAX_URLS:
+                break
+
+    logger.info(
+        f"[Discovery] {site_root}: robots.txt={'yes' if discovery.robots else 'no'}, "
+        f"{len(discovery.sitemaps)} sitemaps read, {len(discovery.urls)} URLs"
+    )
+    return discovery
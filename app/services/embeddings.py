@@ -1,15 +1,18 @@
 import logging
 from sentence_transformers import SentenceTransformer
+from app import config
+from app.services.metrics import instrument
 
 logger = logging.getLogger(__name__)
 
 # Load embedding model once globally (fast)
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_NAME = config.EMBED_MODEL
 
 logger.info(f"Loading embedding model: {MODEL_NAME}")
 embedding_model = SentenceTransformer(MODEL_NAME)
 
 
+@instrument("embed")
 def embed_text(texts):
     """
     Embed a list of chunk strings into vectors.
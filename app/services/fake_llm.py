@@ -0,0 +1,57 @@
+import random
+import re
+import time
+from typing import Iterator
+
+from app import config
+from app.services.ai_client import GeminiQuotaError
+
+_CONTEXT_RE = re.compile(r"--- CONTEXT ---(.*?)--- END CONTEXT ---", re.DOTALL)
+
+# Separate generator so injected latency / errors don't disturb other users of `random`
+_rng = random.Random()
+
+
+class FakeLLMError(Exception):
+    pass
+
+
+def _answer_tokens(prompt: str) -> list[str]:
+    """
+    Deterministic answer for a prompt: the first words of the RAG context,
+    so answers vary with the retrieved chunks like real ones do.
+    """
+    match = _CONTEXT_RE.search(prompt)
+    words = (match.group(1) if match else prompt).split()
+    if not words:
+        words = ["No", "context."]
+    count = config.FAKE_LLM_ANSWER_TOKENS
+    return (words * (count // len(words) + 1))[:count]
+
+
+def stream_answer(prompt: str, model: str) -> Iterator[str]:
+    """
+    Local stand-in for a streaming LLM call (LLM_PROVIDER=fake):
+    - waits a log-normal time to first token (median FAKE_LLM_LATENCY_MS)
+    - then yields tokens at FAKE_LLM_TOKENS_PER_S
+    - fails with the configured error / quota-error rates
+    """
+    roll = _rng.random()
+    if roll < config.FAKE_LLM_QUOTA_ERROR_RATE:
+        raise GeminiQuotaError(f"Fake quota exceeded ({model})")
+    if roll < config.FAKE_LLM_QUOTA_ERROR_RATE + config.FAKE_LLM_ERROR_RATE:
+        raise FakeLLMError(f"Injected fake LLM error ({model})")
+
+    if config.FAKE_LLM_LATENCY_MS > 0:
+        first_token_ms = _rng.lognormvariate(0, config.FAKE_LLM_LATENCY_SIGMA) * config.FAKE_LLM_LATENCY_MS
+        time.sleep(first_token_ms / 1000)
+
+    delay = 1 / config.FAKE_LLM_TOKENS_PER_S if config.FAKE_LLM_TOKENS_PER_S > 0 else 0
+    for i, token in enumerate(_answer_tokens(prompt)):
+        if i and delay:
+            time.sleep(delay)
+        yield token if i == 0 else " " + token
+
+
+def generate_answer(prompt: str, model: str) -> str:
+    return "".join(stream_answer(prompt, model))
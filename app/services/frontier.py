@@ -0,0 +1,286 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import posixpath
+import re
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "dclid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref", "ref_src", "source", "trk",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+# Links to files the browser would download rather than render
+NON_HTML_EXTENSIONS = {
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".csv",
+    ".zip", ".gz", ".tar", ".rar", ".7z", ".dmg", ".exe", ".apk",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".bmp", ".tif", ".tiff",
+    ".mp3", ".mp4", ".wav", ".avi", ".mov", ".webm", ".ogg",
+    ".css", ".js", ".json", ".xml", ".rss", ".atom", ".txt",
+    ".woff", ".woff2", ".ttf", ".eot",
+}
+
+# Directory index files: "/docs/index.html" is the page "/docs"
+INDEX_FILES = {"index.html", "index.htm", "index.php", "default.htm", "default.html", "default.aspx"}
+
+# Path words of pages a support chatbot most needs, fetched first at each depth
+HIGH_VALUE_WORDS = {
+    "about", "contact", "faq", "faqs", "help", "support", "pricing", "price",
+    "prices", "plans", "services", "service", "products", "product", "shipping",
+    "delivery", "returns", "refund", "refunds", "warranty", "hours", "locations",
+    "team", "company", "features", "docs", "documentation", "guide", "policy",
+}
+# ... and fetched last: sessions, carts, listings and archives
+LOW_VALUE_WORDS = {
+    "login", "logout", "signin", "signup", "register", "account", "cart",
+    "checkout", "basket", "wishlist", "search", "tag", "tags", "author",
+    "feed", "wp-admin", "wp-login", "print", "share", "archive", "archives",
+    "page", "calendar",
+}
+
+_PATH_WORD_RE = re.compile(r"[/\-_.]+")
+
+
+def _strip_www(host: str) -> str:
+    return host[4:] if host.startswith("www.") else host
+
+
+def _path_priority(path: str) -> int:
+    """
+    0 = likely high-value page, 1 = neutral, 2 = likely low-value.
+    """
+    lowered = path.lower()
+    words = set(_PATH_WORD_RE.split(lowered)) | set(lowered.split("/"))
+    if words & LOW_VALUE_WORDS:
+        return 2
+    if words & HIGH_VALUE_WORDS:
+        return 0
+    return 1
+
+
+def canonicalize_url(url: str, base: str | None = None) -> str | None:
+    """
+    Canonical form of a page URL, or None if it is not a crawlable HTML page:
+    resolved against `base`, no fragment, lower-case scheme and host, no
+    default port, no index file or trailing slash (except the root), dot
+    segments resolved, tracking parameters removed and the rest sorted.
+    """
+    url = urljoin(base, url.strip()) if base else url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+
+    path = parts.path or "/"
+    basename = posixpath.basename(path)
+    if "." in basename:
+        if posixpath.splitext(basename)[1].lower() in NON_HTML_EXTENSIONS:
+            return None
+        if basename.lower() in INDEX_FILES:
+            path = posixpath.dirname(path)
+    path = posixpath.normpath(path) if path != "/" else path
+    if path.startswith("//"):
+        path = "/" + path.lstrip("/")
+    if path == ".":
+        path = "/"
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def normalized_text_hash(text: str) -> str:
+    """
+    Hash of a page's text ignoring case and whitespace, to spot the same
+    page served under different URLs.
+    """
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class UrlFrontier:
+    """
+    Crawl frontier for one site.
+
+    URLs are canonicalized before they are queued, so fragment, trailing
+    slash, tracking parameters, letter case and www / apex variants of a page
+    are fetched once. Pages come out breadth-first by link depth and, within
+    a depth, high-value paths (about, contact, pricing, ...) first.
+
+    `allowed` (e.g. robots.txt rules) filters URLs before they are queued.
+    Sitemap URLs are seeded with their lastmod, kept in `lastmod`.
+    """
+
+    def __init__(self, start_url: str, allowed: Optional[Callable[[str], bool]] = None):
+        start = canonicalize_url(start_url)
+        if start is None:
+            raise ValueError(f"Not a crawlable URL: {start_url}")
+        self.start_url = start
+        self._site = _strip_www(urlsplit(start).netloc)
+        self._host = urlsplit(start).netloc
+
+        self._heap: list[tuple[int, int, int, str]] = []
+        self._order = itertools.count()
+        # Case-folded canonical URLs ever queued or visited
+        self._seen: set[str] = set()
+        self._content_hashes: set[str] = set()
+        self._allowed = allowed
+        # canonical URL -> sitemap lastmod (W3C datetime string)
+        self.lastmod: dict[str, str] = {}
+
+        self.stats = {
+            "discovered": 0,
+            "duplicate_urls": 0,
+            "non_html_skipped": 0,
+            "off_site_skipped": 0,
+            "disallowed": 0,
+            "sitemap_seeded": 0,
+            "duplicate_content": 0,
+        }
+        self.add(start, depth=0)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _key(self, url: str) -> str:
+        return url.lower()
+
+    def site_url(self, url: str, base: str | None = None) -> str | None:
+        """
+        Canonical URL of a same-site page (www and apex hosts are one site,
+        and are rewritten to the start URL's host), else None.
+        """
+        canonical = canonicalize_url(url, base)
+        return self._on_site(canonical) if canonical else None
+
+    def _on_site(self, canonical: str) -> str | None:
+        parts = urlsplit(canonical)
+        if _strip_www(parts.netloc) != self._site:
+            return None
+        return urlunsplit(parts._replace(netloc=self._host))
+
+    def add(
+        self, url: str, depth: int, base: str | None = None, lastmod: str | None = None
+    ) -> bool:
+        """
+        Queue a link found at `depth`; False if it is skipped or already known.
+        """
+        canonical = canonicalize_url(url, base)
+        if canonical is None:
+            # mailto: / tel: / javascript: links and files (.pdf, .jpg, ...)
+            self.stats["non_html_skipped"] += 1
+            return False
+        canonical = self._on_site(canonical)
+        if canonical is None:
+            self.stats["off_site_skipped"] += 1
+            return False
+
+        key = self._key(canonical)
+        if key in self._seen:
+            self.stats["duplicate_urls"] += 1
+            return False
+        if self._allowed is not None and not self._allowed(canonical):
+            self._seen.add(key)
+            self.stats["disallowed"] += 1
+            return False
+
+        if lastmod:
+            self.lastmod[canonical] = lastmod
+
+        self._seen.add(key)
+        self.stats["discovered"] += 1
+        priority = _path_priority(urlsplit(canonical).path)
+        heapq.heappush(self._heap, (depth, priority, next(self._order), canonical))
+        return True
+
+    def seed(self, entries) -> int:
+        """
+        Queue sitemap (url, lastmod) entries. Depth is the number of path
+        segments, so the site is still visited top-down.
+        """
+        seeded = 0
+        for url, lastmod in entries:
+            canonical = canonicalize_url(url)
+            path = urlsplit(canonical).path if canonical else ""
+            depth = len([segment for segment in path.split("/") if segment])
+            if self.add(url, depth, lastmod=lastmod):
+                seeded += 1
+            elif canonical and lastmod:
+                # Already queued (e.g. the start page): keep its lastmod
+                on_site = self._on_site(canonical)
+                if on_site:
+                    self.lastmod.setdefault(on_site, lastmod)
+        self.stats["sitemap_seeded"] += seeded
+        return seeded
+
+    def pop(self) -> tuple[str, int] | None:
+        """
+        Next (url, depth) to fetch, or None when the frontier is empty.
+        """
+        if not self._heap:
+            return None
+        depth, _, _, url = heapq.heappop(self._heap)
+        return url, depth
+
+    def state(self) -> dict:
+        """
+        JSON-serializable crawl state, for checkpoints (see restore()).
+        """
+        return {
+            "queue": [[depth, priority, url] for depth, priority, _, url in sorted(self._heap)],
+            "seen": sorted(self._seen),
+            "content_hashes": sorted(self._content_hashes),
+            "lastmod": self.lastmod,
+            "stats": self.stats,
+        }
+
+    def restore(self, state: dict):
+        """
+        Continue from a state() taken by an earlier, interrupted crawl.
+        """
+        self._order = itertools.count()
+        self._heap = [
+            (depth, priority, next(self._order), url) for depth, priority, url in state["queue"]
+        ]
+        heapq.heapify(self._heap)
+        self._seen = set(state["seen"])
+        self._content_hashes = set(state["content_hashes"])
+        self.lastmod = dict(state["lastmod"])
+        self.stats.update(state["stats"])
+
+    def mark_seen(self, url: str):
+        """
+        Record a URL reached another way (e.g. a redirect target) so links
+        to it are not queued again.
+        """
+        canonical = self.site_url(url)
+        if canonical is not None:
+            self._seen.add(self._key(canonical))
+
+    def is_duplicate_content(self, text: str) -> bool:
+        """
+        True if a page with the same normalized text was already seen.
+        """
+        digest = normalized_text_hash(text)
+        if digest in self._content_hashes:
+            self.stats["duplicate_content"] += 1
+            return True
+        self._content_hashes.add(digest)
+        return False
@@ -0,0 +1,436 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+from app import config
+from app.services.boilerplate import SiteBoilerplateFilter
+from app.services.build_report import BuildReport
+from app.services.dedupe import NearDuplicateIndex
+from app.services.crawler import iter_site_pages
+from app.services.metrics import registry, timed
+from app.services.snapshots import CrawlCheckpoint, SnapshotWriter, get_blob, load_manifest
+from app.services.text_processing import (
+    discard_process_pool,
+    get_process_pool,
+    process_page_batch,
+)
+from app.services.embeddings import embed_text
+from app.services.vector_store import DEFAULT_INDEX, add_chunks_to_chroma, update_chunk_metadatas
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGES = 10
+
+# End-of-stream marker passed down the queues
+_DONE = None
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+class _IndexBuild:
+    """
+    State of one streaming build. Each stage reads from the queue before it
+    and writes to the one after it; the queues are bounded, so a slow stage
+    (usually embedding) holds back the ones upstream instead of letting
+    pages and chunks pile up in memory.
+
+        crawl -> pages -> clean/chunk -> chunks -> embed -> batches -> write
+
+    `source` yields (page_url, text): the crawler, or a stored snapshot
+    (timed as `source_stage`). Chunks are written to the Chroma collection
+    `index`. `heartbeat` is called every BUILD_HEARTBEAT_S while the build
+    runs, so it is not taken for a dead one.
+    """
+
+    def __init__(
+        self,
+        bot_id: str,
+        report: BuildReport,
+        source: AsyncIterator[Tuple[str, str]],
+        source_stage: str = "crawl",
+        heartbeat: Optional[Callable[[], None]] = None,
+        index: str = DEFAULT_INDEX,
+    ):
+        self.bot_id = bot_id
+        self.index = index
+        self.report = report
+        self.source = source
+        self.source_stage = source_stage
+        self.source_done = False
+        self.heartbeat = heartbeat
+
+        size = max(config.INGEST_QUEUE_SIZE, 1)
+        self.pages: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.chunks: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.batches: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+        self.boilerplate = SiteBoilerplateFilter() if config.BOILERPLATE_FILTER else None
+        self.near_dups = NearDuplicateIndex() if config.NEAR_DUP_FILTER else None
+        self.pages_crawled = 0
+        self.chunks_written = 0
+        # page_urls count stored with each representative chunk, to find
+        # the ones that gained pages after they were written
+        self.written_page_urls: dict[int, int] = {}
+
+    # -----------------------------------------------------
+    # STAGES
+    # -----------------------------------------------------
+    async def read_pages(self):
+        start = time.perf_counter()
+        with timed(self.source_stage):
+            async for page_url, text in self.source:
+                self.pages_crawled += 1
+                await self.pages.put((page_url, text))
+        self.report.add_time(self.source_stage, _elapsed_ms(start))
+        self.source_done = True
+        await self.pages.put(_DONE)
+
+    async def clean_chunk(self):
+        """
+        Boilerplate filter, then clean + chunk. Pages go to the process pool
+        (TEXT_PROCESS_WORKERS) in batches, several batches in flight; results
+        are taken in submission order, so chunk order stays deterministic.
+        """
+        pool = get_process_pool()
+        batch_size = max(config.TEXT_PROCESS_BATCH, 1) if pool else 1
+        max_in_flight = 2 * config.TEXT_PROCESS_WORKERS if pool else 1
+        loop = asyncio.get_running_loop()
+
+        batch: list[tuple[str, str, str]] = []
+        in_flight: deque = deque()
+
+        def broken(dead_pool):
+            # A worker died, or another build discarded the shared pool (or the
+            # app is shutting down): the rest of this build runs in a thread,
+            # the next build gets a fresh pool
+            nonlocal pool
+            if pool is dead_pool:
+                logger.warning("Text processing pool is unusable, continuing this build in a thread")
+                discard_process_pool(dead_pool)
+                pool = None
+
+        def run_batch(task):
+            if pool is not None:
+                try:
+                    return pool, loop.run_in_executor(pool, process_page_batch, task)
+                except RuntimeError:
+                    # BrokenProcessPool, or "cannot schedule new futures after shutdown"
+                    broken(pool)
+            return None, loop.run_in_executor(None, process_page_batch, task)
+
+        async def finish_oldest():
+            pages, task, (used_pool, future) = in_flight.popleft()
+            try:
+                results = await future
+                if used_pool is not None:
+                    # Stage timings recorded inside pool workers stay in their
+                    # own registry; record the pages' processing times here
+                    for _, stats in results:
+                        registry.observe_stage("text_processing", stats["ms"])
+            except BrokenProcessPool:
+                broken(used_pool)
+                results = await loop.run_in_executor(None, process_page_batch, task)
+            for (page_url, raw_text, _), (chunks, stats) in zip(pages, results):
+                await self._emit_page(page_url, raw_text, chunks, stats)
+
+        async def submit():
+            task = [text for _, _, text in batch]
+            in_flight.append((list(batch), task, run_batch(task)))
+            batch.clear()
+            if len(in_flight) >= max_in_flight:
+                await finish_oldest()
+
+        async def add(page_url: str, raw_text: str, text: str):
+            batch.append((page_url, raw_text, text))
+            # Send a partial batch rather than wait for pages the crawl has not fetched yet
+            if len(batch) >= batch_size or self.pages.empty():
+                await submit()
+
+        # Pages the boilerplate filter holds back during its warm-up
+        raw_texts: dict[str, str] = {}
+
+        while (item := await self.pages.get()) is not _DONE:
+            page_url, raw_text = item
+            if not self.boilerplate:
+                await add(page_url, raw_text, raw_text)
+                continue
+
+            raw_texts[page_url] = raw_text
+            start = time.perf_counter()
+            ready = self.boilerplate.add(page_url, raw_text)
+            self.report.add_time("boilerplate", _elapsed_ms(start))
+            for url, text in ready:
+                await add(url, raw_texts.pop(url), text)
+
+        if self.boilerplate:
+            for url, text in self.boilerplate.flush():
+                await add(url, raw_texts.pop(url), text)
+        if batch:
+            await submit()
+        while in_flight:
+            await finish_oldest()
+
+        if self.boilerplate:
+            # Estimated from the bytes removed at the build's average chunk size,
+            # rather than chunking every changed page a second time
+            stats = self.boilerplate.stats
+            chunks_avoided = 0
+            if self.report.chunk_count:
+                bytes_per_chunk = self.report.cleaned_text_bytes / self.report.chunk_count
+                chunks_avoided = round(stats["bytes_removed"] / bytes_per_chunk) if bytes_per_chunk else 0
+            self.report.boilerplate = dict(stats, chunks_avoided=chunks_avoided)
+
+        await self.chunks.put(_DONE)
+
+    async def _emit_page(self, page_url: str, raw_text: str, chunks: list[str], stats: dict):
+        logger.info(f"Processed page: {page_url}")
+        self.report.add_time("clean_chunk", stats.get("ms", 0))
+
+        self.report.page_processed(
+            page_url,
+            raw_bytes=len(raw_text.encode("utf-8")),
+            cleaned_bytes=stats.get("cleaned_bytes", 0),
+            chunks=len(chunks),
+            truncated_tokens=stats.get("truncated_tokens", 0),
+            truncated_chunks=stats.get("truncated_chunks", 0),
+        )
+
+        if self.near_dups:
+            # Representative ids follow the order chunks are passed on,
+            # which is also their chunk_index
+            start = time.perf_counter()
+            chunks = [c for c in chunks if self.near_dups.add(c, page_url) is None]
+            self.report.add_time("near_dedupe", _elapsed_ms(start))
+
+        if not chunks:
+            logger.warning(f"No new chunks for page: {page_url}")
+            return
+        await self.chunks.put((page_url, chunks))
+
+    async def embed(self):
+        pending: list[tuple[str, str]] = []
+        next_index = 0
+
+        async def flush():
+            nonlocal next_index
+            texts = [chunk for _, chunk in pending]
+            start = time.perf_counter()
+            embeddings = await asyncio.to_thread(embed_text, texts)
+            self.report.add_time("embed", _elapsed_ms(start))
+
+            metadatas = []
+            for page_url, _ in pending:
+                metadatas.append({
+                    "bot_id": self.bot_id,
+                    "page_url": page_url,
+                    "chunk_index": next_index + len(metadatas),
+                })
+            await self.batches.put((next_index, texts, embeddings, metadatas))
+            next_index += len(texts)
+            pending.clear()
+
+        batch_size = max(config.INGEST_EMBED_BATCH, 1)
+        while (item := await self.chunks.get()) is not _DONE:
+            page_url, chunks = item
+            for chunk in chunks:
+                pending.append((page_url, chunk))
+                if len(pending) >= batch_size:
+                    await flush()
+        if pending:
+            await flush()
+
+        await self.batches.put(_DONE)
+
+    async def write(self):
+        start_index, texts, embeddings, metadatas = 0, [], [], []
+
+        async def flush():
+            nonlocal start_index
+            if self.near_dups:
+                # Every page a chunk (or its near-duplicates) came from so far;
+                # Chroma metadata values must be scalars, so stored as JSON
+                for meta in metadatas:
+                    urls = self.near_dups.page_urls[meta["chunk_index"]]
+                    meta["page_urls"] = json.dumps(urls)
+                    self.written_page_urls[meta["chunk_index"]] = len(urls)
+
+            start = time.perf_counter()
+            await asyncio.to_thread(
+                add_chunks_to_chroma, self.bot_id, texts, embeddings, metadatas, start_index, self.index
+            )
+            self.report.add_time("vector_write", _elapsed_ms(start))
+
+            self.chunks_written += len(texts)
+            start_index += len(texts)
+            texts.clear()
+            embeddings.clear()
+            metadatas.clear()
+
+        batch_size = max(config.INGEST_WRITE_BATCH, 1)
+        while (item := await self.batches.get()) is not _DONE:
+            _, batch_texts, batch_embeddings, batch_metadatas = item
+            texts.extend(batch_texts)
+            embeddings.extend(batch_embeddings)
+            metadatas.extend(batch_metadatas)
+            if len(texts) >= batch_size:
+                await flush()
+        if texts:
+            await flush()
+
+    async def beat(self):
+        while True:
+            await asyncio.to_thread(self.heartbeat)
+            await asyncio.sleep(config.BUILD_HEARTBEAT_S)
+
+    # -----------------------------------------------------
+    # RUN
+    # -----------------------------------------------------
+    async def run(self) -> int:
+        tasks = [
+            asyncio.create_task(stage())
+            for stage in (self.read_pages, self.clean_chunk, self.embed, self.write)
+        ]
+        beat = asyncio.create_task(self.beat()) if self.heartbeat else None
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One stage failed: the others would wait on its queue forever
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if beat:
+                beat.cancel()
+                await asyncio.gather(beat, return_exceptions=True)
+
+        if not self.pages_crawled:
+            raise Exception("No pages found or all pages were empty.")
+        logger.info(f"Read {self.pages_crawled} pages for bot {self.bot_id}.")
+
+        if self.near_dups:
+            self.report.near_duplicates = self.near_dups.stats()
+            self._update_page_urls()
+
+        if not self.chunks_written:
+            raise Exception("No chunks generated from the entire website.")
+
+        logger.info(f"Saved {self.chunks_written} chunks into Chroma for bot {self.bot_id}")
+        return self.chunks_written
+
+    def _update_page_urls(self):
+        """
+        Near-duplicates found after a chunk was written add pages to it.
+        """
+        changed = {}
+        for index, written in self.written_page_urls.items():
+            urls = self.near_dups.page_urls[index]
+            if len(urls) != written:
+                changed[index] = {
+                    "bot_id": self.bot_id,
+                    "page_url": urls[0],
+                    "chunk_index": index,
+                    "page_urls": json.dumps(urls),
+                }
+        if changed:
+            start = time.perf_counter()
+            update_chunk_metadatas(self.bot_id, changed, self.index)
+            self.report.add_time("vector_write", _elapsed_ms(start))
+
+
+def build_bot_index(
+    bot_id: str,
+    website_url: str,
+    report: BuildReport,
+    resume: bool = False,
+    index: str = DEFAULT_INDEX,
+) -> int:
+    """
+    Multi-page ingestion pipeline shared by create and refresh, streamed
+    page by page through bounded queues:
+    1. Crawl website (multi-page), keeping a snapshot of every page
+    2. Drop boilerplate repeated across pages
+    3. Clean + Chunk per page, skipping near-duplicate chunks
+    4. Embed chunks in batches
+    5. Store into the Chroma collection `index` in batches, with
+       page_url / page_urls metadata
+
+    Every step is recorded in `report` (stage times are busy time; the
+    stages overlap). Returns the number of stored chunks; raises when
+    nothing usable was found.
+
+    The crawl is checkpointed as it goes. With `resume`, a checkpoint left
+    by an interrupted build of the same site is continued (the caller
+    drops the partial index first); the checkpoint is removed once the
+    build ends, whether it succeeded or failed.
+    """
+    snapshot = SnapshotWriter(bot_id, website_url) if config.SNAPSHOT_STORE else None
+    checkpoint = CrawlCheckpoint(bot_id, website_url)
+    if resume:
+        checkpoint.load()
+    # Claims the build for this process, and drops any older checkpoint
+    checkpoint.save()
+
+    source = iter_site_pages(
+        website_url, max_pages=MAX_PAGES, report=report, snapshot=snapshot, checkpoint=checkpoint
+    )
+    build = _IndexBuild(bot_id, report, source, heartbeat=checkpoint.heartbeat, index=index)
+    try:
+        chunk_count = asyncio.run(build.run())
+    except Exception:
+        checkpoint.discard()
+        raise
+    finally:
+        # A finished crawl is worth keeping even if a later stage failed:
+        # the bot can then be re-indexed without crawling again
+        if snapshot and build.source_done and snapshot.commit():
+            report.snapshot = snapshot.stats()
+    checkpoint.discard()
+    return chunk_count
+
+
+async def _snapshot_pages(manifest: dict, report: BuildReport) -> AsyncIterator[Tuple[str, str]]:
+    for page in manifest["pages"]:
+        start = time.perf_counter()
+        text = await asyncio.to_thread(get_blob, page["text"])
+        report.page_fetched(
+            page["url"], _elapsed_ms(start), len(text.encode("utf-8")), lastmod=page.get("lastmod")
+        )
+        yield page["url"], text
+
+
+def reindex_from_snapshot(
+    bot_id: str,
+    report: BuildReport,
+    snapshot_id: str | None = None,
+    index: str = DEFAULT_INDEX,
+) -> int:
+    """
+    Rebuild a bot's chunks and vectors into `index` from a stored crawl
+    snapshot (the latest by default) with the current cleaning / chunking /
+    embedding settings; no page is fetched. Raises SnapshotNotFound without one.
+    """
+    manifest = load_manifest(bot_id, snapshot_id)
+    report.snapshot = {"id": manifest["id"], "pages": len(manifest["pages"]), "reused": True}
+    report.pages_discovered = len(manifest["pages"])
+
+    # Nothing to checkpoint (the snapshot is already stored): heartbeat only
+    checkpoint = CrawlCheckpoint(bot_id)
+    checkpoint.save()
+    build = _IndexBuild(
+        bot_id, report, _snapshot_pages(manifest, report),
+        source_stage="snapshot_read", heartbeat=checkpoint.heartbeat, index=index,
+    )
+    try:
+        chunk_count = asyncio.run(build.run())
+    except Exception:
+        checkpoint.discard()
+        raise
+    checkpoint.discard()
+    return chunk_count
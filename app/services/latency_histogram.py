@@ -0,0 +1,56 @@
+import bisect
+import math
+
+# Upper bounds (ms) of the fixed latency buckets; the last bucket is open-ended.
+# Every histogram in the app uses the same bounds so they can be merged by addition.
+BUCKET_BOUNDS_MS = (
+    25, 50, 100, 250, 500, 750, 1000, 1500, 2000,
+    3000, 5000, 7500, 10000, 15000, 30000, math.inf,
+)
+
+
+def empty_histogram() -> list[int]:
+    return [0] * len(BUCKET_BOUNDS_MS)
+
+
+def bucket_index(value_ms: float) -> int:
+    """
+    Index of the first bucket whose upper bound is >= value_ms.
+    """
+    return bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)
+
+
+def observe(counts: list[int], value_ms: float):
+    counts[bucket_index(value_ms)] += 1
+
+
+def merge(target: list[int], other: list[int]):
+    for i, count in enumerate(other):
+        target[i] += count
+
+
+def percentile(counts: list[int], q: float) -> float | None:
+    """
+    Estimate the q-th percentile (0-100) from bucket counts,
+    interpolating linearly inside the bucket that contains it.
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    rank = q / 100 * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count == 0:
+            continue
+        if seen + count >= rank:
+            lower = BUCKET_BOUNDS_MS[i - 1] if i > 0 else 0
+            upper = BUCKET_BOUNDS_MS[i]
+            if math.isinf(upper):
+                # Open-ended bucket: best we can say is "above the last bound"
+                return float(lower)
+            fraction = (rank - seen) / count
+            return lower + (upper - lower) * fraction
+        seen += count
+
+    return float(BUCKET_BOUNDS_MS[-2])
@@ -0,0 +1,163 @@
+import contextvars
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from starlette.exceptions import HTTPException
+
+from app.services import latency_histogram
+
+# Per-request stage timings (ms), set by collect_stages()
+_current_stages: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "current_stages", default=None
+)
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics: per-stage latency histograms and labelled counters,
+    rendered in Prometheus text format by the /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # stage -> [bucket counts, sum_ms, count]
+        self._stages: dict[str, list] = {}
+        # (name, labels tuple) -> value
+        self._counters: dict[tuple, float] = {}
+        self._counter_help: dict[str, str] = {}
+
+    def observe_stage(self, stage: str, duration_ms: float):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = [latency_histogram.empty_histogram(), 0.0, 0]
+                self._stages[stage] = entry
+            latency_histogram.observe(entry[0], duration_ms)
+            entry[1] += duration_ms
+            entry[2] += 1
+
+    def inc(self, name: str, labels: dict | None = None, value: float = 1, help: str = ""):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._counter_help.setdefault(name, help)
+
+    def stage_snapshot(self) -> dict:
+        """
+        {stage: {"count": n, "sum_ms": total}} — used by benchmarks to diff runs.
+        """
+        with self._lock:
+            return {
+                stage: {"count": entry[2], "sum_ms": entry[1]}
+                for stage, entry in self._stages.items()
+            }
+
+    def render(self) -> list[str]:
+        lines = [
+            "# HELP chatbot_stage_duration_seconds Time spent per pipeline stage",
+            "# TYPE chatbot_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for stage, (counts, sum_ms, count) in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(latency_histogram.BUCKET_BOUNDS_MS, counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if math.isinf(bound) else f"{bound / 1000:g}"
+                    lines.append(
+                        f'chatbot_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}'
+                    )
+                lines.append(f'chatbot_stage_duration_seconds_sum{{stage="{stage}"}} {sum_ms / 1000:.6f}')
+                lines.append(f'chatbot_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+            by_name: dict[str, list] = {}
+            for (name, labels), value in self._counters.items():
+                by_name.setdefault(name, []).append((labels, value))
+
+            for name in sorted(by_name):
+                lines.append(f"# HELP {name} {self._counter_help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(by_name[name]):
+                    lines.append(f"{name}{format_labels(dict(labels))} {value:g}")
+
+        return lines
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+registry = MetricsRegistry()
+
+
+# -----------------------------------------------------
+# TIMING API
+# -----------------------------------------------------
+def _count_stage_error(stage: str):
+    registry.inc(
+        "chatbot_stage_errors_total", {"stage": stage},
+        help="Exceptions raised per pipeline stage",
+    )
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Time a block as `stage`: recorded in the stage histogram and,
+    inside collect_stages(), in the current request's timings.
+    Exceptions are counted in chatbot_stage_errors_total and re-raised,
+    except HTTPExceptions below 500 (bad request, not found, rate limited):
+    those are answers to the client, not stage failures.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except HTTPException as e:
+        if e.status_code >= 500:
+            _count_stage_error(stage)
+        raise
+    except Exception:
+        _count_stage_error(stage)
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        registry.observe_stage(stage, duration_ms)
+        stages = _current_stages.get()
+        if stages is not None:
+            stages[stage] = round(stages.get(stage, 0) + duration_ms, 2)
+
+
+def instrument(stage: str):
+    """
+    Decorator form of timed().
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect_stages():
+    """
+    Collect the stage timings (ms) recorded in this context into a dict.
+    """
+    stages: dict = {}
+    token = _current_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _current_stages.reset(token)
@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+
+from app import config
+from app.services.ai_client import generate_answer, GeminiQuotaError
+
+logger = logging.getLogger(__name__)
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+TIER_AUTO = "auto"
+VALID_TIERS = {TIER_FAST, TIER_STRONG, TIER_AUTO}
+
+# Questions containing these usually need reasoning over several chunks
+_COMPLEX_QUERY_MARKERS = (
+    "compare", "difference", "why", "explain", "step by step",
+    "steps", "pros and cons", "summarize", "summarise", "versus", " vs ",
+)
+
+# Weight of the newest sample in the moving latency average
+_EWMA_ALPHA = 0.2
+
+
+def tier_models() -> dict:
+    return {
+        TIER_FAST: config.LLM_FAST_MODEL,
+        TIER_STRONG: config.LLM_STRONG_MODEL,
+    }
+
+
+# -----------------------------------------------------
+# PER-MODEL LATENCY / ERROR STATS
+# -----------------------------------------------------
+class ModelStats:
+    """
+    Thread-safe per-model counters used for routing decisions:
+    - moving average latency of successful calls (a slow model is
+      re-probed once it has had no sample for LLM_SLOW_REPROBE_S)
+    - error / rate-limit counts
+    - cooldown window after a rate-limit
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    def _entry(self, model: str) -> dict:
+        if model not in self._stats:
+            self._stats[model] = {
+                "calls": 0,
+                "errors": 0,
+                "rate_limited": 0,
+                "avg_latency_ms": None,
+                "last_sample_at": 0.0,
+                "cooldown_until": 0.0,
+            }
+        return self._stats[model]
+
+    def _add_latency(self, entry: dict, latency_ms: float):
+        avg = entry["avg_latency_ms"]
+        entry["avg_latency_ms"] = (
+            latency_ms if avg is None
+            else (1 - _EWMA_ALPHA) * avg + _EWMA_ALPHA * latency_ms
+        )
+        entry["last_sample_at"] = time.time()
+
+    def record_success(self, model: str, latency_ms: float):
+        with self._lock:
+            entry = self._entry(model)
+            entry["calls"] += 1
+            self._add_latency(entry, latency_ms)
+
+    def record_error(self, model: str, rate_limited: bool = False, timed_out_ms: float | None = None):
+        """
+        A call that hit LLM_CALL_TIMEOUT_MS also counts as a latency sample,
+        so a model that keeps timing out is demoted like a slow one.
+        """
+        with self._lock:
+            entry = self._entry(model)
+            entry["calls"] += 1
+            entry["errors"] += 1
+            if timed_out_ms is not None:
+                self._add_latency(entry, timed_out_ms)
+            if rate_limited:
+                entry["rate_limited"] += 1
+                entry["cooldown_until"] = time.time() + config.LLM_RATE_LIMIT_COOLDOWN_S
+
+    def is_cooling_down(self, model: str) -> bool:
+        with self._lock:
+            return self._entry(model)["cooldown_until"] > time.time()
+
+    def is_slow(self, model: str) -> bool:
+        with self._lock:
+            entry = self._entry(model)
+            avg = entry["avg_latency_ms"]
+            if avg is None or avg <= config.LLM_SLOW_MS:
+                return False
+            # Demoted models rarely get new samples: re-probe after a while
+            return time.time() - entry["last_sample_at"] < config.LLM_SLOW_REPROBE_S
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.time()
+            return {
+                model: {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "rate_limited": entry["rate_limited"],
+                    "avg_latency_ms": (
+                        round(entry["avg_latency_ms"], 1)
+                        if entry["avg_latency_ms"] is not None else None
+                    ),
+                    "cooling_down": entry["cooldown_until"] > now,
+                }
+                for model, entry in self._stats.items()
+            }
+
+
+model_stats = ModelStats()
+
+
+# -----------------------------------------------------
+# ROUTING
+# -----------------------------------------------------
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 chars per token for English text).
+    """
+    return len(text) // 4
+
+
+def choose_tier(query: str, context_chunks: list, bot_tier: str | None = None) -> str:
+    """
+    Pick a tier from simple request features:
+    - per-bot override ("fast" / "strong")
+    - packed context size
+    - question length / complexity markers
+    """
+    if bot_tier in (TIER_FAST, TIER_STRONG):
+        return bot_tier
+
+    context_tokens = sum(estimate_tokens(c) for c in context_chunks)
+    if context_tokens > config.LLM_STRONG_CONTEXT_TOKENS:
+        return TIER_STRONG
+
+    if len(query.split()) > config.LLM_STRONG_QUERY_WORDS:
+        return TIER_STRONG
+
+    lower_query = f" {query.lower()} "
+    if any(marker in lower_query for marker in _COMPLEX_QUERY_MARKERS):
+        return TIER_STRONG
+
+    return TIER_FAST
+
+
+def candidate_models(tier: str) -> list[str]:
+    """
+    Ordered list of models to try for this tier.
+    The preferred model comes first, the other tier is the fallback.
+    Models that are rate-limited or slow are moved behind healthy ones.
+    """
+    models = tier_models()
+    preferred = models[tier]
+    ordered = [preferred] + [m for m in models.values() if m != preferred]
+    # dict.fromkeys keeps order and drops duplicates (both tiers may share a model)
+    ordered = list(dict.fromkeys(ordered))
+
+    healthy = [
+        m for m in ordered
+        if not model_stats.is_cooling_down(m) and not model_stats.is_slow(m)
+    ]
+    degraded = [m for m in ordered if m not in healthy]
+    return healthy + degraded
+
+
+def generate_routed_answer(
+    prompt: str,
+    query: str,
+    context_chunks: list,
+    bot_tier: str | None = None,
+) -> str:
+    """
+    Generate an answer with the model chosen for this request,
+    falling back to the next model on rate-limits, errors or calls
+    exceeding LLM_CALL_TIMEOUT_MS.
+    """
+    tier = choose_tier(query, context_chunks, bot_tier)
+    models = candidate_models(tier)
+    logger.info(f"[ROUTER] tier={tier} candidates={models}")
+
+    last_error: Exception | None = None
+    rate_limited = False
+    for model in models:
+        start = time.perf_counter()
+        try:
+            answer = generate_answer(prompt, model=model)
+        except GeminiQuotaError as e:
+            model_stats.record_error(model, rate_limited=True)
+            logger.warning(f"[ROUTER] {model} rate-limited, trying next model")
+            rate_limited = True
+            last_error = e
+            continue
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            timed_out = elapsed_ms >= config.LLM_CALL_TIMEOUT_MS
+            model_stats.record_error(model, timed_out_ms=elapsed_ms if timed_out else None)
+            logger.warning(f"[ROUTER] {model} failed ({e}), trying next model")
+            last_error = e
+            continue
+
+        model_stats.record_success(model, (time.perf_counter() - start) * 1000)
+        return answer
+
+    # Surface quota problems as such, so callers can answer with 429
+    if rate_limited:
+        raise GeminiQuotaError("AI service quota exceeded on all models")
+    raise last_error
@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Listing endpoints return the cursor for the next page in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values) -> str:
+    """
+    Opaque cursor from the sort key of the last row of a page.
+    Datetimes are stored as ISO strings.
+    """
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise InvalidCursor("Invalid pagination cursor")
+
+
+def after_id(query, id_column, cursor: str | None):
+    """
+    Keyset filter for pages ordered by id ascending.
+    """
+    if not cursor:
+        return query
+    try:
+        (last_id,) = decode_cursor(cursor)
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid pagination cursor")
+    return query.filter(id_column > last_id)
+
+
+def before_created(query, created_column, id_column, cursor: str | None):
+    """
+    Keyset filter for pages ordered by (created_at DESC, id DESC).
+    The id tie-breaker keeps the order stable for equal timestamps.
+    """
+    if not cursor:
+        return query
+    try:
+        created_raw, last_id = decode_cursor(cursor)
+        created_at = datetime.fromisoformat(created_raw)
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid pagination cursor")
+
+    return query.filter(
+        or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < last_id),
+        )
+    )
+
+
+def split_page(rows: list, limit: int) -> tuple[list, bool]:
+    """
+    Queries fetch limit + 1 rows; the extra row only signals another page.
+    """
+    return rows[:limit], len(rows) > limit
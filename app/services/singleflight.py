@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Exception | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls:
+    the first caller for a key runs the function, callers arriving
+    while it is in flight wait and receive the same result (or error).
+    Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[tuple, _Call] = {}
+        self._total = 0
+        self._coalesced = 0
+
+    def do(self, key: tuple, fn, *args, **kwargs):
+        """
+        Returns (result, shared) where shared=True means this caller
+        reused another caller's in-flight result.
+        """
+        with self._lock:
+            self._total += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.waiters:
+                logger.info(f"[SINGLEFLIGHT] Shared one call with {call.waiters} waiter(s)")
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "total_calls": self._total,
+                "coalesced_calls": self._coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case/whitespace/trailing-punctuation insensitive form of a question.
+    """
+    query = re.sub(r"\s+", " ", query).strip().lower()
+    return query.rstrip("?!. ")
+
+
+def answer_key(bot_id: str, query: str, context_chunks: list) -> tuple:
+    """
+    Requests only share an LLM call when bot, question and retrieved context match.
+    """
+    context_hash = hashlib.sha1("\x1f".join(context_chunks).encode("utf-8")).hexdigest()
+    return (bot_id, normalize_query(query), context_hash)
+
+
+# Shared by the chat endpoint for LLM answer generation
+answer_flight = SingleFlight()
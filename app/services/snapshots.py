@@ -0,0 +1,360 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# Layout under SNAPSHOT_DIR:
+#   blobs/ab/abcdef...      zlib-compressed page text / HTML, named by the
+#                           sha256 of the uncompressed bytes (shared by all
+#                           bots and crawls, so unchanged pages are stored once)
+#   bots/<bot_id>/<id>.json manifest of one crawl: page URLs -> blob hashes
+#   checkpoints/<bot_id>.json progress of a running build (see CrawlCheckpoint)
+BLOBS_DIR = "blobs"
+BOTS_DIR = "bots"
+CHECKPOINTS_DIR = "checkpoints"
+
+
+class SnapshotNotFound(Exception):
+    pass
+
+
+def _root() -> str:
+    return config.SNAPSHOT_DIR
+
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(_root(), BLOBS_DIR, digest[:2], digest)
+
+
+def _bot_dir(bot_id: str) -> str:
+    return os.path.join(_root(), BOTS_DIR, bot_id)
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def put_blob(content: str) -> tuple[str, int]:
+    """
+    Store text once by content hash: (sha256 hex, compressed bytes written).
+    """
+    data = content.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if os.path.exists(path):
+        # Fresh mtime: garbage collection must not take it before the manifest is written
+        os.utime(path)
+        return digest, 0
+    compressed = zlib.compress(data, 6)
+    _write_atomic(path, compressed)
+    return digest, len(compressed)
+
+
+def get_blob(digest: str) -> str:
+    with open(_blob_path(digest), "rb") as f:
+        return zlib.decompress(f.read()).decode("utf-8")
+
+
+# -----------------------------------------------------
+# WRITING
+# -----------------------------------------------------
+class SnapshotWriter:
+    """
+    Records one crawl. Pages are written to the blob store as they arrive;
+    the manifest is written by commit(), so a crawl that dies half-way
+    leaves no snapshot (its blobs are collected by the next retention pass).
+    """
+
+    def __init__(self, bot_id: str, website_url: str, store_html: bool = config.SNAPSHOT_STORE_HTML):
+        self.bot_id = bot_id
+        self.website_url = website_url
+        self.store_html = store_html
+        self.snapshot_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.pages: list[dict] = []
+        self.raw_bytes = 0
+        self.bytes_written = 0
+
+    def add_page(self, url: str, text: str, html: Optional[str] = None, lastmod: Optional[str] = None):
+        text_digest, written = put_blob(text)
+        page = {"url": url, "text": text_digest}
+        self.raw_bytes += len(text.encode("utf-8"))
+        self.bytes_written += written
+
+        if html is not None and self.store_html:
+            html_digest, written = put_blob(html)
+            page["html"] = html_digest
+            self.raw_bytes += len(html.encode("utf-8"))
+            self.bytes_written += written
+        if lastmod:
+            page["lastmod"] = lastmod
+        self.pages.append(page)
+
+    def commit(self) -> Optional[str]:
+        """
+        Write the manifest and apply retention; returns the snapshot id
+        (None when no page was recorded).
+        """
+        if not self.pages:
+            return None
+        manifest = {
+            "id": self.snapshot_id,
+            "bot_id": self.bot_id,
+            "website_url": self.website_url,
+            "created_at": datetime.utcnow().isoformat(),
+            "pages": self.pages,
+        }
+        path = os.path.join(_bot_dir(self.bot_id), f"{self.snapshot_id}.json")
+        _write_atomic(path, json.dumps(manifest).encode("utf-8"))
+        logger.info(
+            f"[Snapshot] {self.bot_id}/{self.snapshot_id}: {len(self.pages)} pages, "
+            f"{self.raw_bytes} bytes raw, {self.bytes_written} bytes new compressed blobs"
+        )
+        apply_retention(self.bot_id)
+        return self.snapshot_id
+
+    def stats(self) -> dict:
+        return {
+            "id": self.snapshot_id,
+            "pages": len(self.pages),
+            "raw_bytes": self.raw_bytes,
+            "new_blob_bytes": self.bytes_written,
+        }
+
+
+# -----------------------------------------------------
+# READING
+# -----------------------------------------------------
+def list_snapshots(bot_id: str) -> list[dict]:
+    """
+    Manifests of a bot's snapshots, newest first (without the page list).
+    """
+    bot_dir = _bot_dir(bot_id)
+    if not os.path.isdir(bot_dir):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(bot_dir), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(bot_dir, name), "rb") as f:
+            manifest = json.loads(f.read())
+        snapshots.append({
+            "id": manifest["id"],
+            "website_url": manifest["website_url"],
+            "created_at": manifest["created_at"],
+            "pages": len(manifest["pages"]),
+        })
+    return snapshots
+
+
+def load_manifest(bot_id: str, snapshot_id: Optional[str] = None) -> dict:
+    """
+    A snapshot's manifest; the latest one when snapshot_id is None.
+    """
+    if snapshot_id is None:
+        snapshots = list_snapshots(bot_id)
+        if not snapshots:
+            raise SnapshotNotFound(f"No snapshot stored for bot {bot_id}")
+        snapshot_id = snapshots[0]["id"]
+
+    path = os.path.join(_bot_dir(bot_id), f"{os.path.basename(snapshot_id)}.json")
+    if not os.path.exists(path):
+        raise SnapshotNotFound(f"Snapshot {snapshot_id} not found for bot {bot_id}")
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+# -----------------------------------------------------
+# RETENTION
+# -----------------------------------------------------
+def apply_retention(bot_id: str):
+    """
+    Keep a bot's SNAPSHOT_KEEP_PER_BOT newest snapshots, minus those older
+    than SNAPSHOT_MAX_AGE_DAYS (the newest is always kept, so the bot can be
+    re-indexed), then delete blobs no manifest refers to.
+    """
+    bot_dir = _bot_dir(bot_id)
+    names = sorted((n for n in os.listdir(bot_dir) if n.endswith(".json")), reverse=True)
+    cutoff = datetime.utcnow() - timedelta(days=config.SNAPSHOT_MAX_AGE_DAYS)
+
+    removed = 0
+    for position, name in enumerate(names):
+        if position == 0:
+            continue
+        path = os.path.join(bot_dir, name)
+        too_old = datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff
+        if position >= config.SNAPSHOT_KEEP_PER_BOT or too_old:
+            os.remove(path)
+            removed += 1
+
+    if removed:
+        logger.info(f"[Snapshot] Removed {removed} old snapshots of bot {bot_id}")
+        collect_garbage()
+
+
+def delete_bot_snapshots(bot_id: str):
+    CrawlCheckpoint(bot_id).discard()
+    bot_dir = _bot_dir(bot_id)
+    if os.path.isdir(bot_dir):
+        shutil.rmtree(bot_dir, ignore_errors=True)
+        collect_garbage()
+
+
+def _manifest_paths():
+    bots_root = os.path.join(_root(), BOTS_DIR)
+    if os.path.isdir(bots_root):
+        for bot_id in os.listdir(bots_root):
+            bot_dir = os.path.join(bots_root, bot_id)
+            for name in os.listdir(bot_dir):
+                if name.endswith(".json"):
+                    yield os.path.join(bot_dir, name)
+
+    checkpoints_root = os.path.join(_root(), CHECKPOINTS_DIR)
+    if os.path.isdir(checkpoints_root):
+        for name in os.listdir(checkpoints_root):
+            if name.endswith(".json"):
+                yield os.path.join(checkpoints_root, name)
+
+
+def collect_garbage(min_age_s: float = 3600) -> int:
+    """
+    Delete blobs no manifest refers to. Blobs younger than `min_age_s` are
+    kept: they may belong to a crawl whose manifest is not written yet.
+    """
+    blobs_root = os.path.join(_root(), BLOBS_DIR)
+    if not os.path.isdir(blobs_root):
+        return 0
+
+    # Snapshot manifests and checkpoints of running builds
+    referenced: set[str] = set()
+    for path in _manifest_paths():
+        try:
+            with open(path, "rb") as f:
+                pages = json.loads(f.read())["pages"]
+        except FileNotFoundError:
+            # Checkpoint discarded meanwhile
+            continue
+        for page in pages:
+            referenced.add(page["text"])
+            if "html" in page:
+                referenced.add(page["html"])
+
+    now = time.time()
+    deleted = 0
+    for prefix in os.listdir(blobs_root):
+        prefix_dir = os.path.join(blobs_root, prefix)
+        for digest in os.listdir(prefix_dir):
+            path = os.path.join(prefix_dir, digest)
+            if digest not in referenced and now - os.path.getmtime(path) > min_age_s:
+                os.remove(path)
+                deleted += 1
+
+    if deleted:
+        logger.info(f"[Snapshot] Deleted {deleted} unreferenced blobs")
+    return deleted
+
+
+# -----------------------------------------------------
+# CHECKPOINTS (RUNNING BUILDS)
+# -----------------------------------------------------
+def _checkpoint_path(bot_id: str) -> str:
+    return os.path.join(_root(), CHECKPOINTS_DIR, f"{os.path.basename(bot_id)}.json")
+
+
+class CrawlCheckpoint:
+    """
+    Progress of one running build: the crawl frontier and the pages
+    collected so far (stored as blobs), saved every CRAWL_CHECKPOINT_EVERY
+    pages, so a build cut short by a restart continues where it stopped.
+
+    The file also records which process runs the build, and its mtime is
+    the build's heartbeat (see build_jobs.py).
+    """
+
+    def __init__(self, bot_id: str, website_url: Optional[str] = None):
+        self.bot_id = bot_id
+        self.website_url = website_url
+        self.path = _checkpoint_path(bot_id)
+        # Crawl state (frontier, counters) of the last save; None before any
+        self.crawl: Optional[dict] = None
+        self.pages: list[dict] = []
+
+    def load(self) -> Optional[dict]:
+        """
+        Crawl state saved by an earlier run for the same website, else None.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+        if data.get("crawl") is None or data.get("website_url") != self.website_url:
+            return None
+        self.crawl = data["crawl"]
+        self.pages = list(data["pages"])
+        return self.crawl
+
+    def add_page(self, url: str, text: str, lastmod: Optional[str] = None):
+        digest, _ = put_blob(text)
+        page = {"url": url, "text": digest}
+        if lastmod:
+            page["lastmod"] = lastmod
+        self.pages.append(page)
+
+    def save(self, crawl: Optional[dict] = None):
+        """
+        Write the checkpoint (crawl state and pages so far) and claim the
+        build for this process.
+        """
+        if crawl is not None:
+            self.crawl = crawl
+        data = {
+            "bot_id": self.bot_id,
+            "website_url": self.website_url,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "crawl": self.crawl,
+            "pages": self.pages,
+        }
+        _write_atomic(self.path, json.dumps(data).encode("utf-8"))
+
+    def heartbeat(self):
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            self.save()
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def build_heartbeat(bot_id: str) -> Optional[dict]:
+    """
+    {"at": unix time, "host", "pid"} of the last heartbeat of a bot's
+    running build, or None when there is no checkpoint.
+    """
+    path = _checkpoint_path(bot_id)
+    try:
+        at = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+    return {"at": at, "host": data.get("host"), "pid": data.get("pid")}
@@ -1,9 +1,15 @@
 import re
 import logging
-from typing import List
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
 
+from app import config
 # ✅ use the cleaner we created in app/services/cleaner.py
 from app.services.cleaner import clean_scraped_text as clean_raw_text
+from app.services.metrics import instrument
 
 logger = logging.getLogger(__name__)
 
@@ -64,43 +70,95 @@ def chunk_text(sentences: List[str], max_chunk_size: int = 700) -> List[str]:
 
 
 # -----------------------------------------------------
-# 3. MAIN ENTRY: CLEAN → SENTENCES → OVERLAPPING CHUNKS
+# 3. TOKEN-AWARE CHUNKING
 # -----------------------------------------------------
-def process_text_to_chunks(
-    text: str,
-    max_words: int = 220,
-    overlap_words: int = 40,
-) -> List[str]:
+def _tail(words: List[str], counts: List[int], budget: int) -> tuple[List[str], List[int]]:
     """
-    Convert raw page text into overlapping chunks.
+    Longest suffix of `words` whose token count fits in `budget`.
+    """
+    total = 0
+    i = len(words)
+    while i > 0 and total + counts[i - 1] <= budget:
+        total += counts[i - 1]
+        i -= 1
+    return words[i:], counts[i:]
 
-    Pipeline:
-    1. Clean raw HTML text using cleaner.clean_text()
-    2. Split into sentences
-    3. Build overlapping word-window chunks
 
-    - max_words:     target size of each chunk (approx tokens)
-    - overlap_words: how many words to overlap between consecutive chunks
+def chunk_sentences_by_tokens(
+    sentences: List[str],
+    max_tokens: int,
+    overlap_tokens: int,
+    count_tokens: Optional[Callable[[List[str]], List[int]]] = None,
+) -> List[str]:
     """
+    Same sentence-packing as the word mode, but sizes are word-piece tokens
+    of the embedding model, so no chunk is truncated when embedded.
 
-    logger.info("Starting text cleaning + chunking...")
+    Every distinct word is tokenized once, in one batched call. WordPiece
+    splits on whitespace first, so a chunk's token count is the sum of its
+    words' counts. Sentences longer than max_tokens are split into windows.
+    count_tokens defaults to the embedding model's tokenizer.
+    """
+    if count_tokens is None:
+        from app.services.tokenizer import count_tokens
 
-    # 1️⃣ Clean raw scraped text (remove navbar/footer/junk/repeats/etc.)
-    cleaned = clean_raw_text(text)
-    logger.info(f"Cleaned text length after cleaner: {len(cleaned)} chars")
+    vocabulary = list({w for sent in sentences for w in sent.split()})
+    word_tokens = dict(zip(vocabulary, count_tokens(vocabulary)))
 
-    if not cleaned.strip():
-        logger.warning("Cleaned text is empty after cleaning.")
-        return []
+    chunks: List[str] = []
+    current_words: List[str] = []
+    current_counts: List[int] = []
 
-    # 2️⃣ Sentence split
-    sentences = split_into_sentences(cleaned)
-    logger.info(f"Total sentences after split: {len(sentences)}")
+    def flush():
+        if current_words:
+            chunks.append(" ".join(current_words))
 
-    if not sentences:
-        return []
+    for sent in sentences:
+        sent_words = sent.split()
+        # A single word longer than the window still gets its own chunk
+        sent_counts = [min(word_tokens[w], max_tokens) for w in sent_words]
+        sent_tokens = sum(sent_counts)
 
-    # 3️⃣ Build overlapping chunks
+        # Sentence longer than the window: split it into overlapping windows
+        if sent_tokens > max_tokens:
+            flush()
+            current_words, current_counts = [], []
+            for word, count in zip(sent_words, sent_counts):
+                if sum(current_counts) + count > max_tokens:
+                    flush()
+                    current_words, current_counts = _tail(
+                        current_words, current_counts, min(overlap_tokens, max_tokens - count)
+                    )
+                current_words.append(word)
+                current_counts.append(count)
+            flush()
+            current_words, current_counts = [], []
+            continue
+
+        # If adding this sentence would overflow the window, flush current chunk
+        current_tokens = sum(current_counts)
+        if current_tokens + sent_tokens > max_tokens:
+            flush()
+            # Overlap: keep the last words that fit next to this sentence
+            current_words, current_counts = _tail(
+                current_words, current_counts, min(overlap_tokens, max_tokens - sent_tokens)
+            )
+
+        current_words.extend(sent_words)
+        current_counts.extend(sent_counts)
+
+    flush()
+    return chunks
+
+
+# -----------------------------------------------------
+# 4. WORD-COUNT CHUNKING
+# -----------------------------------------------------
+def _chunk_sentences_by_words(
+    sentences: List[str],
+    max_words: int,
+    overlap_words: int,
+) -> List[str]:
     chunks: List[str] = []
     current_words: List[str] = []
 
@@ -132,5 +190,180 @@ def process_text_to_chunks(
     if current_words:
         chunks.append(" ".join(current_words))
 
-    logger.info(f"Total chunks created: {len(chunks)}")
     return chunks
+
+
+# -----------------------------------------------------
+# 5. MAIN ENTRY: CLEAN → SENTENCES → OVERLAPPING CHUNKS
+# -----------------------------------------------------
+def _record_truncation(chunks: List[str], stats: dict):
+    """
+    How much chunk text the embedding model would cut off (its input window).
+    """
+    from app.services.tokenizer import count_tokens, max_chunk_tokens
+
+    limit = max_chunk_tokens()
+    counts = count_tokens(chunks)
+    stats["tokens"] = sum(counts)
+    stats["truncated_chunks"] = sum(1 for c in counts if c > limit)
+    stats["truncated_tokens"] = sum(c - limit for c in counts if c > limit)
+
+
+@instrument("text_processing")
+def process_text_to_chunks(
+    text: str,
+    max_words: int = 220,
+    overlap_words: int = 40,
+    stats: dict | None = None,
+    mode: str | None = None,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+) -> List[str]:
+    """
+    Convert raw page text into overlapping chunks.
+
+    Pipeline:
+    1. Clean raw HTML text using cleaner.clean_text()
+    2. Split into sentences
+    3. Build overlapping chunks
+
+    - mode:           "tokens" or "words" (default: config.CHUNKING_MODE)
+    - max_words:      words mode: target size of each chunk
+    - overlap_words:  words mode: how many words to overlap between consecutive chunks
+    - max_tokens:     tokens mode: chunk size in model tokens (default: the model's window)
+    - overlap_tokens: tokens mode: overlap in model tokens
+    - stats:          optional dict, filled with "cleaned_bytes", and with
+                      "tokens" / "truncated_chunks" / "truncated_tokens"
+                      (text the embedding model would cut off)
+    """
+    mode = mode or config.CHUNKING_MODE
+
+    logger.info("Starting text cleaning + chunking...")
+
+    # 1️⃣ Clean raw scraped text (remove navbar/footer/junk/repeats/etc.)
+    cleaned = clean_raw_text(text)
+    logger.info(f"Cleaned text length after cleaner: {len(cleaned)} chars")
+    if stats is not None:
+        stats["cleaned_bytes"] = len(cleaned.encode("utf-8"))
+
+    if not cleaned.strip():
+        logger.warning("Cleaned text is empty after cleaning.")
+        return []
+
+    # 2️⃣ Sentence split
+    sentences = split_into_sentences(cleaned)
+    logger.info(f"Total sentences after split: {len(sentences)}")
+
+    if not sentences:
+        return []
+
+    # 3️⃣ Build overlapping chunks
+    if mode == "tokens":
+        if not max_tokens:
+            from app.services.tokenizer import max_chunk_tokens
+            max_tokens = config.CHUNK_MAX_TOKENS or max_chunk_tokens()
+        if overlap_tokens is None:
+            overlap_tokens = config.CHUNK_OVERLAP_TOKENS
+        chunks = chunk_sentences_by_tokens(sentences, max_tokens, overlap_tokens)
+    else:
+        chunks = _chunk_sentences_by_words(sentences, max_words, overlap_words)
+
+    if stats is not None:
+        _record_truncation(chunks, stats)
+
+    logger.info(f"Total chunks created ({mode}): {len(chunks)}")
+    return chunks
+
+
+# -----------------------------------------------------
+# 6. PARALLEL PAGE PROCESSING (PROCESS POOL)
+# -----------------------------------------------------
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(mode: str):
+    # Load the tokenizer when the worker starts, not on its first page
+    if mode == "tokens":
+        from app.services.tokenizer import max_chunk_tokens
+        max_chunk_tokens()
+
+
+def _ping() -> bool:
+    return True
+
+
+def create_process_pool(workers: int, mode: str | None = None) -> ProcessPoolExecutor:
+    """
+    Process pool for process_page_batch, with every worker started and warm.
+    Workers are spawned rather than forked, so they do not inherit the app's
+    embedding model and threads; each loads only the tokenizer.
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(mode or config.CHUNKING_MODE,),
+    )
+    # Workers would otherwise start lazily, during the first build
+    for future in [pool.submit(_ping) for _ in range(workers)]:
+        future.result()
+    return pool
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    The shared pool used by ingestion (created once, reused by every build),
+    or None when TEXT_PROCESS_WORKERS is 0 and pages are processed in a thread.
+    """
+    global _pool
+    if config.TEXT_PROCESS_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            logger.info(f"Starting text processing pool ({config.TEXT_PROCESS_WORKERS} workers)")
+            _pool = create_process_pool(config.TEXT_PROCESS_WORKERS)
+        return _pool
+
+
+def discard_process_pool(pool: ProcessPoolExecutor):
+    """
+    Drop a pool left broken by a dead worker (BrokenProcessPool);
+    the next get_process_pool starts a fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # Not cancel_futures: other builds may still be waiting on this pool and
+    # must see BrokenProcessPool (and fall back), not a cancellation
+    pool.shutdown(wait=False)
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def process_page_batch(
+    pages: List[str],
+    mode: str | None = None,
+) -> List[Tuple[List[str], dict]]:
+    """
+    Clean + chunk several pages in one task, so a pool pays the inter-process
+    round trip per batch rather than per page.
+
+    Returns (chunks, stats) per page, in input order. Stats are those of
+    process_text_to_chunks plus "ms" (processing time).
+    """
+    results = []
+    for text in pages:
+        start = time.perf_counter()
+        stats: dict = {}
+        chunks = process_text_to_chunks(text, stats=stats, mode=mode)
+        stats["ms"] = (time.perf_counter() - start) * 1000
+        results.append((chunks, stats))
+    return results
@@ -0,0 +1,61 @@
+import json
+import logging
+import threading
+
+from huggingface_hub import hf_hub_download
+from transformers import AutoTokenizer
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# The embedding model's tokenizer alone, without the model weights: chunking
+# only needs token counts, and each text processing worker loads its own copy
+_tokenizer = None
+_max_seq_length: int | None = None
+_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """
+    Tokenizer of config.EMBED_MODEL, loaded once per process.
+    """
+    global _tokenizer, _max_seq_length
+    with _lock:
+        if _tokenizer is None:
+            logger.info(f"Loading tokenizer: {config.EMBED_MODEL}")
+            _tokenizer = AutoTokenizer.from_pretrained(config.EMBED_MODEL)
+            # The input window sentence-transformers applies (256 for all-MiniLM-L6-v2),
+            # usually shorter than the tokenizer's own model_max_length
+            try:
+                path = hf_hub_download(config.EMBED_MODEL, "sentence_bert_config.json")
+                with open(path) as f:
+                    _max_seq_length = json.load(f)["max_seq_length"]
+            except Exception:
+                _max_seq_length = _tokenizer.model_max_length
+        return _tokenizer
+
+
+def max_chunk_tokens() -> int:
+    """
+    Longest input (in word-piece tokens) the model embeds without truncation:
+    max_seq_length (256 for all-MiniLM-L6-v2) minus [CLS] / [SEP].
+    """
+    tokenizer = get_tokenizer()
+    return _max_seq_length - tokenizer.num_special_tokens_to_add()
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """
+    Word-piece token count of each text (special tokens excluded),
+    in one batched call to the model's fast tokenizer.
+    """
+    if not texts:
+        return []
+    encoded = get_tokenizer()(
+        list(texts),
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
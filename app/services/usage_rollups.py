@@ -0,0 +1,204 @@
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import latency_histogram
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _insert_missing_row(db: Session, bot_pk: int, granularity: str, start: datetime):
+    """
+    Create the zeroed rollup row unless it exists. ON CONFLICT DO NOTHING keeps
+    this safe when another worker process creates the same bucket concurrently.
+    """
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    db.execute(
+        dialect.insert(models.BotUsageRollup)
+        .values(
+            bot_id=bot_pk,
+            granularity=granularity,
+            bucket_start=start,
+            request_count=0,
+            cache_hit_count=0,
+            error_count=0,
+            total_response_ms=0,
+            latency_histogram=json.dumps(latency_histogram.empty_histogram()),
+        )
+        .on_conflict_do_nothing(index_elements=["bot_id", "granularity", "bucket_start"])
+    )
+
+
+def apply_usage_events(db: Session, events: list[dict]):
+    """
+    Fold a batch of usage events into the hourly + daily rollup rows.
+
+    Each event: bot_id, created_at, response_time_ms, cache_hit, error.
+    Runs inside the caller's transaction (the write-behind flush). Several
+    worker processes may flush into the same bucket, so rows are created with
+    an upsert and the counters are incremented in SQL rather than read and
+    written back. The histogram is merged after the counter UPDATE, which
+    already holds the write lock on the row (SQLite: on the database).
+    """
+    # Aggregate the batch in memory first: one row touch per (bot, bucket)
+    pending: dict[tuple, dict] = {}
+    for ev in events:
+        for granularity in GRANULARITIES:
+            key = (ev["bot_id"], granularity, bucket_start(ev["created_at"], granularity))
+            agg = pending.setdefault(key, {
+                "request_count": 0,
+                "cache_hit_count": 0,
+                "error_count": 0,
+                "total_response_ms": 0,
+                "histogram": latency_histogram.empty_histogram(),
+            })
+            agg["request_count"] += 1
+            agg["cache_hit_count"] += 1 if ev.get("cache_hit") else 0
+            agg["error_count"] += 1 if ev.get("error") else 0
+            # Latency describes answered messages only; failures are counted, not timed
+            if ev.get("response_time_ms") is not None and not ev.get("error"):
+                agg["total_response_ms"] += ev["response_time_ms"]
+                latency_histogram.observe(agg["histogram"], ev["response_time_ms"])
+
+    rollup = models.BotUsageRollup
+    for (bot_pk, granularity, start), agg in pending.items():
+        _insert_missing_row(db, bot_pk, granularity, start)
+
+        bucket_filter = (
+            rollup.bot_id == bot_pk,
+            rollup.granularity == granularity,
+            rollup.bucket_start == start,
+        )
+        db.execute(
+            update(rollup)
+            .where(*bucket_filter)
+            .values(
+                request_count=rollup.request_count + agg["request_count"],
+                cache_hit_count=rollup.cache_hit_count + agg["cache_hit_count"],
+                error_count=rollup.error_count + agg["error_count"],
+                total_response_ms=rollup.total_response_ms + agg["total_response_ms"],
+            )
+        )
+
+        if not any(agg["histogram"]):
+            continue
+
+        row = db.query(rollup).filter(*bucket_filter).with_for_update().one()
+        histogram = json.loads(row.latency_histogram)
+        latency_histogram.merge(histogram, agg["histogram"])
+        db.execute(
+            update(rollup)
+            .where(rollup.id == row.id)
+            .values(latency_histogram=json.dumps(histogram))
+        )
+
+
+def summarize_bucket(start: datetime, request_count: int, cache_hit_count: int,
+                     error_count: int, total_response_ms: int, histogram: list[int]) -> dict:
+    """
+    Shape one (possibly merged) rollup bucket for the API.
+    """
+    timed = sum(histogram)
+
+    def _pct(q):
+        value = latency_histogram.percentile(histogram, q)
+        return round(value, 1) if value is not None else None
+
+    return {
+        "bucket_start": start,
+        "request_count": request_count,
+        "cache_hit_count": cache_hit_count,
+        "error_count": error_count,
+        "avg_response_ms": round(total_response_ms / timed, 1) if timed else None,
+        "p50_ms": _pct(50),
+        "p95_ms": _pct(95),
+        "p99_ms": _pct(99),
+    }
+
+
+def get_bot_usage(db: Session, bot_pk: int, granularity: str, limit: int) -> list[dict]:
+    """
+    Latest `limit` buckets for one bot (newest first).
+    Reads at most `limit` rollup rows, independent of chat_logs volume.
+    """
+    rows = (
+        db.query(models.BotUsageRollup)
+        .filter(
+            models.BotUsageRollup.bot_id == bot_pk,
+            models.BotUsageRollup.granularity == granularity,
+        )
+        .order_by(models.BotUsageRollup.bucket_start.desc())
+        .limit(limit)
+        .all()
+    )
+
+    return [
+        summarize_bucket(
+            r.bucket_start, r.request_count, r.cache_hit_count, r.error_count,
+            r.total_response_ms, json.loads(r.latency_histogram),
+        )
+        for r in rows
+    ]
+
+
+def get_platform_usage(db: Session, granularity: str, limit: int) -> list[dict]:
+    """
+    Latest `limit` buckets summed over all bots (newest first).
+    """
+    starts = [
+        start for (start,) in (
+            db.query(models.BotUsageRollup.bucket_start)
+            .filter(models.BotUsageRollup.granularity == granularity)
+            .distinct()
+            .order_by(models.BotUsageRollup.bucket_start.desc())
+            .limit(limit)
+            .all()
+        )
+    ]
+    if not starts:
+        return []
+
+    rows = (
+        db.query(models.BotUsageRollup)
+        .filter(
+            models.BotUsageRollup.granularity == granularity,
+            models.BotUsageRollup.bucket_start.in_(starts),
+        )
+        .all()
+    )
+
+    merged: dict[datetime, dict] = {}
+    for r in rows:
+        agg = merged.setdefault(r.bucket_start, {
+            "request_count": 0,
+            "cache_hit_count": 0,
+            "error_count": 0,
+            "total_response_ms": 0,
+            "histogram": latency_histogram.empty_histogram(),
+        })
+        agg["request_count"] += r.request_count
+        agg["cache_hit_count"] += r.cache_hit_count
+        agg["error_count"] += r.error_count
+        agg["total_response_ms"] += r.total_response_ms
+        latency_histogram.merge(agg["histogram"], json.loads(r.latency_histogram))
+
+    return [
+        summarize_bucket(
+            start, agg["request_count"], agg["cache_hit_count"], agg["error_count"],
+            agg["total_response_ms"], agg["histogram"],
+        )
+        for start, agg in sorted(merged.items(), reverse=True)
+    ]
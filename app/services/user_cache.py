@@ -0,0 +1,101 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from app import config
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """
+    The authenticated caller as seen by endpoints:
+    only the fields they read, detached from any DB session.
+    """
+    id: int
+    email: str
+    name: str
+    role: str
+    token_version: int = 0
+
+
+class UserCache:
+    """
+    Short-TTL in-process cache of user principals keyed by (user_id, token_version).
+
+    Invalidation:
+    - role changes bump the user's token_version, so entries (and tokens)
+      for older versions stop matching
+    - deleted users' tokens issued before the deletion are revoked (the id
+      may be reused by a new user, whose tokens stay valid)
+
+    Revocations are kept for the token lifetime, after which every token
+    they apply to has expired anyway. They are per process: only a single
+    worker deployment sees all of them (see AUTH_CACHE_ONLY).
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = config.AUTH_USER_CACHE_TTL_S,
+        revocation_ttl_s: float = config.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    ):
+        self._ttl = ttl_s
+        self._revocation_ttl = revocation_ttl_s
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[int, int], tuple[UserPrincipal, float]] = {}
+        # user_id -> (lowest token_version still valid or None = user deleted, revoked at)
+        self._revoked: dict[int, tuple[int | None, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, token_version: int) -> UserPrincipal | None:
+        with self._lock:
+            entry = self._entries.get((user_id, token_version))
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop((user_id, token_version), None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, principal: UserPrincipal):
+        with self._lock:
+            self._entries[(principal.id, principal.token_version)] = (
+                principal, time.monotonic() + self._ttl,
+            )
+
+    def invalidate(self, user_id: int, min_version: int | None = None):
+        """
+        Drop all cached entries for a user.
+        min_version: first token_version that is still valid,
+        or None when the user was deleted.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+            now = time.time()
+            self._revoked[user_id] = (min_version, now)
+            # Tokens issued before older revocations have expired by now
+            for key in [k for k, (_, at) in self._revoked.items() if now - at > self._revocation_ttl]:
+                del self._revoked[key]
+
+    def is_revoked(self, user_id: int, token_version: int, issued_at: float | None = None) -> bool:
+        """
+        Known-stale tokens for this process (used by claims-only auth).
+        issued_at: the token's iat (None for older tokens without one).
+        """
+        with self._lock:
+            if user_id not in self._revoked:
+                return False
+            min_version, revoked_at = self._revoked[user_id]
+            if time.time() - revoked_at > self._revocation_ttl:
+                return False
+            if min_version is None:
+                return issued_at is None or issued_at <= revoked_at
+            return token_version < min_version
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
@@ -2,12 +2,20 @@ import chromadb
 import os
 import logging
 import shutil  # <-- add at top
+import uuid
+from datetime import datetime
+
+from app import config
+from app.services.metrics import instrument
 
 
 logger = logging.getLogger(__name__)
 
 BASE_CHROMA_DIR = "app/data/chroma/bots"
 
+# Collection of bots built before blue/green indexes (Bot.active_index NULL)
+DEFAULT_INDEX = "docs"
+
 
 def get_chroma_client(bot_id: str):
     """
@@ -21,28 +29,53 @@ def get_chroma_client(bot_id: str):
     return client
 
 
-def get_or_create_collection(client, collection_name: str = "docs"):
+def get_or_create_collection(client, collection_name: str = "docs", hnsw: dict | None = None):
     """
     Each bot gets one named collection in its Chroma DB.
+    `hnsw` overrides index settings, e.g. {"space": "l2", "M": 32, "search_ef": 50}
+    (used by the retrieval evaluation harness).
     """
+    metadata = {"hnsw:space": "cosine"}
+    metadata.update({f"hnsw:{key}": value for key, value in (hnsw or {}).items()})
     collection = client.get_or_create_collection(
         name=collection_name,
-        metadata={"hnsw:space": "cosine"},
+        metadata=metadata,
     )
     return collection
 
 
-def add_chunks_to_chroma(bot_id: str, chunks: list, embeddings: list, metadatas: list):
+def new_index_name() -> str:
+    """
+    Collection name for a new build; every build writes its own collection
+    and the bot's active_index is switched to it once it is complete.
+    """
+    return f"{DEFAULT_INDEX}-{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def chunk_id(bot_id: str, chunk_index: int) -> str:
+    return f"{bot_id}_{chunk_index}"
+
+
+@instrument("vector_write")
+def add_chunks_to_chroma(
+    bot_id: str,
+    chunks: list,
+    embeddings: list,
+    metadatas: list,
+    start_index: int = 0,
+    index: str = DEFAULT_INDEX,
+):
     """
     Save embeddings + text chunks + metadata into Chroma for this bot.
+    Batched writes pass `start_index` so chunk ids keep counting across batches.
     """
     if len(chunks) != len(embeddings) or len(chunks) != len(metadatas):
         raise ValueError("chunks, embeddings, metadatas must have same length")
 
     client = get_chroma_client(bot_id)
-    collection = get_or_create_collection(client)
+    collection = get_or_create_collection(client, index)
 
-    ids = [f"{bot_id}_{i}" for i in range(len(chunks))]
+    ids = [chunk_id(bot_id, start_index + i) for i in range(len(chunks))]
 
     collection.add(
         documents=chunks,
@@ -55,13 +88,30 @@ def add_chunks_to_chroma(bot_id: str, chunks: list, embeddings: list, metadatas:
     return True
 
 
-def retrieve_chunks(bot_id: str, query_vector, top_k: int = 3):
+def update_chunk_metadatas(bot_id: str, metadatas_by_index: dict, index: str = DEFAULT_INDEX):
+    """
+    Replace the metadata of already stored chunks: {chunk_index: metadata}.
     """
-    Query Chroma using an embedding vector.
+    if not metadatas_by_index:
+        return
+    client = get_chroma_client(bot_id)
+    collection = get_or_create_collection(client, index)
+    indexes = sorted(metadatas_by_index)
+    collection.update(
+        ids=[chunk_id(bot_id, i) for i in indexes],
+        metadatas=[metadatas_by_index[i] for i in indexes],
+    )
+    logger.info(f"Updated metadata of {len(indexes)} chunks for bot {bot_id}.")
+
+
+@instrument("vector_query")
+def retrieve_chunks(bot_id: str, query_vector, top_k: int = 3, index: str | None = None):
+    """
+    Query Chroma using an embedding vector, in the bot's active `index`.
     Returns: (documents, metadatas)
     """
     client = get_chroma_client(bot_id)
-    collection = get_or_create_collection(client)
+    collection = get_or_create_collection(client, index or DEFAULT_INDEX)
 
     results = collection.query(
         query_embeddings=[query_vector],
@@ -78,6 +128,70 @@ def retrieve_chunks(bot_id: str, query_vector, top_k: int = 3):
 
     return docs[0], metas[0]
 
+def index_count(bot_id: str, index: str | None) -> int:
+    """
+    Number of chunks in one of the bot's indexes (0 if it does not exist).
+    """
+    client = get_chroma_client(bot_id)
+    try:
+        return client.get_collection(name=index or DEFAULT_INDEX).count()
+    except Exception:
+        return 0
+
+
+_PROBE_TOP_K = 10
+_PROBE_MAX_DISTANCE = 1e-4
+
+
+def validate_index(bot_id: str, index: str, expected_count: int, serving_count: int = 0):
+    """
+    Check a freshly built index before it goes live; raises ValueError when
+    it is incomplete, cannot find its own chunks, or is much smaller than
+    the index serving now (INDEX_SWAP_MIN_RATIO, e.g. a crawl that was
+    blocked half-way).
+    """
+    client = get_chroma_client(bot_id)
+    collection = client.get_collection(name=index)
+
+    count = collection.count()
+    if count == 0 or count != expected_count:
+        raise ValueError(f"Index {index} holds {count} chunks, expected {expected_count}")
+
+    # Repeated page text gives identical embeddings, so the probe's exact
+    # duplicate may rank first: accept the probe anywhere in the top hits,
+    # or any hit at (float) distance zero
+    probe = collection.get(limit=1, include=["embeddings"])
+    results = collection.query(
+        query_embeddings=[probe["embeddings"][0]],
+        n_results=min(_PROBE_TOP_K, count),
+        include=["distances"],
+    )
+    found = probe["ids"][0] in results["ids"][0] or any(
+        d <= _PROBE_MAX_DISTANCE for d in results["distances"][0]
+    )
+    if not found:
+        raise ValueError(f"Index {index} does not return its own chunk {probe['ids'][0]}")
+
+    if serving_count and count < config.INDEX_SWAP_MIN_RATIO * serving_count:
+        raise ValueError(
+            f"New index has {count} chunks, under {config.INDEX_SWAP_MIN_RATIO:.0%} "
+            f"of the {serving_count} serving now"
+        )
+
+
+def drop_index(bot_id: str, index: str):
+    """
+    Delete one of the bot's indexes (no-op if it does not exist).
+    """
+    bot_dir = os.path.join(BASE_CHROMA_DIR, bot_id)
+    if not os.path.exists(bot_dir):
+        return
+    client = chromadb.PersistentClient(path=bot_dir)
+    if index in {coll.name for coll in client.list_collections()}:
+        client.delete_collection(name=index)
+        logger.info(f"Dropped Chroma collection '{index}' for bot {bot_id}")
+
+
 def reset_chroma_for_bot(bot_id: str):
     """
     Logically reset Chroma for this bot by deleting all collections
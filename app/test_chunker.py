@@ -5,7 +5,8 @@ This is a test. This is another sentence! Here is more content?
 And here is a very long paragraph that should be chunked correctly.
 """
 
-chunks = process_text_to_chunks(text)
+# Word mode: token mode needs the embedding model's tokenizer (see app/test_token_chunker.py)
+chunks = process_text_to_chunks(text, mode="words")
 
 print(f"Total chunks = {len(chunks)}\n")
 for c in chunks:
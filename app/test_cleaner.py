@@ -0,0 +1,88 @@
+"""
+Differential test: the compiled cleaner must give exactly the same output
+as the original multi-pass implementation.
+
+Run: python -m app.test_cleaner   (or pytest app/test_cleaner.py)
+"""
+import random
+
+from app.benchmarks.fixtures import SyntheticSite
+from app.services.cleaner import (
+    BLACKLIST_PATTERNS,
+    IMPORTANT_KEYWORDS,
+    clean_scraped_text,
+    reference_clean_scraped_text,
+)
+
+EDGE_CASES = [
+    "",
+    "   ",
+    ".",
+    "...\n\n...",
+    "Short. Tiny. x",
+    "Call us. Email: a@b.co. Phone +1 555 123 4567. Fax 12-34",
+    "© 2024 Company. ALL RIGHTS RESERVED. Privacy Policy. COOKIE policy here",
+    # A removal joins text into a new match for a later pattern
+    "followprivacy policyus and then some more words to keep the line long",
+    "newsletterall rights reservedsubscribe to updates about everything we sell",
+    "privacy policyprivacy policy policy privacy cookie cookie policy policy",
+    "Duplicate line that is long enough. duplicate LINE that is long enough.",
+    "Tabs\tand\nnew\r\nlines\x0band\x0cform\x1cfeeds and nbsp　wide space",
+    # Characters where IGNORECASE and lower() disagree
+    "Read our prıvacy polıcy and the cooKie poliſy. İ follow uſ on every network",
+    "İstanbul office contact: İSTANBUL. ẞtraße support line available now",
+    "Reach us at 1234567 or 123 4567 8 or ----------- or +--------",
+    "a" * 24 + ". " + "b" * 25 + ". " + "c" * 26,
+    "chat" + "x" * 30 + ". whatsapp. message us. get in touch. reach  us",
+]
+
+_ALPHABET = (
+    ["a", "b", "e", "o", "s", " ", " ", ".", ".", "\n", "\t", "@", "-", "+", "©",
+     "1", "2", "0", "9", "A", "Z", " ", "İ"]
+)
+
+
+def _random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 40)):
+        roll = rng.random()
+        if roll < 0.3:
+            parts.append(rng.choice(BLACKLIST_PATTERNS).replace(r"\d{4}", str(rng.randint(1990, 2030))))
+        elif roll < 0.5:
+            parts.append(rng.choice(IMPORTANT_KEYWORDS))
+        elif roll < 0.6:
+            parts.append(f"user{rng.randint(0, 9)}@example.com")
+        elif roll < 0.7:
+            parts.append("+" + "".join(rng.choice("0123456789 -") for _ in range(rng.randint(5, 12))))
+        else:
+            parts.append("".join(rng.choice(_ALPHABET) for _ in range(rng.randint(1, 40))))
+        parts.append(rng.choice(["", " ", ". ", ".", "\n", "  "]))
+    text = "".join(parts)
+    # Randomly vary case so IGNORECASE paths are exercised
+    return "".join(ch.upper() if rng.random() < 0.2 else ch for ch in text)
+
+
+def check_cleaner_matches_reference(cases: int = 5000) -> int:
+    """
+    Compare both cleaners on edge cases, synthetic pages and `cases` random
+    texts; returns how many texts were checked.
+    """
+    rng = random.Random(1234)
+    site = SyntheticSite(pages=20, paragraphs=10)
+    texts = EDGE_CASES + list(site.texts().values())
+    texts += [_random_text(rng) for _ in range(cases)]
+
+    for text in texts:
+        expected = reference_clean_scraped_text(text)
+        actual = clean_scraped_text(text)
+        assert actual == expected, f"Mismatch for {text!r}:\n{actual!r}\n!=\n{expected!r}"
+    return len(texts)
+
+
+def test_cleaner_matches_reference():
+    assert check_cleaner_matches_reference() > len(EDGE_CASES)
+
+
+if __name__ == "__main__":
+    checked = check_cleaner_matches_reference()
+    print(f"OK: {checked} texts cleaned identically")
@@ -0,0 +1,130 @@
+"""
+Tests for token-aware chunking (CHUNKING_MODE=tokens): chunk size bound,
+overlap between chunks, and sentences longer than the window.
+
+Word token counts come from a deterministic stand-in for the embedding
+model's tokenizer, so these run offline.
+
+Run: python -m app.test_token_chunker   (or pytest app/test_token_chunker.py)
+"""
+import random
+
+from app.services.text_processing import _tail, chunk_sentences_by_tokens
+
+
+def _count_tokens(words: list[str]) -> list[int]:
+    # Roughly WordPiece-like: longer words split into more pieces
+    return [1 + len(w) // 6 for w in words]
+
+
+def _ones(words: list[str]) -> list[int]:
+    return [1] * len(words)
+
+
+def _tokens(chunk: str) -> int:
+    return sum(_count_tokens(chunk.split()))
+
+
+def _sentence(prefix: str, n: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(1, n + 1))
+
+
+def _merge_overlaps(chunks: list[str]) -> tuple[list[str], list[list[str]]]:
+    """
+    Words of consecutive chunks with each chunk's overlap (its longest
+    prefix that ends the previous chunk) removed, plus those overlaps.
+    Only unambiguous when every input word is distinct.
+    """
+    words: list[str] = []
+    overlaps: list[list[str]] = []
+    previous: list[str] = []
+    for chunk in chunks:
+        current = chunk.split()
+        k = min(len(previous), len(current))
+        while k and previous[-k:] != current[:k]:
+            k -= 1
+        overlaps.append(current[:k])
+        words.extend(current[k:])
+        previous = current
+    return words, overlaps
+
+
+def test_tail_fits_budget():
+    words = ["a", "b", "c", "d"]
+    counts = [1, 3, 1, 2]
+    assert _tail(words, counts, 3) == (["c", "d"], [1, 2])
+    assert _tail(words, counts, 1) == ([], [])
+    assert _tail(words, counts, 0) == ([], [])
+    assert _tail(words, counts, 100) == (words, counts)
+
+
+def test_sentences_packed_with_overlap():
+    sentences = [_sentence("a", 4), _sentence("b", 4), _sentence("c", 4), _sentence("d", 4)]
+    chunks = chunk_sentences_by_tokens(sentences, max_tokens=10, overlap_tokens=3, count_tokens=_ones)
+    assert chunks == [
+        "a1 a2 a3 a4 b1 b2 b3 b4",
+        "b2 b3 b4 c1 c2 c3 c4",
+        "c2 c3 c4 d1 d2 d3 d4",
+    ]
+
+
+def test_overlap_never_pushes_chunk_over_budget():
+    # The next sentence leaves room for only one overlap word
+    sentences = [_sentence("a", 5), _sentence("b", 9)]
+    chunks = chunk_sentences_by_tokens(sentences, max_tokens=10, overlap_tokens=4, count_tokens=_ones)
+    assert chunks == ["a1 a2 a3 a4 a5", "a5 b1 b2 b3 b4 b5 b6 b7 b8 b9"]
+
+
+def test_sentence_longer_than_window():
+    sentences = [_sentence("a", 3), _sentence("w", 25), _sentence("z", 2)]
+    chunks = chunk_sentences_by_tokens(sentences, max_tokens=10, overlap_tokens=3, count_tokens=_ones)
+    assert chunks == [
+        "a1 a2 a3",
+        _sentence("w", 10),
+        " ".join(f"w{i}" for i in range(8, 18)),
+        " ".join(f"w{i}" for i in range(15, 25)),
+        "w22 w23 w24 w25",
+        # No overlap carried out of a split sentence
+        "z1 z2",
+    ]
+
+
+def test_word_longer_than_window_gets_own_chunk():
+    sentences = ["short words here", "x" * 120, "after it"]
+    chunks = chunk_sentences_by_tokens(sentences, max_tokens=8, overlap_tokens=2, count_tokens=_count_tokens)
+    assert chunks == ["short words here", "x" * 120, "after it"]
+
+
+def test_random_chunks_within_bound_and_lossless():
+    rng = random.Random(42)
+    next_id = 0
+    for _ in range(300):
+        max_tokens = rng.randint(8, 64)
+        overlap_tokens = rng.randint(0, max_tokens // 2)
+        sentences = []
+        for _ in range(rng.randint(1, 30)):
+            words = []
+            for _ in range(rng.randint(1, max_tokens + 10)):
+                # Distinct words, so overlaps can be identified; none longer than the window
+                words.append(f"w{next_id}" + "x" * rng.randint(0, 12))
+                next_id += 1
+            sentences.append(" ".join(words))
+        inputs = [w for sent in sentences for w in sent.split()]
+
+        chunks = chunk_sentences_by_tokens(
+            sentences, max_tokens, overlap_tokens, count_tokens=_count_tokens
+        )
+
+        for chunk in chunks:
+            assert _tokens(chunk) <= max_tokens, (max_tokens, chunk)
+        words, overlaps = _merge_overlaps(chunks)
+        assert words == inputs
+        for overlap in overlaps:
+            assert sum(_count_tokens(overlap)) <= overlap_tokens
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_")]
+    for name, fn in tests:
+        fn()
+        print(f"OK: {name}")
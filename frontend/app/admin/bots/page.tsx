@@ -3,6 +3,7 @@
 import { useEffect, useState } from "react";
 import { getToken, getUserRole } from "@/lib/auth";
 import { API_BASE_URL } from "@/lib/constants";
+import { fetchAllPages } from "@/lib/api";
 
 type Bot = {
   bot_id: string;
@@ -30,16 +31,9 @@ export default function AdminBotsPage() {
   async function fetchBots() {
     try {
       const token = getToken();
-      const res = await fetch(`${API_BASE_URL}/admin/bots`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-
-      const data = await res.json();
-      if (res.ok) {
-        setBots(data);
-      }
+      setBots(await fetchAllPages<Bot>("/admin/bots", token));
+    } catch {
+      console.error("Failed to fetch bots");
     } finally {
       setLoading(false);
     }
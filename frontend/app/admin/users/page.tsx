@@ -3,6 +3,7 @@
 import { useEffect, useState } from "react";
 import { getToken, getUserRole } from "@/lib/auth";
 import { API_BASE_URL } from "@/lib/constants";
+import { fetchAllPages } from "@/lib/api";
 
 type User = {
   id: number;
@@ -29,21 +30,9 @@ export default function AdminUsersPage() {
   async function fetchUsers() {
     try {
       const token = getToken();
-      const res = await fetch(`${API_BASE_URL}/admin/users`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-
-      const data = await res.json();
-      if (!res.ok) {
-        setError(data.detail || "Failed to load users");
-        return;
-      }
-
-      setUsers(data);
-    } catch {
-      setError("Something went wrong");
+      setUsers(await fetchAllPages<User>("/admin/users", token));
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Failed to load users");
     } finally {
       setLoading(false);
     }
@@ -7,6 +7,7 @@ import {
   logout,
 } from "@/lib/auth";
 import { API_BASE_URL } from "@/lib/constants";
+import { fetchAllPages } from "@/lib/api";
 import Link from "next/link";
 
 type Bot = {
@@ -41,16 +42,7 @@ export default function DashboardPage() {
 
     async function fetchBots() {
       try {
-        const res = await fetch(`${API_BASE_URL}/bots/my`, {
-          headers: {
-            Authorization: `Bearer ${token}`,
-          },
-        });
-
-        const data = await res.json();
-        if (res.ok) {
-          setBots(data);
-        }
+        setBots(await fetchAllPages<Bot>("/bots/my", token));
       } catch {
         console.error("Failed to fetch bots");
       } finally {
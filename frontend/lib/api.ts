@@ -22,3 +22,35 @@ export async function apiRequest(
 
   return res.json();
 }
+
+// Largest page the listing endpoints serve (MAX_PAGE_SIZE on the backend)
+const PAGE_SIZE = 200;
+
+// Listing endpoints (/bots/my, /admin/users, /admin/bots) return one page
+// at a time: follow the X-Next-Cursor header until the last page.
+export async function fetchAllPages<T>(
+  endpoint: string,
+  token: string | null
+): Promise<T[]> {
+  const rows: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set("cursor", cursor);
+    const separator = endpoint.includes("?") ? "&" : "?";
+
+    const res = await fetch(`${API_BASE_URL}${endpoint}${separator}${params}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    });
+    const data = await res.json();
+    if (!res.ok) {
+      throw new Error(data.detail || "API request failed");
+    }
+
+    rows.push(...data);
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return rows;
+}